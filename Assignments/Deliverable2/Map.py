@@ -1,40 +1,106 @@
 import numpy as np
 np.set_printoptions(threshold=np.inf, linewidth=300)
-import pandas as pd
+import os
 import time
 from PIL import Image
 
+# Symbols used for the cell values when the map is printed
+CELL_SYMBOLS = {-1: ' # ', 1: ' . ', 2: ' , ', 3: ' : ', 4: ' ; '}
+
+# Define what colors to give to different values of the string map. Index 0 of the palette is yellow, which is used
+# for everything else
+SYMBOL_COLORS = {' # ': (255, 0, 0), ' . ': (215, 215, 215), ' , ': (166, 166, 166), ' : ': (96, 96, 96),
+                 ' ; ': (36, 36, 36), ' S ': (255, 0, 255), ' G ': (0, 128, 255)}
+SYMBOL_INDEX = {symbol: i + 1 for i, symbol in enumerate(SYMBOL_COLORS)}
+PALETTE = np.array([(255, 255, 0)] + list(SYMBOL_COLORS.values()), dtype=np.uint8)
+
+
+def load_int_map(path, use_cache=True):
+    """
+    Loads a map as an int8 numpy array. A .npy file is memory-mapped. A .csv file is parsed, and the result is saved
+    as a .npy cache next to it that is memory-mapped instead the next time, as long as the .csv has not changed.
+    The memory-mapped array is copy-on-write, so changes to it are never written back to the file.
+    :param path: Path to .csv or .npy map
+    :param use_cache: whether to read and write the .npy cache of a .csv map
+    :return: the integer map
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='c')
+    cache = path + '.npy'
+    if use_cache and os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return np.load(cache, mmap_mode='c')
+    int_map = np.loadtxt(path, delimiter=',', dtype=np.int8, ndmin=2)
+    if use_cache:
+        save_int_map(int_map, cache)
+    return int_map
+
+
+def save_int_map(int_map, path):
+    np.save(path, np.asarray(int_map, dtype=np.int8))
+
+
+def make_str_map(int_map):
+    """
+    Converts the integer map to a string array with symbols that are more suitable for printing.
+    :param int_map: the integer map
+    :return: the string map
+    """
+    str_map = int_map.astype('<U3')
+    for value, symbol in CELL_SYMBOLS.items():
+        str_map[int_map == value] = symbol
+    return str_map
+
 class Map_Obj():
-    def __init__(self, task=1):
-        self.start_pos, self.goal_pos, self.end_goal_pos, self.path_to_map = self.fill_critical_positions(task)
-        self.int_map, self.str_map = self.read_map(self.path_to_map)
+    def __init__(self, task=1, path_to_map=None, start_pos=None, goal_pos=None, end_goal_pos=None):
+        """
+        :param task: the task whose map and positions are used, see fill_critical_positions
+        :param path_to_map: a .csv or .npy map to use instead of the one of the task, for example one made by
+        mapgen.generate_map. The start and goal positions must then be given too.
+        :param start_pos: start position [row, column] to use instead of the one of the task
+        :param goal_pos: goal position [row, column] to use instead of the one of the task
+        :param end_goal_pos: position the goal moves towards, the goal position itself if None and a goal is given
+        """
+        if path_to_map is None:
+            self.start_pos, self.goal_pos, self.end_goal_pos, self.path_to_map = self.fill_critical_positions(task)
+        else:
+            self.start_pos, self.goal_pos, self.end_goal_pos, self.path_to_map = None, None, None, path_to_map
+        if start_pos is not None:
+            self.start_pos = [start_pos[0], start_pos[1]]
+        if goal_pos is not None:
+            self.goal_pos = [goal_pos[0], goal_pos[1]]
+            self.end_goal_pos = self.goal_pos
+        if end_goal_pos is not None:
+            self.end_goal_pos = [end_goal_pos[0], end_goal_pos[1]]
+        if self.start_pos is None or self.goal_pos is None:
+            raise ValueError('A start and a goal position are needed for the map ' + str(path_to_map))
+        self.int_map = self.read_map(self.path_to_map)
+        self._str_map = None  # Only made when the map is printed or drawn, see str_map
         self.tmp_cell_value = self.get_cell_value(self.goal_pos)
-        self.set_cell_value(self.start_pos, ' S ')
-        self.set_cell_value(self.goal_pos, ' G ')
         self.tick_counter = 0
+        self.cost_listeners = []  # Called with the position, old value and new value when a cell cost changes
+        self.version = 0  # Goes up by one every time a cell cost changes
         #self.set_start_pos_str_marker(start_pos, self.str_map)
         #self.set_goal_pos_str_marker(goal_pos, self.str_map)
 
     def read_map(self, path):
         """
-        Reads maps specified in path from file, converts them to a numpy array and a string array. Then replaces
-        specific values in the string array with predefined values more suitable for printing.
-        :param path: Path to .csv maps
-        :return: the integer map and string map
-        """
-        # Read map from provided csv file
-        df = pd.read_csv(path, index_col=None, header=None)#,error_bad_lines=False)
-        # Convert pandas dataframe to numpy array
-        data = df.values
-        # Convert numpy array to string to make it more human readable
-        data_str = data.astype(str)
-        # Replace numeric values with more human readable symbols
-        data_str[data_str == '-1'] = ' # '
-        data_str[data_str == '1'] = ' . '
-        data_str[data_str == '2'] = ' , '
-        data_str[data_str == '3'] = ' : '
-        data_str[data_str == '4'] = ' ; '
-        return data, data_str
+        Reads maps specified in path from file, see load_int_map.
+        :param path: Path to .csv or .npy maps
+        :return: the integer map
+        """
+        return load_int_map(path)
+
+    @property
+    def str_map(self):
+        """
+        The map as a string array, with the start and the current goal marked. It is made from the integer map the
+        first time it is needed, so maps that are never printed never pay for it.
+        """
+        if self._str_map is None:
+            self._str_map = make_str_map(self.int_map)
+            self._str_map[self.start_pos[0], self.start_pos[1]] = ' S '
+            self._str_map[self.goal_pos[0], self.goal_pos[1]] = ' G '
+        return self._str_map
 
     def fill_critical_positions(self, task):
         """
@@ -105,7 +171,24 @@ class Map_Obj():
         if str_map:
             self.str_map[pos[0], pos[1]] = value
         else:
+            old_value = self.get_cell_value(pos)
             self.int_map[pos[0], pos[1]] = value
+            self.cost_changed(pos, old_value, value)
+
+    def add_cost_listener(self, listener):
+        """
+        Registers a function that is called whenever the cost of a cell in the integer map changes, so that anything
+        built from the costs can be updated.
+        :param listener: function taking the position, the old value and the new value
+        :return: nothing.
+        """
+        self.cost_listeners.append(listener)
+
+    def cost_changed(self, pos, old_value, new_value):
+        if old_value != new_value:
+            self.version += 1
+            for listener in self.cost_listeners:
+                listener(pos, old_value, new_value)
 
     def print_map(self, map_to_print):
         # For every column in provided map, print it
@@ -113,19 +196,39 @@ class Map_Obj():
             print(column)
 
 
-    def pick_move(self):
+    def pick_move(self, pos=None):
         """
         A function used for moving the goal position. It moves the current goal position towards the end_goal position.
+        :param pos: position to move from instead of the current goal position
         :return: Next coordinates for the goal position.
         """
-        if self.goal_pos[0] < self.end_goal_pos[0]:
-            return [self.goal_pos[0]+1, self.goal_pos[1]]
-        elif self.goal_pos[0] > self.end_goal_pos[0]:
-            return [self.goal_pos[0]-1, self.goal_pos[1]]
-        elif self.goal_pos[1] < self.end_goal_pos[1]:
-            return [self.goal_pos[0], self.goal_pos[1]+1]
+        if pos is None:
+            pos = self.goal_pos
+        if pos[0] < self.end_goal_pos[0]:
+            return [pos[0]+1, pos[1]]
+        elif pos[0] > self.end_goal_pos[0]:
+            return [pos[0]-1, pos[1]]
+        elif pos[1] < self.end_goal_pos[1]:
+            return [pos[0], pos[1]+1]
         else:
-            return [self.goal_pos[0], self.goal_pos[1]-1]
+            return [pos[0], pos[1]-1]
+
+    def goal_trajectory(self):
+        """
+        Works out where the goal will be after each future call to tick(), without moving it. Follows the same rules
+        as tick(), so the goal moves on every 4th call until it reaches the end_goal position.
+        :return: list of goal positions, the first one is the current position and the one at index t is the position
+        after t more ticks. The goal stays at the last position for every tick after that.
+        """
+        pos = [self.goal_pos[0], self.goal_pos[1]]
+        trajectory = [pos]
+        tick_counter = self.tick_counter
+        while self.end_goal_pos is not None and pos != self.end_goal_pos:
+            if tick_counter % 4 == 0:
+                pos = self.pick_move(pos)
+            tick_counter += 1
+            trajectory.append(pos)
+        return trajectory
 
     def replace_map_values(self, pos, value, goal_pos):
         """
@@ -135,19 +238,13 @@ class Map_Obj():
         :param goal_pos: The coordinate of the current goal
         :return: nothing.
         """
-        if value == 1:
-            str_value = ' . '
-        elif value == 2:
-            str_value = ' , '
-        elif value == 3:
-            str_value = ' : '
-        elif value == 4:
-            str_value = ' ; '
-        else:
-            str_value = str(value)
+        old_value = self.get_cell_value(pos)
         self.int_map[pos[0]][pos[1]] = value
-        self.str_map[pos[0]][pos[1]] = str_value
-        self.str_map[goal_pos[0], goal_pos[1]] = ' G '
+        self.cost_changed(pos, old_value, value)
+        # The string map gets the goal marker when it is made, so there is nothing to update if it does not exist yet
+        if self._str_map is not None:
+            self._str_map[pos[0]][pos[1]] = CELL_SYMBOLS.get(value, str(value))
+            self._str_map[goal_pos[0], goal_pos[1]] = ' G '
 
 
     def tick(self):
@@ -191,41 +288,65 @@ class Map_Obj():
         else:
             map[goal_pos[0]][goal_pos[1]] = ' G '
 
-    def show_map(self, map=None):
+    def render_map(self, map=None, path=None, scale=20):
+        """
+        Draws the map as an image. Every cell gets a colour index, the indices are turned into colours with the palette
+        and the image is scaled up by repeating the pixels, all with numpy instead of setting one pixel at a time.
+        :param map: string map to draw. If None, the string map is used if it has been made and the integer map if not.
+        :param path: list of positions to paint yellow, like the markers set in the string map
+        :param scale: width and height of a cell in pixels
+        :return: the image.
+        """
+        if map is not None or self._str_map is not None:
+            if map is None:
+                map = self._str_map
+            # Undefined values will remain yellow, this is how the yellow path is painted
+            color_index = np.zeros(map.shape, dtype=np.uint8)
+            for i, symbol in enumerate(SYMBOL_COLORS):
+                color_index[map == symbol] = i + 1
+        else:
+            values = np.asarray(self.int_map, dtype=np.int64)
+            color_index = np.zeros(values.shape, dtype=np.uint8)
+            for value, symbol in CELL_SYMBOLS.items():
+                color_index[values == value] = SYMBOL_INDEX[symbol]
+            color_index[self.goal_pos[0], self.goal_pos[1]] = SYMBOL_INDEX[' G ']
+            color_index[self.start_pos[0], self.start_pos[1]] = SYMBOL_INDEX[' S ']
+
+        if path is not None and len(path) > 0:
+            rows, cols = np.asarray(path).T
+            color_index[rows, cols] = 0
+            color_index[self.start_pos[0], self.start_pos[1]] = SYMBOL_INDEX[' S ']
+
+        pixels = PALETTE[color_index]
+        pixels = np.repeat(np.repeat(pixels, scale, axis=0), scale, axis=1)
+        return Image.fromarray(pixels, 'RGB')
+
+    def show_map(self, map=None, path=None, filename=None):
         """
         A function used to draw the map as an image and show it.
         :param map: map to use
+        :param path: list of positions to paint as the path
+        :param filename: if given, the image is saved as this file instead of being shown
         :return: nothing.
         """
         # If a map is provided, set the goal and start positions
         if map is not None:
             self.set_start_pos_str_marker(self.start_pos, map)
             self.set_goal_pos_str_marker(self.goal_pos, map)
-        # If no map is provided, use string_map
+
+        image = self.render_map(map, path)
+        if filename is not None:
+            image.save(filename)
         else:
-            map = self.str_map
-
-        # Define width and height of image
-        width = map.shape[1]
-        height = map.shape[0]
-        # Define scale of the image
-        scale = 20
-        # Create an all-yellow image
-        image = Image.new('RGB', (width * scale, height * scale), (255, 255, 0))
-        # Load image
-        pixels = image.load()
-
-        # Define what colors to give to different values of the string map (undefined values will remain yellow, this is
-        # how the yellow path is painted)
-        colors = {' # ': (255, 0, 0), ' . ': (215, 215, 215), ' , ': (166, 166, 166), ' : ': (96, 96, 96),
-                  ' ; ': (36, 36, 36), ' S ': (255, 0, 255), ' G ': (0, 128, 255)}
-        # Go through image and set pixel color for every position
-        for y in range(height):
-            for x in range(width):
-                if map[y][x] not in colors: continue
-                for i in range(scale):
-                    for j in range(scale):
-                        pixels[x * scale + i, y * scale + j] = colors[map[y][x]]
-        # Show image
-        image.show()
+            image.show()
+
 
+def save_frames(frames, filename, duration=200):
+    """
+    Saves a sequence of images, like those from Map_Obj.render_map, as an animated .gif or .png.
+    :param frames: list of images
+    :param filename: file to save the animation to
+    :param duration: time each frame is shown in milliseconds
+    :return: nothing.
+    """
+    frames[0].save(filename, save_all=True, append_images=frames[1:], duration=duration, loop=0)
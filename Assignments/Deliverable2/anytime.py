@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import time
+from search import NEIGHBOURS, NodeStore, SearchResult, manhattan_distance
+
+
+# Anytime search (ARA*) for when a path is needed within a time budget. The first search inflates the heuristic by a
+# weight, which finds a path quickly that costs at most weight times the cheapest one. The weight is then lowered step
+# by step, and every new search continues from the costs found by the earlier ones instead of starting over, until
+# the time is up or the weight is 1 and the path is the cheapest one.
+
+class AnytimePlanner:
+
+    def __init__(self, int_map, start, goal, heuristic=manhattan_distance, weight=3.0, weight_step=0.5):
+        """
+        :param int_map: 2D numpy array with the cell costs
+        :param start: start position [row, column]
+        :param goal: goal position [row, column]
+        :param heuristic: function taking two positions and returning a consistent estimate of the cost between them
+        :param weight: how much the heuristic is inflated in the first search
+        :param weight_step: how much the weight is lowered after each search
+        """
+        self.height, self.width = int_map.shape
+        self.costs = int_map.ravel()
+        self.heuristic = heuristic
+        self.goal = (goal[0], goal[1])
+        self.weight = weight
+        self.weight_step = weight_step
+        self.store = NodeStore(int_map.shape)  # NEW cells have not been reached, all others have a g cost
+        self.start_index = self.store.to_index(start)
+        self.goal_index = self.store.to_index(goal)
+        self.tie_breaker = itertools.count()
+
+        self.open = set()
+        self.frontier = []
+        self.inconsistent = set()  # Cells that got cheaper after they were expanded in the current search
+        self.expanded = 0
+        self.best = SearchResult(None, None, 0, float('inf'))
+        if int(self.costs[self.start_index]) != -1:
+            self.store.open_node(self.start_index, 0, 0, -1)
+            self.push(self.start_index)
+
+    def h_cost(self, index):
+        return self.heuristic(divmod(index, self.width), self.goal)
+
+    def push(self, index):
+        g_cost = int(self.store.g_cost[index])
+        self.open.add(index)
+        key = g_cost + self.weight * self.h_cost(index)
+        heapq.heappush(self.frontier, (key, next(self.tie_breaker), index, g_cost))
+
+    def goal_cost(self):
+        if self.store.status_of(self.goal_index) == NodeStore.NEW:
+            return float('inf')
+        return int(self.store.g_cost[self.goal_index])
+
+    def top_key(self):
+        # Throwing away stale entries until the top of the heap is a cell that is open with the cost it was pushed with
+        while self.frontier:
+            key, _, index, g_cost = self.frontier[0]
+            if index in self.open and g_cost == self.store.g_cost[index]:
+                return key
+            heapq.heappop(self.frontier)
+        return float('inf')
+
+    def improve_path(self, deadline):
+        """
+        One weighted A* search, continuing from the costs found so far.
+        :param deadline: time.perf_counter() value at which to give up
+        :return: True if the search finished, False if it ran out of time.
+        """
+        closed = set()
+        while self.goal_cost() > self.top_key():
+            if time.perf_counter() > deadline:
+                return False
+            _, _, index, g_cost = heapq.heappop(self.frontier)
+            self.open.discard(index)
+            closed.add(index)
+            self.expanded += 1
+
+            row, col = divmod(index, self.width)
+            for i, j in NEIGHBOURS:
+                if not (0 <= row + i < self.height and 0 <= col + j < self.width):
+                    continue
+                child = index + i * self.width + j
+                cell_cost = int(self.costs[child])
+                if cell_cost == -1:
+                    continue
+                child_g_cost = g_cost + cell_cost
+                if self.store.status_of(child) != NodeStore.NEW and child_g_cost >= self.store.g_cost[child]:
+                    continue
+                self.store.open_node(child, child_g_cost, 0, index)
+                if child in closed:
+                    # Expanding a cell twice in one search is what makes plain weighted A* slow, so it waits
+                    self.inconsistent.add(child)
+                else:
+                    self.push(child)
+        return True
+
+    def suboptimality_bound(self):
+        """
+        :return: how many times more than the cheapest path the current path can cost at most.
+        """
+        lowest = min((int(self.store.g_cost[index]) + self.h_cost(index) for index in self.open | self.inconsistent),
+                     default=float('inf'))
+        if lowest == 0 or lowest == float('inf'):
+            return 1.0
+        return max(1.0, min(self.weight, self.goal_cost() / lowest))
+
+    def search(self, budget_ms):
+        """
+        Improves the path until the time budget is used or the path is known to be the cheapest.
+        :param budget_ms: time budget in milliseconds
+        :return: a SearchResult with the best path found, its cost, the number of expanded nodes and its
+        suboptimality bound. The path is None if no path was found in time.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        while True:
+            if not self.improve_path(deadline):
+                break
+            if self.goal_cost() == float('inf'):
+                self.best.bound = 1.0  # The goal cannot be reached at all
+                break
+            # A cell on the path may have got cheaper after its children were reached, so the path the parents give
+            # can cost less than the g cost of the goal
+            path = self.store.path_to(self.goal_index)
+            cost = sum(int(self.costs[row * self.width + col]) for row, col in path[1:])
+            self.best = SearchResult(path, cost, self.expanded, self.suboptimality_bound())
+            if self.weight <= 1:
+                break
+
+            # Next search with a lower weight. It starts from everything that is open or got cheaper.
+            self.weight = max(1.0, self.weight - self.weight_step)
+            self.open |= self.inconsistent
+            self.inconsistent = set()
+            self.frontier = []
+            for index in self.open:
+                g_cost = int(self.store.g_cost[index])
+                self.frontier.append((g_cost + self.weight * self.h_cost(index), next(self.tie_breaker), index, g_cost))
+            heapq.heapify(self.frontier)
+        self.best.expanded = self.expanded
+        return self.best
+
+
+def anytime_search(int_map, start, goal, heuristic=manhattan_distance, budget_ms=50, weight=3.0):
+    """
+    Finds the best path it can from start to goal within the time budget, see AnytimePlanner.
+    :return: a SearchResult with the path, its cost, the number of expanded nodes and the suboptimality bound.
+    """
+    return AnytimePlanner(int_map, start, goal, heuristic, weight).search(budget_ms)
@@ -0,0 +1,252 @@
+import argparse
+import csv
+import json
+import sys
+import time
+import tracemalloc
+import Map
+import cbs
+import hpa
+import incremental
+import intercept
+import main
+import mapgen
+import search
+
+
+# Benchmarks for the search algorithms. Every algorithm variant is run on tasks 1-4 and on generated random and maze
+# maps of increasing size, and task 5 is run with full replanning, with the incremental planner and with the
+# interception search. With agent counts given, the multi-agent planners are run on tasks 1-4 with that many agents,
+# and then the expanded nodes are the states of all the single agent searches and the cost is the sum over the agents.
+# For every run the wall time, number of expanded nodes, peak memory and path cost are recorded, and the report can be
+# compared with an earlier one to catch regressions.
+
+def setup_algorithm(name):
+    # Variants that need no preprocessing, from the algorithms task() can use
+    return lambda int_map: lambda start, goal: main.ALGORITHMS[name](int_map, start, goal)
+
+
+def setup_hpa(int_map):
+    # The abstract graph is built once per map, so only the queries are timed
+    hierarchical_map = hpa.HierarchicalMap(int_map)
+    return hierarchical_map.query
+
+
+# Every variant takes a map and returns a function that answers a query on it
+VARIANTS = {name: setup_algorithm(name) for name in main.ALGORITHMS}
+VARIANTS['hpa'] = setup_hpa
+
+# Variants whose cost, expanded nodes and peak memory change from run to run: the anytime search stops when its time
+# budget runs out, and the parallel search depends on how the workers are scheduled and only the memory of the
+# coordinator is traced. They are only run when asked for, and only their times are compared with a baseline.
+UNSTABLE_VARIANTS = {'anytime', 'parallel'}
+
+
+def task_5_replan():
+    # The original way of solving task 5: a full search from scratch after every tick
+    myMap = Map.Map_Obj(5)
+    counter = 0
+    expanded = 0
+    while True:
+        myMap.tick()
+        counter += 1
+        result = search.astar(myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos())
+        expanded += result.expanded
+        if len(result.path) - 1 < counter:
+            return search.SearchResult(result.path, result.cost, expanded)
+
+
+def task_5_incremental():
+    myMap = Map.Map_Obj(5)
+    planner = incremental.IncrementalPlanner(myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos())
+    counter = 0
+    expanded = 0
+    while True:
+        myMap.tick()
+        counter += 1
+        planner.move_goal(myMap.get_goal_pos())
+        result = planner.plan()
+        expanded += result.expanded
+        if len(result.path) - 1 < counter:
+            return search.SearchResult(result.path, result.cost, expanded)
+
+
+def task_5_intercept():
+    myMap = Map.Map_Obj(5)
+    return intercept.intercept(myMap.int_map, myMap.get_start_pos(), myMap.goal_trajectory())
+
+
+TASK_5_VARIANTS = {'replan': task_5_replan, 'incremental': task_5_incremental, 'intercept': task_5_intercept}
+
+MAX_NODES = 1000  # Constraint tree nodes CBS may expand in a benchmark before it gives up
+
+# Multi-agent planners, taking a map and a list of (start, goal) positions
+MULTI_AGENT_VARIANTS = {
+    'cbs': lambda int_map, agents: cbs.conflict_based_search(int_map, agents, 1.0, MAX_NODES),
+    'ecbs': lambda int_map, agents: cbs.conflict_based_search(int_map, agents, cbs.ECBS_WEIGHT, MAX_NODES),
+    'prioritized': cbs.prioritized_planning}
+
+
+def measure(run, repeats):
+    """
+    Runs a function several times and measures it.
+    :param run: function without arguments returning a SearchResult
+    :param repeats: number of timed runs, the fastest one is reported
+    :return: dictionary with the time in seconds, expanded nodes, peak memory in bytes and path cost.
+    """
+    seconds = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = run()
+        seconds = min(seconds, time.perf_counter() - start_time)
+    # Tracing the memory slows everything down, so it gets a run of its own
+    tracemalloc.start()
+    run()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'time': seconds, 'expanded': result.expanded, 'peak_memory': peak_memory, 'cost': result.cost}
+
+
+def benchmark_cases(sizes):
+    """
+    The maps to run the variants on.
+    :param sizes: sizes of the generated maps
+    :return: list of (case name, integer map, start, goal).
+    """
+    cases = []
+    for task_number in range(1, 5):
+        myMap = Map.Map_Obj(task_number)
+        cases.append(('task-%d' % task_number, myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos()))
+    for size in sizes:
+        int_map = mapgen.random_map(size, size, seed=size)
+        cases.append(('random-%d' % size, int_map) + mapgen.pick_endpoints(int_map))
+        # Mazes need an odd size to have walls on all sides
+        int_map = mapgen.maze_map(size + 1, size + 1, seed=size)
+        cases.append(('maze-%d' % (size + 1), int_map) + mapgen.pick_endpoints(int_map))
+    return cases
+
+
+def run_benchmarks(variants, sizes, repeats=3, agent_counts=()):
+    """
+    :param variants: names of the variants in VARIANTS, TASK_5_VARIANTS and MULTI_AGENT_VARIANTS to run
+    :param sizes: sizes of the generated maps
+    :param repeats: number of timed runs of each query
+    :param agent_counts: numbers of agents to run the multi-agent variants with
+    :return: list with one dictionary of measurements per case and variant.
+    """
+    records = []
+    for case, int_map, start, goal in benchmark_cases(sizes):
+        for variant in variants:
+            if variant not in VARIANTS:
+                continue
+            query = VARIANTS[variant](int_map)
+            record = {'case': case, 'variant': variant}
+            record.update(measure(lambda: query(start, goal), repeats))
+            records.append(record)
+            print_record(record)
+    for variant in variants:
+        if variant in TASK_5_VARIANTS:
+            record = {'case': 'task-5', 'variant': variant}
+            record.update(measure(TASK_5_VARIANTS[variant], repeats))
+            records.append(record)
+            print_record(record)
+    for task_number in range(1, 5) if agent_counts else ():
+        int_map = Map.Map_Obj(task_number).int_map
+        for agent_count in agent_counts:
+            agents = cbs.random_agents(int_map, agent_count, seed=agent_count)
+            for variant in variants:
+                if variant in MULTI_AGENT_VARIANTS:
+                    record = {'case': 'task-%d-%d' % (task_number, agent_count), 'variant': variant}
+                    record.update(measure(lambda: MULTI_AGENT_VARIANTS[variant](int_map, agents), repeats))
+                    records.append(record)
+                    print_record(record)
+    return records
+
+
+def print_record(record):
+    print("%-12s %-12s %9.4f s %9d expanded %11d bytes  cost %s" % (
+        record['case'], record['variant'], record['time'], record['expanded'], record['peak_memory'], record['cost']))
+
+
+def write_report(records, path):
+    # The format is picked from the file extension
+    with open(path, 'w', newline='') as file:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(file, fieldnames=['case', 'variant', 'time', 'expanded', 'peak_memory', 'cost'])
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            json.dump(records, file, indent=2)
+
+
+def read_report(path):
+    with open(path, newline='') as file:
+        if not path.endswith('.csv'):
+            return json.load(file)
+        records = []
+        for row in csv.DictReader(file):
+            row['time'] = float(row['time'])
+            row['expanded'] = int(row['expanded'])
+            row['peak_memory'] = int(row['peak_memory'])
+            row['cost'] = int(row['cost']) if row['cost'] not in ('', 'None') else None
+            records.append(row)
+        return records
+
+
+def find_regressions(records, baseline, time_tolerance=0.5):
+    """
+    Compares a report with an earlier one. A run has regressed if it finds another path cost, expands more nodes, or
+    is more than time_tolerance slower. The runs of UNSTABLE_VARIANTS can only regress in time.
+    :return: list of messages, one per regression.
+    """
+    earlier = {(record['case'], record['variant']): record for record in baseline}
+    regressions = []
+    for record in records:
+        old = earlier.get((record['case'], record['variant']))
+        if old is None:
+            continue
+        name = record['case'] + ' ' + record['variant']
+        stable = record['variant'] not in UNSTABLE_VARIANTS
+        if stable and record['cost'] != old['cost']:
+            regressions.append(name + ': cost ' + str(old['cost']) + ' -> ' + str(record['cost']))
+        if stable and record['expanded'] > old['expanded']:
+            regressions.append(name + ': expanded ' + str(old['expanded']) + ' -> ' + str(record['expanded']))
+        if record['time'] > old['time'] * (1 + time_tolerance):
+            regressions.append(name + ': time %.4f s -> %.4f s' % (old['time'], record['time']))
+    return regressions
+
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description='Benchmark the search algorithms of Deliverable 2.')
+    parser.add_argument('--variants', nargs='+',
+                        default=[variant for variant in list(VARIANTS) + list(TASK_5_VARIANTS) +
+                                 list(MULTI_AGENT_VARIANTS) if variant not in UNSTABLE_VARIANTS],
+                        help='variants to run (default: all but %s)' % ', '.join(sorted(UNSTABLE_VARIANTS)))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[64, 128, 256, 512],
+                        help='sizes of the generated random and maze maps')
+    parser.add_argument('--agents', nargs='+', type=int, default=[],
+                        help='numbers of agents for the multi-agent variants on tasks 1-4, e.g. 10 20 40')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per query, the fastest is reported')
+    parser.add_argument('--output', help='write the report to this .json or .csv file')
+    parser.add_argument('--baseline', help='earlier .json or .csv report to check for regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help='how much slower than the baseline a run may be, 0.5 is 50%% (default)')
+    return parser.parse_args(arguments)
+
+
+def run(arguments):
+    options = parse_arguments(arguments)
+    records = run_benchmarks(options.variants, options.sizes, options.repeats, options.agents)
+    if options.output is not None:
+        write_report(records, options.output)
+    if options.baseline is not None:
+        regressions = find_regressions(records, read_report(options.baseline), options.time_tolerance)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
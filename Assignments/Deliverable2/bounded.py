@@ -0,0 +1,330 @@
+import heapq
+import itertools
+import math
+from search import NEIGHBOURS, SearchResult, manhattan_distance
+
+
+# Memory-bounded search (SMA*) for maps where A* would run out of memory. It works like A*, but never keeps more than
+# node_budget nodes. When it needs room for a new node it forgets the leaf of the search tree with the largest f cost.
+# The parent remembers the f cost of every forgotten child and is put back on the frontier with the smallest of them, so
+# if the search later comes back to that part of the map the parent is expanded again and makes the child again, and the
+# child gets back the f cost it had. Children never get a lower f cost than their parent (pathmax), so a part of the
+# tree that is made again is not searched more than it has to be. Besides the nodes, one byte per cell tells which
+# neighbour the cell was expanded from. Only that neighbour may make the cell again, which keeps the search from going
+# back over what it has forgotten. A larger budget means fewer re-expansions, a smaller one less memory. Once the budget
+# is smaller than the frontier of A* and the cells on the way back to the start, the re-expansions grow quickly. With a
+# consistent heuristic the path is the cheapest one, unless the budget is so small that the search had to give up on
+# paths that did not fit. Then it is the cheapest path that fitted, and the bound of the result is None.
+
+EXPANSIONS_PER_CELL = 100  # Expansions per cell of the map after which the search gives up, unless told otherwise
+
+
+class BoundedResult(SearchResult):
+
+    def __init__(self, path=None, cost=None, expanded=0, reexpanded=0, forgotten=0, peak_nodes=0):
+        SearchResult.__init__(self, path, cost, expanded)
+        self.reexpanded = reexpanded  # Expansions of cells that had been expanded before
+        self.forgotten = forgotten  # Nodes thrown away to stay within the budget
+        self.peak_nodes = peak_nodes
+
+    def __str__(self):
+        return SearchResult.__str__(self) + ", re-expanded: " + str(self.reexpanded) + \
+            ", forgotten: " + str(self.forgotten) + ", peak nodes: " + str(self.peak_nodes)
+
+
+class Node:
+    # A node of the search tree. Only the cells that are in the tree have a node, which is what bounds the memory.
+    __slots__ = ('g_cost', 'f_cost', 'key', 'parent', 'children', 'open', 'forgotten')
+
+    def __init__(self, g_cost, f_cost, parent):
+        self.g_cost = g_cost
+        self.f_cost = f_cost  # Lower bound on the cost of every path through the node
+        self.key = f_cost  # The f cost, or the smallest f cost of the forgotten children once it has been expanded
+        self.parent = parent
+        self.children = []  # Cells of the children in the tree, the node is a leaf when there are none
+        self.open = True
+        self.forgotten = None  # Dictionary from forgotten child to its f cost, None if there are none
+
+
+class BoundedSearch:
+
+    def __init__(self, int_map, start, goal, heuristic=manhattan_distance, node_budget=100000, max_expansions=None):
+        """
+        :param int_map: 2D numpy array with the cell costs
+        :param start: start position [row, column]
+        :param goal: goal position [row, column]
+        :param heuristic: function taking two positions and returning a consistent estimate of the cost between them
+        :param node_budget: largest number of nodes to keep at once
+        :param max_expansions: give up after this many expansions, None for EXPANSIONS_PER_CELL times the number of
+        cells. A budget that is much smaller than the frontier of A* makes the search forget and find the same nodes
+        over and over, for practically ever without a limit.
+        """
+        self.height, self.width = int_map.shape
+        self.costs = int_map
+        self.heuristic = heuristic
+        self.start = (start[0], start[1])
+        self.goal = (goal[0], goal[1])
+        self.node_budget = node_budget
+        self.max_expansions = max_expansions if max_expansions is not None else \
+            EXPANSIONS_PER_CELL * self.height * self.width
+        self.out_of_memory = False  # True once a path was cut short because it did not fit in the budget
+        self.nodes = {}
+        # Among nodes with the same key, the deepest one is expanded first and the shallowest one is forgotten first
+        self.frontier = []  # Min-heap of (key, -g cost, tie breaker, cell) of the open nodes
+        self.leaves = []  # Max-heap of (-key, g cost, tie breaker, cell) of the leaves, the candidates for forgetting
+        self.tie_breaker = itertools.count()
+        # One byte per cell telling which neighbour it was first expanded from, 0 if it has never been expanded, see
+        # may_generate
+        self.expanded_from = bytearray(self.height * self.width)
+        self.expanded = 0
+        self.reexpanded = 0
+        self.forgotten = 0
+        self.peak_nodes = 0
+
+    def count_expansion(self, pos, node):
+        index = pos[0] * self.width + pos[1]
+        self.expanded += 1
+        if self.expanded_from[index]:
+            self.reexpanded += 1
+        else:
+            self.set_expanded_from(pos, node.parent)
+
+    def set_expanded_from(self, pos, parent_pos):
+        # The number of the step in NEIGHBOURS from the parent to the cell plus one, or 5 for the start
+        step = len(NEIGHBOURS) if parent_pos is None else NEIGHBOURS.index((pos[0] - parent_pos[0],
+                                                                             pos[1] - parent_pos[1]))
+        self.expanded_from[pos[0] * self.width + pos[1]] = step + 1
+
+    def may_generate(self, pos, step):
+        """
+        Tells if a cell that is not in the tree may be made again by taking a step from a neighbour. A cell is expanded
+        with its cheapest g cost, so once it has been expanded, a path to it through any other neighbour costs more.
+        Only the neighbour it was expanded from may make it again, otherwise the search would go back over the part
+        of the map it has already searched every time it forgets that part.
+        :param step: index in NEIGHBOURS of the step from the neighbour to the cell
+        """
+        expanded_from = self.expanded_from[pos[0] * self.width + pos[1]]
+        return expanded_from == 0 or expanded_from == step + 1
+
+    def push_open(self, pos, node):
+        node.open = True
+        heapq.heappush(self.frontier, (node.key, -node.g_cost, next(self.tie_breaker), pos))
+        if len(self.frontier) > 2 * len(self.nodes) + 64:
+            self.compact()
+
+    def push_leaf(self, pos, node):
+        heapq.heappush(self.leaves, (-node.key, node.g_cost, next(self.tie_breaker), pos))
+        if len(self.leaves) > 2 * len(self.nodes) + 64:
+            self.compact()
+
+    def compact(self):
+        # Out of date entries are only thrown away when they reach the top of a heap, so they would pile up and take
+        # more memory than the nodes themselves. Every now and then the heaps are rebuilt with the valid entries.
+        def valid(pos, key, g_cost):
+            node = self.nodes.get(pos)
+            return node is not None and node.key == key and node.g_cost == g_cost
+        self.frontier = [entry for entry in self.frontier
+                         if valid(entry[3], entry[0], -entry[1]) and self.nodes[entry[3]].open]
+        self.leaves = [entry for entry in self.leaves
+                       if valid(entry[3], -entry[0], entry[1]) and not self.nodes[entry[3]].children]
+        heapq.heapify(self.frontier)
+        heapq.heapify(self.leaves)
+
+    def worst_leaf(self, keep):
+        """
+        Finds the leaf with the largest key, leaving it in the heap.
+        :param keep: cell that must not be forgotten, the one being expanded
+        :return: the position of the leaf, or None if there is no leaf that can be forgotten.
+        """
+        skipped = []
+        worst = None
+        while self.leaves:
+            entry = self.leaves[0]
+            pos = entry[3]
+            node = self.nodes.get(pos)
+            # Entries are left in the heap when a node changes, so the ones that are out of date are thrown away here
+            if node is None or node.children or -entry[0] != node.key or entry[1] != node.g_cost:
+                heapq.heappop(self.leaves)
+            elif pos == keep or pos == self.start:
+                skipped.append(heapq.heappop(self.leaves))
+            else:
+                worst = pos
+                break
+        for entry in skipped:
+            heapq.heappush(self.leaves, entry)
+        return worst
+
+    def forget(self, pos, keep):
+        # Throws away a leaf and lets its parent remember what it lost
+        node = self.nodes.pop(pos)
+        self.forgotten += 1
+        parent_pos = node.parent
+        parent = self.nodes[parent_pos]
+        parent.children.remove(pos)
+        if parent.forgotten is None:
+            parent.forgotten = {}
+        parent.forgotten[pos] = node.key
+        if parent_pos != keep and node.key != math.inf and (not parent.open or node.key < parent.key):
+            # The parent has to be expanded again to get back to the forgotten part of the tree
+            parent.key = min(parent.key, node.key) if parent.open else node.key
+            self.push_open(parent_pos, parent)
+        if not parent.children:
+            self.push_leaf(parent_pos, parent)
+
+    def move_subtree(self, pos, parent_pos, g_cost):
+        """
+        Moves a node over to a parent it gets to more cheaply from. Every cost below it, also the ones its nodes
+        remember of their forgotten children, goes down by as much, so what was found there is still right.
+        """
+        node = self.nodes[pos]
+        old_parent = self.nodes[node.parent]
+        old_parent.children.remove(pos)
+        if not old_parent.children:
+            self.push_leaf(node.parent, old_parent)
+        node.parent = parent_pos
+        self.nodes[parent_pos].children.append(pos)
+        saved = node.g_cost - g_cost
+        below = [pos]
+        while below:
+            below_pos = below.pop()
+            below_node = self.nodes[below_pos]
+            below_node.g_cost -= saved
+            below_node.f_cost -= saved
+            below_node.key -= saved
+            if below_node.forgotten is not None:
+                below_node.forgotten = {child: key - saved for child, key in below_node.forgotten.items()}
+            # The entries in the heaps have the old costs, so the node gets new ones
+            if below_node.open:
+                self.push_open(below_pos, below_node)
+            if not below_node.children:
+                self.push_leaf(below_pos, below_node)
+            below.extend(below_node.children)
+
+    def expand(self, pos, node):
+        """
+        Makes the children of a node, forgetting other nodes when the budget is used up.
+        :return: False if the budget is too small to go on.
+        """
+        key = node.key
+        remembered = node.forgotten or {}
+        forgotten = {}  # The children that do not fit this time
+        node.open = False
+        node.forgotten = None
+        self.count_expansion(pos, node)
+        stored = False
+        for step, (i, j) in enumerate(NEIGHBOURS):
+            row, col = pos[0] + i, pos[1] + j
+            if not (0 <= row < self.height and 0 <= col < self.width):
+                continue
+            cell_cost = int(self.costs[row, col])
+            if cell_cost == -1:
+                continue
+            child_pos = (row, col)
+            child_g_cost = node.g_cost + cell_cost
+            child = self.nodes.get(child_pos)
+            if child is not None:
+                if child.g_cost <= child_g_cost or child_pos == self.start:
+                    continue
+                # A cheaper way to a cell in the tree, it moves over to this node with everything below it
+                self.move_subtree(child_pos, pos, child_g_cost)
+                if self.expanded_from[row * self.width + col]:
+                    self.set_expanded_from(child_pos, pos)
+                stored = True
+                continue
+            if not self.may_generate(child_pos, step):
+                continue
+
+            # No path through the child costs less than a path through this node (pathmax). A child that was
+            # forgotten before also gets back the f cost it had then, which tells how far it had already been
+            # searched. It was found from this node with the same g cost, since the remembered costs move along with
+            # the g cost of the node.
+            child_key = max(node.f_cost, remembered.get(child_pos, 0),
+                            child_g_cost + self.heuristic(child_pos, self.goal))
+            if child_key == math.inf:
+                forgotten[child_pos] = math.inf
+                continue
+            if len(self.nodes) >= self.node_budget:
+                worst = self.worst_leaf(pos)
+                if worst is None:
+                    # The whole budget is used by the path to this node, so there is no way to go deeper from here
+                    self.out_of_memory = True
+                    forgotten[child_pos] = math.inf
+                    continue
+                if (self.nodes[worst].key, -self.nodes[worst].g_cost) <= (child_key, -child_g_cost):
+                    # The new child is the least promising node, so it is forgotten right away
+                    forgotten[child_pos] = child_key
+                    continue
+                self.forget(worst, pos)
+            child = Node(child_g_cost, child_key, pos)
+            self.nodes[child_pos] = child
+            node.children.append(child_pos)
+            stored = True
+            self.push_open(child_pos, child)
+            self.push_leaf(child_pos, child)
+        self.peak_nodes = max(self.peak_nodes, len(self.nodes))
+
+        # Children that were forgotten while this node was expanded are in the dictionary already
+        if node.forgotten is not None:
+            forgotten.update(node.forgotten)
+        node.forgotten = forgotten or None
+        # From now on the key tells how far the node has to be expanded again for its forgotten children
+        node.key = min(forgotten.values(), default=math.inf)
+        if not stored and node.key <= key:
+            # Nothing fitted, and the node would be expanded again right away with the same result
+            return False
+        if node.key != math.inf:
+            self.push_open(pos, node)
+        if not node.children:
+            self.push_leaf(pos, node)
+        return True
+
+    def search(self):
+        """
+        :return: a BoundedResult with the cheapest path, its cost and the counters. The path is None if the goal
+        cannot be reached, if the budget is too small to hold a path to it or if it ran out of expansions, and then
+        the bound is None as well.
+        """
+        if self.costs[self.start] == -1 or self.costs[self.goal] == -1:
+            return self.failure()
+        h_cost = self.heuristic(self.start, self.goal)
+        if h_cost == math.inf:
+            return self.failure()
+        self.nodes[self.start] = Node(0, h_cost, None)
+        self.push_open(self.start, self.nodes[self.start])
+
+        while self.frontier:
+            key, negative_g_cost, _, pos = heapq.heappop(self.frontier)
+            node = self.nodes.get(pos)
+            if node is None or not node.open or key != node.key or -negative_g_cost != node.g_cost:
+                continue
+            if pos == self.goal:
+                result = BoundedResult(self.path_to(pos), int(node.g_cost), self.expanded, self.reexpanded,
+                                       self.forgotten, self.peak_nodes)
+                if self.out_of_memory:
+                    result.bound = None  # A cheaper path might not have fitted
+                return result
+            if self.expanded == self.max_expansions or not self.expand(pos, node):
+                break
+        return self.failure()
+
+    def failure(self):
+        result = BoundedResult(None, None, self.expanded, self.reexpanded, self.forgotten, self.peak_nodes)
+        result.bound = None
+        return result
+
+    def path_to(self, pos):
+        # Every node on the way back to the start has a child, so none of them can have been forgotten
+        path = []
+        while pos is not None:
+            path.append([pos[0], pos[1]])
+            pos = self.nodes[pos].parent
+        path.reverse()
+        return path
+
+
+def bounded_search(int_map, start, goal, heuristic=manhattan_distance, node_budget=100000, max_expansions=None):
+    """
+    Finds the cheapest path from start to goal while keeping at most node_budget nodes, see BoundedSearch.
+    :return: a BoundedResult with the path, its cost, and the expanded and re-expanded nodes.
+    """
+    return BoundedSearch(int_map, start, goal, heuristic, node_budget, max_expansions).search()
@@ -0,0 +1,623 @@
+import heapq
+import itertools
+import numpy as np
+from fields import FieldCache, dijkstra_field
+from search import NEIGHBOURS, SearchResult
+
+
+# Paths for several agents moving through the same map at once (multi-agent path finding). Time goes in ticks, and in
+# each tick every agent moves to a neighbour or waits. Two agents may not be in the same cell at the same tick, or swap
+# cells in the same tick, and an agent stays in its goal cell once it is done. Spending a tick in a cell costs the
+# value of the cell, both when moving into it and when waiting in it, and we look for the lowest total cost.
+#
+# Conflict-based search (CBS) plans every agent on its own first. When two paths collide it tries both ways of solving
+# the collision, forbidding one agent or the other to be there at that tick, and replans that agent. The solutions are
+# searched best first by total cost, so the first one without collisions is the cheapest. The single agent searches
+# are A* over (cell, tick), and among equally cheap paths they pick the one that collides the least with the paths the
+# other agents have now. Collisions in corridors and with agents that are done are split in a way that solves them in
+# one go instead of one tick at a time, which the narrow corridors of the Samfundet maps need badly.
+#
+# With start and goal cells picked anywhere, agents on the Samfundet maps have to get past each other's starts and goals
+# in corridors one cell wide. From about 30 agents on, some sets of agents have no solution at all, for example when the
+# goals of two agents are each on the only way to the goal of the other, and the rest were out of reach for every
+# planner here. random_agents therefore picks agents that can all get to their goals without going through the start
+# or goal of another agent. On such agents, with 1000
+# constraint tree nodes, optimal CBS (a weight of 1) solves 20 agents on task 1 but not 30, because of the many equally
+# cheap orders in which agents can wait for each other at the junctions. Enhanced CBS (ECBS) with a weight of
+# ECBS_WEIGHT solves 40 agents on each of tasks 1-4 in 1-3 seconds, at a total cost 12-17% below that of
+# prioritized_planning. prioritized_planning always finds a solution for such agents, and plans 60 agents on each of
+# tasks 1-4 in about 2 seconds. benchmark.py --agents prints the numbers.
+
+ECBS_WEIGHT = 1.5  # Weight that lets CBS handle a useful number of agents, see above
+
+class ReservationTable:
+    """
+    Cells and moves taken at given ticks. Used both for the constraints of an agent in CBS and for the paths of the
+    other agents. Cells are flat indices row * width + column.
+    """
+
+    def __init__(self):
+        self.cells = {}  # (cell, tick) -> number of reservations
+        self.moves = {}  # (from cell, to cell, tick) of moves that collide with a reservation -> number of them
+        self.resting = {}  # cell -> tick from which an agent that is done stays there
+        self.latest = {}  # cell -> last tick the cell is reserved at
+        self.horizon = -1  # Last tick with a reservation, nothing changes after it except for the resting agents
+
+    def add_cell(self, cell, tick):
+        self.cells[(cell, tick)] = self.cells.get((cell, tick), 0) + 1
+        self.latest[cell] = max(self.latest.get(cell, -1), tick)
+        self.horizon = max(self.horizon, tick)
+
+    def add_move(self, from_cell, to_cell, tick):
+        self.moves[(from_cell, to_cell, tick)] = self.moves.get((from_cell, to_cell, tick), 0) + 1
+        self.horizon = max(self.horizon, tick)
+
+    def add_rest(self, cell, tick):
+        # The cell is taken from the tick on, for good
+        self.resting[cell] = min(self.resting.get(cell, tick), tick)
+        self.horizon = max(self.horizon, tick)
+
+    def add_finish(self, cell, tick):
+        # An agent may not be done in the cell before the tick after this one, but it may pass through it
+        self.latest[cell] = max(self.latest.get(cell, -1), tick)
+        self.horizon = max(self.horizon, tick)
+
+    def add_path(self, path):
+        """
+        Reserves the cells of a path, given as a list of cells with one per tick, and the agent resting at its end.
+        """
+        for tick, cell in enumerate(path):
+            self.add_cell(cell, tick)
+            if tick > 0 and path[tick - 1] != cell:
+                self.add_move(cell, path[tick - 1], tick)  # Another agent may not go the opposite way at this tick
+        end = len(path) - 1
+        self.resting[path[end]] = min(self.resting.get(path[end], end), end)
+
+    def conflicts(self, from_cell, to_cell, tick):
+        # Number of reservations that moving from one cell to another at the tick collides with
+        count = self.cells.get((to_cell, tick), 0) + self.moves.get((from_cell, to_cell, tick), 0)
+        if to_cell in self.resting and tick >= self.resting[to_cell]:
+            count += 1
+        return count
+
+    def free_after(self, cell):
+        # First tick from which an agent can stay in the cell for good, None if another agent rests there
+        if cell in self.resting:
+            return None
+        return self.latest.get(cell, -1) + 1
+
+
+def space_time_astar(int_map, start, goal, distance, constraints=None, avoid=None, weight=1.0):
+    """
+    Finds a path for one agent that keeps to the constraints. With a weight of 1 it is the cheapest path, and of the
+    cheapest paths the one with the fewest collisions. With a larger weight it is a focal search: every path costing at
+    most weight times the cheapest one is allowed, and the one with the fewest collisions is preferred.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column]
+    :param goal: goal position [row, column]
+    :param distance: DistanceField with the cost from every cell to the goal, used as the heuristic
+    :param constraints: ReservationTable with what the agent may not do, or None
+    :param avoid: ReservationTable with the paths of the other agents, or None
+    :param weight: how many times more than the cheapest path the path may cost
+    :return: a SearchResult with one position per tick, the cost of the path, the number of expanded states and how
+    many times more than the cheapest path it costs at most.
+    """
+    height, width = int_map.shape
+    costs = int_map.ravel().tolist()
+    distances = distance.field.ravel().tolist()
+    start_index = start[0] * width + start[1]
+    goal_index = goal[0] * width + goal[1]
+    constraints = constraints if constraints is not None else ReservationTable()
+    free_after = constraints.free_after(goal_index)
+    if costs[start_index] == -1 or distances[start_index] == float('inf') or free_after is None:
+        return SearchResult(None, None, 0)
+    # After the last reservation, the tick no longer matters and all later ticks are the same state
+    horizon = max(constraints.horizon, avoid.horizon if avoid is not None else -1) + 1
+
+    tie_breaker = itertools.count()
+    h_cost = int(distances[start_index])
+    # Entries are (f cost, collisions, h cost, tie breaker, cell, tick, g cost, state we came from). Every entry is in
+    # by_f_cost, which gives the lower bound, and is moved from waiting to focal once its f cost is within the bound.
+    entry = (h_cost, 0, h_cost, next(tie_breaker), start_index, 0, 0, None)
+    by_f_cost = [entry]
+    waiting = []
+    focal = [(0, h_cost, h_cost, entry[3], entry)]
+    parents = {}
+    closed = set()
+    expanded = 0
+
+    while True:
+        # The smallest f cost of the states that are still open
+        while by_f_cost and (by_f_cost[0][4], min(by_f_cost[0][5], horizon)) in closed:
+            heapq.heappop(by_f_cost)
+        if not by_f_cost:
+            return SearchResult(None, None, expanded)
+        lowest = by_f_cost[0][0]
+        while waiting and waiting[0][0] <= weight * lowest:
+            entry = heapq.heappop(waiting)
+            heapq.heappush(focal, (entry[1], entry[0], entry[2], entry[3], entry))
+
+        _, _, _, _, entry = heapq.heappop(focal)
+        _, collisions, _, _, index, tick, g_cost, parent = entry
+        if (index, min(tick, horizon)) in closed:
+            continue
+        closed.add((index, min(tick, horizon)))
+        parents[(index, tick)] = parent
+        expanded += 1
+        if index == goal_index and tick >= free_after:
+            path = []
+            key = (index, tick)
+            while key is not None:
+                path.append(list(divmod(key[0], width)))
+                key = parents[key]
+            path.reverse()
+            return SearchResult(path, g_cost, expanded, g_cost / lowest if lowest else 1.0)
+
+        row, col = divmod(index, width)
+        for i, j in NEIGHBOURS + ((0, 0),):
+            if not (0 <= row + i < height and 0 <= col + j < width):
+                continue
+            child = index + i * width + j
+            cell_cost = costs[child]
+            if cell_cost == -1 or (child, min(tick + 1, horizon)) in closed or \
+                    constraints.conflicts(index, child, tick + 1):
+                continue
+            h_cost = distances[child]
+            if h_cost == float('inf'):
+                continue
+            h_cost = int(h_cost)
+            child_collisions = collisions + (avoid.conflicts(index, child, tick + 1) if avoid is not None else 0)
+            f_cost = g_cost + cell_cost + h_cost
+            entry = (f_cost, child_collisions, h_cost, next(tie_breaker), child, tick + 1, g_cost + cell_cost,
+                     (index, tick))
+            heapq.heappush(by_f_cost, entry)
+            if f_cost <= weight * lowest:
+                heapq.heappush(focal, (child_collisions, f_cost, h_cost, entry[3], entry))
+            else:
+                heapq.heappush(waiting, entry)
+
+
+class MultiAgentResult:
+
+    def __init__(self, paths=None, expanded=0, nodes=0):
+        self.paths = paths  # One path per agent with one position per tick, None if no solution was found
+        self.costs = None
+        self.cost = None  # Sum of the path costs
+        self.expanded = expanded  # States expanded by the single agent searches
+        self.nodes = nodes  # Constraint tree nodes expanded, for CBS
+        self.bound = 1.0  # The total cost is at most this many times the lowest one, None if unknown
+
+    def found(self):
+        return self.paths is not None
+
+    def __str__(self):
+        return "cost: " + str(self.cost) + ", expanded: " + str(self.expanded) + ", nodes: " + str(self.nodes)
+
+
+def find_conflicts(paths):
+    """
+    :param paths: list of paths with one flat cell index per tick
+    :return: the number of collisions between the paths and the first one, as (kind, tick, first agent, second agent,
+    cell, other cell). The kind is 'vertex' when both agents are in the same cell, 'target' when the first agent is
+    already done in that cell, and 'edge' when they swap cells, then other cell is the cell the first agent comes from.
+    The first collision is None if there are no collisions.
+    """
+    count = 0
+    first = None
+    length = max(len(path) for path in paths)
+    for tick in range(length):
+        cells = {}
+        for agent, path in enumerate(paths):
+            cell = path[min(tick, len(path) - 1)]
+            if cell in cells:
+                count += 1
+                if first is None:
+                    other = cells[cell]
+                    if tick >= len(path) - 1:
+                        first = ('target', tick, agent, other, cell, None)
+                    elif tick >= len(paths[other]) - 1:
+                        first = ('target', tick, other, agent, cell, None)
+                    else:
+                        first = ('vertex', tick, other, agent, cell, None)
+            else:
+                cells[cell] = agent
+            if 0 < tick < len(path):
+                # Another agent moving the opposite way in the same tick
+                previous = path[tick - 1]
+                other = cells.get(previous)
+                if other is not None and other != agent and previous != cell:
+                    other_path = paths[other]
+                    if tick < len(other_path) and other_path[tick - 1] == cell:
+                        count += 1
+                        first = first or ('edge', tick, agent, other, cell, previous)
+    return count, first
+
+
+class ConflictBasedSearch:
+
+    def __init__(self, int_map, agents, weight=1.0, max_nodes=10000):
+        """
+        :param int_map: 2D numpy array with the cell costs
+        :param agents: list of (start, goal) positions, one per agent
+        :param weight: how many times more than the cheapest solution the solution may cost. With a weight above 1
+        this is enhanced CBS (ECBS), which prefers solutions with fewer collisions and scales to many more agents.
+        :param max_nodes: give up after expanding this many constraint tree nodes
+        """
+        self.int_map = int_map
+        self.width = int_map.shape[1]
+        self.agents = agents
+        self.weight = weight
+        self.max_nodes = max_nodes
+        self.fields = FieldCache(int_map, max_size=max(16, len(agents)))
+        # Number of ticks from the start of an agent to every cell, used to reason about corridors
+        self.unit_map = np.where(int_map == -1, -1, 1)
+        self.ticks = FieldCache(self.unit_map, max_size=max(16, len(agents)))
+        free = np.pad(int_map != -1, 1)
+        height = int_map.shape[0]
+        self.free_neighbours = (sum(free[1 + i:1 + i + height, 1 + j:1 + j + self.width] for i, j in NEIGHBOURS)
+                                * (int_map != -1)).ravel().tolist()
+        self.expanded = 0
+        # Frontier of the constraint tree, see push_node
+        self.by_lower_bound = []
+        self.waiting = []
+        self.focal = []
+
+    def to_cells(self, path):
+        return [pos[0] * self.width + pos[1] for pos in path]
+
+    def plan_agent(self, agent, constraints, paths):
+        # Plans one agent, avoiding the current paths of the others as far as the weight allows
+        start, goal = self.agents[agent]
+        avoid = ReservationTable()
+        for other, path in enumerate(paths):
+            if other != agent and path is not None:
+                avoid.add_path(path)
+        result = space_time_astar(self.int_map, start, goal, self.fields.get([goal], reverse=True), constraints, avoid,
+                                  self.weight)
+        self.expanded += result.expanded
+        return result
+
+    def constraints_for(self, node, agent):
+        # The constraints of a node are stored as a chain back to the root, so they are collected here
+        constraints = ReservationTable()
+        while node is not None:
+            if node['agent'] == agent:
+                for kind, cell, other_cell, tick in node['constraints']:
+                    if kind == 'cell':
+                        constraints.add_cell(cell, tick)
+                    elif kind == 'move':
+                        constraints.add_move(other_cell, cell, tick)
+                    elif kind == 'rest':
+                        constraints.add_rest(cell, tick)
+                    elif kind == 'finish':
+                        constraints.add_finish(cell, tick)
+                    else:  # 'range', not in the cell at any tick up to this one
+                        for earlier in range(tick + 1):
+                            constraints.add_cell(cell, earlier)
+            node = node['parent']
+        return constraints
+
+    def corridor(self, cell):
+        """
+        Follows the cells with two free neighbours on both sides of a cell.
+        :return: the cells of the corridor in order and the cells at its two ends, or None if the cell is not in a
+        corridor.
+        """
+        if self.free_neighbours[cell] != 2:
+            return None
+        height = self.int_map.shape[0]
+        sides = []
+        ends = []
+        for i, j in NEIGHBOURS:
+            row, col = divmod(cell, self.width)
+            if not (0 <= row + i < height and 0 <= col + j < self.width) or \
+                    self.free_neighbours[cell + i * self.width + j] == 0:
+                continue
+            side = []
+            previous, current = cell, cell + i * self.width + j
+            while self.free_neighbours[current] == 2 and current != cell:
+                side.append(current)
+                row, col = divmod(current, self.width)
+                for k, m in NEIGHBOURS:
+                    following = current + k * self.width + m
+                    if 0 <= row + k < height and 0 <= col + m < self.width and following != previous and \
+                            self.free_neighbours[following] > 0:
+                        break
+                previous, current = current, following
+            if current == cell:
+                return None  # The corridor is a ring
+            sides.append(side)
+            ends.append(current)
+        return sides[0][::-1] + [cell] + sides[1], ends[0], ends[1]
+
+    @staticmethod
+    def crossing(path, tick, corridor):
+        """
+        Finds out which way an agent goes through a corridor when it is in it at the tick. Positions along the corridor
+        are indices in its list of cells, with -1 and the length of the list for the two ends.
+        :return: the position it comes in at, which is where it starts if it starts in the corridor, and the position
+        it leaves at, which is its goal if it is done in the corridor. None if it turns back.
+        """
+        cells, first_end, second_end = corridor
+        tick = min(tick, len(path) - 1)
+        if path[tick] not in cells:
+            return None
+        before, after = tick, tick
+        while before >= 0 and path[before] in cells:
+            before -= 1
+        while after < len(path) and path[after] in cells:
+            after += 1
+        ends = {first_end: -1, second_end: len(cells)}
+        entry = ends[path[before]] if before >= 0 else cells.index(path[0])
+        exit = ends[path[after]] if after < len(path) else cells.index(path[-1])
+        return (entry, exit) if entry != exit else None
+
+    def split(self, node):
+        """
+        Decides how to split a node on its first collision.
+        :return: two (agent, list of constraints) pairs, one for each child. Every solution without collisions keeps
+        to the constraints of at least one of the children.
+        """
+        kind, tick, first, second, cell, other_cell = node['conflict']
+        if kind == 'target':
+            # Either the first agent is done later, or the second agent never comes back to the cell
+            return (first, [('finish', cell, None, tick)]), (second, [('rest', cell, None, tick)])
+
+        # Two agents meeting head on in a corridor would be split one tick at a time, over and over, until one of them
+        # waits for the other to come out. Instead, one child lets the first agent through first and the other the
+        # second agent.
+        corridor = self.corridor(cell)
+        if corridor is None and other_cell is not None:
+            corridor = self.corridor(other_cell)
+        if corridor is not None:
+            cells = corridor[0]
+            paths = node['paths']
+            first_way = self.crossing(paths[first], tick, corridor)
+            second_way = self.crossing(paths[second], tick, corridor)
+            if first_way is not None and second_way is not None and \
+                    (first_way[0] < first_way[1]) != (second_way[0] < second_way[1]):
+                # Both agents go through the part of the corridor between low and high, in opposite directions
+                up, down = (first, second) if first_way[0] < first_way[1] else (second, first)
+                up_way, down_way = (first_way, second_way) if up == first else (second_way, first_way)
+                low, high = max(up_way[0], down_way[1]), min(up_way[1], down_way[0])
+            else:
+                low, high = 0, -1
+            # When the parts of the corridor the two agents go through do not overlap, there is no lane to split on
+            if low <= high:
+                inside = cells[low + 1:high]
+                at = {-1: corridor[1], len(cells): corridor[2]}
+                lanes = [at[position] if position in at else cells[position] for position in range(low, high + 1)]
+                children = []
+                for agent, lane, other in ((up, lanes, down), (down, lanes[::-1], up)):
+                    # If the other agent goes through first, it gets out at the start of the lane at the earliest at
+                    # the tick it can get there, and the agent is then one tick behind it for every cell of the lane.
+                    # Unless the agent goes around to the end of the lane.
+                    around_map = self.unit_map.copy()
+                    around_map.ravel()[inside] = -1
+                    around = dijkstra_field(around_map, [self.agents[agent][0]]).ravel()[lane[-1]]
+                    start, goal = self.agents[other]
+                    if lane[0] == goal[0] * self.width + goal[1]:
+                        # The other agent stays at the start of the lane for good, so the agent has to go around
+                        constraints = [('rest', lane_cell, None, 0) for lane_cell in lane[1:-1]]
+                        constraints.append(('range', lane[-1], None, int(around - 1)) if around != float('inf')
+                                           else ('rest', lane[-1], None, 0))
+                    else:
+                        earliest = int(self.ticks.get([start]).field.ravel()[lane[0]])
+                        constraints = [('range', lane_cell, None, earliest + distance - 1)
+                                       for distance, lane_cell in enumerate(lane[1:-1], 1)]
+                        constraints.append(('range', lane[-1], None, int(min(earliest + len(lane) - 2, around - 1))))
+                    children.append((agent, [constraint for constraint in constraints if constraint[3] >= 0]))
+                # The paths have to break a constraint of both children, or the children would not get anywhere
+                if all(any(where in (paths[agent][when:] if what == 'rest' else paths[agent][:when + 1])
+                           for what, where, _, when in constraints) for agent, constraints in children):
+                    return children
+        if kind == 'edge':
+            return (first, [('move', cell, other_cell, tick)]), (second, [('move', other_cell, cell, tick)])
+        return (first, [('cell', cell, None, tick)]), (second, [('cell', cell, None, tick)])
+
+    def set_path(self, node, agent, result):
+        node['paths'][agent] = self.to_cells(result.path)
+        node['costs'][agent] = result.cost
+        node['lower_bounds'][agent] = result.cost / result.bound
+
+    def push_node(self, node):
+        # Every open node is in by_lower_bound, which gives the lowest lower bound, and is moved from waiting to focal
+        # once its cost is within weight times that bound. Closed nodes are skipped when they come up.
+        node['open'] = True
+        heapq.heappush(self.by_lower_bound, (sum(node['lower_bounds']), node['number'], node))
+        heapq.heappush(self.waiting, (sum(node['costs']), node['number'], node))
+
+    def pick_node(self):
+        """
+        Takes the next node to expand out of the frontier. Of the nodes that cost at most weight times the lowest
+        lower bound, the one with the fewest collisions is picked.
+        :return: the node and the lowest lower bound, or None and None if the frontier is empty.
+        """
+        while self.by_lower_bound and not self.by_lower_bound[0][2]['open']:
+            heapq.heappop(self.by_lower_bound)
+        if not self.by_lower_bound:
+            return None, None
+        lowest = self.by_lower_bound[0][0]
+        limit = self.weight * lowest + 1e-9
+        while self.waiting and self.waiting[0][0] <= limit:
+            cost, number, node = heapq.heappop(self.waiting)
+            if node['open']:
+                heapq.heappush(self.focal, (node['collisions'], cost, number, node))
+        while True:
+            collisions, cost, number, node = heapq.heappop(self.focal)
+            if not node['open']:
+                continue
+            if cost > limit:
+                # The lowest lower bound went down since the node was moved, it has to wait again
+                heapq.heappush(self.waiting, (cost, number, node))
+                continue
+            node['open'] = False
+            return node, lowest
+
+    def search(self):
+        """
+        :return: a MultiAgentResult with the paths without collisions. With a weight of 1 they have the lowest total
+        cost, otherwise the total cost is at most weight times the lowest.
+        """
+        count = len(self.agents)
+        numbers = itertools.count()
+        root = {'parent': None, 'agent': None, 'constraints': None, 'number': next(numbers),
+                'paths': [None] * count, 'costs': [0] * count, 'lower_bounds': [0] * count}
+        for agent in range(count):
+            result = self.plan_agent(agent, None, root['paths'])
+            if not result.found():
+                return MultiAgentResult(None, self.expanded)
+            self.set_path(root, agent, result)
+        root['collisions'], root['conflict'] = find_conflicts(root['paths'])
+        self.push_node(root)
+        nodes = 0
+
+        while nodes < self.max_nodes:
+            node, lowest = self.pick_node()
+            if node is None:
+                break
+            nodes += 1
+            if node['conflict'] is None:
+                result = MultiAgentResult([[list(divmod(cell, self.width)) for cell in path]
+                                           for path in node['paths']], self.expanded, nodes)
+                result.costs = node['costs']
+                result.cost = sum(node['costs'])
+                result.bound = result.cost / lowest if lowest else 1.0
+                return result
+
+            children = []
+            for agent, constraints in self.split(node):
+                child = {'parent': node, 'agent': agent, 'constraints': constraints, 'number': next(numbers),
+                         'paths': list(node['paths']), 'costs': list(node['costs']),
+                         'lower_bounds': list(node['lower_bounds'])}
+                result = self.plan_agent(agent, self.constraints_for(child, agent), node['paths'])
+                if not result.found():
+                    continue
+                self.set_path(child, agent, result)
+                child['collisions'], child['conflict'] = find_conflicts(child['paths'])
+                if child['collisions'] < node['collisions'] and sum(child['costs']) <= sum(node['costs']):
+                    # The new path is no more expensive and collides less, so the node takes it over instead of
+                    # splitting (a bypass). It keeps to the constraints of the node, which are fewer.
+                    node['paths'], node['costs'] = child['paths'], child['costs']
+                    node['collisions'], node['conflict'] = child['collisions'], child['conflict']
+                    children = [node]
+                    break
+                children.append(child)
+            for child in children:
+                self.push_node(child)
+
+        return MultiAgentResult(None, self.expanded, nodes)
+
+
+def conflict_based_search(int_map, agents, weight=1.0, max_nodes=10000):
+    """
+    Finds paths without collisions for all the agents, see ConflictBasedSearch. With the default weight of 1 it gives
+    up beyond about 20 agents, use ECBS_WEIGHT or prioritized_planning for more, see the top of this file.
+    :return: a MultiAgentResult.
+    """
+    return ConflictBasedSearch(int_map, agents, weight, max_nodes).search()
+
+
+def prioritized_planning(int_map, agents):
+    """
+    Plans the agents one at a time, each one keeping out of the way of the ones before it and out of the start cells of
+    the ones after it. Much faster than CBS, but the total cost can be higher. It always finds a solution if every
+    agent can get from its start to its goal without going through the start or goal of another agent, which is how
+    random_agents picks them, and can fail to find one otherwise.
+    :return: a MultiAgentResult.
+    """
+    width = int_map.shape[1]
+    fields = FieldCache(int_map, max_size=max(16, len(agents)))
+    reserved = ReservationTable()
+    for start, goal in agents[1:]:
+        reserved.add_rest(start[0] * width + start[1], 0)
+    paths = []
+    costs = []
+    expanded = 0
+    for start, goal in agents:
+        reserved.resting.pop(start[0] * width + start[1], None)  # The agent may now leave its start cell
+        result = space_time_astar(int_map, start, goal, fields.get([goal], reverse=True), reserved)
+        expanded += result.expanded
+        if not result.found():
+            return MultiAgentResult(None, expanded)
+        paths.append(result.path)
+        costs.append(result.cost)
+        reserved.add_path([pos[0] * width + pos[1] for pos in result.path])
+    result = MultiAgentResult(paths, expanded)
+    result.costs = costs
+    result.cost = sum(costs)
+    result.bound = None
+    return result
+
+
+def free_regions(int_map, blocked):
+    """
+    Labels the parts of the map that agents can move between without going through a blocked cell.
+    :param int_map: 2D numpy array with the cell costs
+    :param blocked: set of flat cell indices that cannot be passed
+    :return: list with the number of the part of every cell, -1 for walls and blocked cells.
+    """
+    height, width = int_map.shape
+    costs = int_map.ravel().tolist()
+    labels = [-1] * (height * width)
+    count = 0
+    for cell in range(height * width):
+        if costs[cell] == -1 or cell in blocked or labels[cell] != -1:
+            continue
+        labels[cell] = count
+        stack = [cell]
+        while stack:
+            index = stack.pop()
+            row, col = divmod(index, width)
+            for i, j in NEIGHBOURS:
+                neighbour = index + i * width + j
+                if 0 <= row + i < height and 0 <= col + j < width and costs[neighbour] != -1 and \
+                        neighbour not in blocked and labels[neighbour] == -1:
+                    labels[neighbour] = count
+                    stack.append(neighbour)
+        count += 1
+    return labels
+
+
+def random_agents(int_map, count, seed=None):
+    """
+    Picks start and goal cells for a number of agents, so that every agent can get from its start to its goal without
+    going through the start or goal cell of another agent. With start and goal cells picked anywhere, agents on the
+    Samfundet maps often have to go through each other's goals in a corridor, and then there is no solution at all.
+    :return: list of (start, goal) positions, fewer than count if the map has no room for more.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = int_map.shape
+    free = np.flatnonzero(int_map.ravel() != -1).tolist()
+
+    def neighbours(cell):
+        row, col = divmod(cell, width)
+        return [cell + i * width + j for i, j in NEIGHBOURS
+                if 0 <= row + i < height and 0 <= col + j < width and int_map.flat[cell + i * width + j] != -1]
+
+    def connected(start, goal, labels):
+        # The agent steps from its start into a part of the map that it can leave again next to its goal
+        if goal in neighbours(start):
+            return True
+        return bool({labels[cell] for cell in neighbours(start)} & {labels[cell] for cell in neighbours(goal)} - {-1})
+
+    ends = []
+    taken = set()
+    goals = rng.permutation(free).tolist()
+    for start in rng.permutation(free).tolist():
+        if start in taken:
+            continue
+        labels = free_regions(int_map, taken | {start})
+        if not all(connected(*pair, labels) for pair in ends):
+            continue  # Trying goals is slow, so starts that already cut off another agent are skipped first
+        for goal in goals:
+            if goal == start or goal in taken:
+                continue
+            labels = free_regions(int_map, taken | {start, goal})
+            if all(connected(*pair, labels) for pair in ends + [(start, goal)]):
+                ends.append((start, goal))
+                taken |= {start, goal}
+                break
+        if len(ends) == count:
+            break
+    return [(list(divmod(start, width)), list(divmod(goal, width))) for start, goal in ends]
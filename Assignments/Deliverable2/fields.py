@@ -0,0 +1,144 @@
+import collections
+import heapq
+import numpy as np
+from search import NEIGHBOURS
+
+
+# Cost fields: the true cost between one or more sources and every cell on the map, from a single Dijkstra sweep. Once
+# a field is made, the cost and the cheapest path to any cell can be read off it without searching again.
+
+def dijkstra(int_map, sources, reverse=False):
+    """
+    Runs Dijkstra from all the sources at once. Moving into a cell costs the value of that cell, and cells with the
+    value -1 are walls.
+    :param int_map: 2D numpy array with the cell costs
+    :param sources: list of positions [row, column] to measure from
+    :param reverse: if False, the cost is from the nearest source to the cell. If True, it is from the cell to the
+    nearest source.
+    :return: 2D float array with the costs, np.inf for cells that cannot be reached, and 2D int array with the next
+    cell towards the nearest source as a flat index, -1 for the sources and cells that cannot be reached.
+    """
+    height, width = int_map.shape
+    costs = int_map.ravel().tolist()
+    distance = [float('inf')] * (height * width)
+    parent = [-1] * (height * width)
+    queue = []
+    for source in sources:
+        index = source[0] * width + source[1]
+        if costs[index] != -1:
+            distance[index] = 0
+            queue.append((0, index))
+    heapq.heapify(queue)
+
+    while queue:
+        cost, index = heapq.heappop(queue)
+        if cost > distance[index]:
+            continue
+        row, col = divmod(index, width)
+        for i, j in NEIGHBOURS:
+            if not (0 <= row + i < height and 0 <= col + j < width):
+                continue
+            neighbour = index + i * width + j
+            if costs[neighbour] == -1:
+                continue
+            # Going forward we pay for entering the neighbour, going backwards for entering the cell we came from
+            new_cost = cost + (costs[index] if reverse else costs[neighbour])
+            if new_cost < distance[neighbour]:
+                distance[neighbour] = new_cost
+                parent[neighbour] = index
+                heapq.heappush(queue, (new_cost, neighbour))
+
+    return np.array(distance).reshape(height, width), np.array(parent, dtype=np.int32).reshape(height, width)
+
+
+def dijkstra_field(int_map, sources, reverse=False):
+    """
+    Like dijkstra, but only returns the costs.
+    """
+    return dijkstra(int_map, sources, reverse)[0]
+
+
+class DistanceField:
+
+    def __init__(self, int_map, sources, reverse=False):
+        """
+        :param int_map: 2D numpy array with the cell costs
+        :param sources: list of positions [row, column] to measure from
+        :param reverse: if False, the field holds the cost from the nearest source to every cell. If True, it holds
+        the cost from every cell to the nearest source.
+        """
+        self.sources = [[source[0], source[1]] for source in sources]
+        self.reverse = reverse
+        self.width = int_map.shape[1]
+        self.field, self.parent = dijkstra(int_map, sources, reverse)
+        self.table = self.field.tolist()  # Reading single cells from a list is much faster than from numpy
+
+    def cost(self, pos):
+        """
+        :return: the cost between the nearest source and the cell, np.inf if it cannot be reached.
+        """
+        return self.table[pos[0]][pos[1]]
+
+    def reachable(self, pos):
+        return self.table[pos[0]][pos[1]] != float('inf')
+
+    def path(self, pos):
+        """
+        The cheapest path between the cell and the nearest source, found by following the parents.
+        :return: list of positions from the source to the cell, or from the cell to the source if the field is
+        reversed. None if the cell cannot be reached.
+        """
+        if not self.reachable(pos):
+            return None
+        path = [[pos[0], pos[1]]]
+        index = int(self.parent[pos[0], pos[1]])
+        while index != -1:
+            path.append(list(divmod(index, self.width)))
+            index = int(self.parent.flat[index])
+        if not self.reverse:
+            path.reverse()
+        return path
+
+    def nearest_source(self, pos):
+        path = self.path(pos)
+        if path is None:
+            return None
+        return path[-1] if self.reverse else path[0]
+
+
+class FieldCache:
+    """
+    Keeps the most recently used distance fields of a map, so that asking for the same sources again costs nothing.
+    """
+
+    def __init__(self, int_map, max_size=16):
+        self.int_map = int_map
+        self.max_size = max_size
+        self.fields = collections.OrderedDict()
+
+    def attach(self, myMap):
+        """
+        Throws away the cached fields whenever a cell cost of the Map_Obj changes. The map object must use the same
+        integer map.
+        """
+        myMap.add_cost_listener(lambda pos, old_value, new_value: self.clear())
+
+    def clear(self):
+        self.fields.clear()
+
+    def get(self, sources, reverse=False):
+        """
+        :param sources: list of positions [row, column] to measure from
+        :param reverse: see DistanceField
+        :return: the DistanceField for the sources.
+        """
+        key = (tuple((source[0], source[1]) for source in sources), reverse)
+        field = self.fields.get(key)
+        if field is None:
+            field = DistanceField(self.int_map, sources, reverse)
+            self.fields[key] = field
+            if len(self.fields) > self.max_size:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(key)
+        return field
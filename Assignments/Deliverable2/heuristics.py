@@ -0,0 +1,152 @@
+import hashlib
+import os
+import numpy as np
+from fields import dijkstra_field
+from search import manhattan_distance
+
+
+# Heuristics that know about the walls of a map. They are built from true distances computed with Dijkstra, which is
+# expensive, so the tables are cached on disk next to the .csv file of the map and reused for every later query.
+
+def map_checksum(int_map):
+    # Used to notice that a cached table belongs to a map that has since changed
+    data = np.ascontiguousarray(int_map, dtype=np.int64)
+    return hashlib.sha1(str(data.shape).encode() + data.tobytes()).hexdigest()
+
+
+def cache_path(path_to_map, name):
+    return path_to_map + '.heuristic-' + name + '.npz'
+
+
+def load_cached(path, int_map):
+    """
+    Loads the arrays saved in a cache file if it exists and was made for this map.
+    :return: dictionary with the arrays, or None.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if str(data['checksum']) != map_checksum(int_map):
+            return None
+        return {key: data[key] for key in data.files}
+
+
+def save_cached(path, int_map, **arrays):
+    if path is not None:
+        np.savez(path, checksum=map_checksum(int_map), **arrays)
+
+
+class GoalDistanceHeuristic:
+    """
+    The exact cost to the goal for every cell, from a reverse Dijkstra sweep out of the goal. A* with this heuristic
+    only expands cells on a cheapest path, but the table is only valid for the goal it was made for.
+    """
+
+    def __init__(self, int_map, goal, path_to_map=None):
+        self.goal = (goal[0], goal[1])
+        path = cache_path(path_to_map, 'goal-%d-%d' % self.goal) if path_to_map is not None else None
+        cached = load_cached(path, int_map)
+        if cached is not None:
+            self.field = cached['field']
+        else:
+            self.field = dijkstra_field(int_map, [goal], reverse=True)
+            save_cached(path, int_map, field=self.field)
+        self.table = self.field.tolist()
+
+    def __call__(self, pos, goal):
+        if (goal[0], goal[1]) != self.goal:
+            return manhattan_distance(pos, goal)
+        return self.table[pos[0]][pos[1]]
+
+
+MAX_GOAL_TABLES = 8  # Enough for the two ends of a bidirectional search and a few goals in a row
+
+
+class LandmarkHeuristic:
+    """
+    The ALT heuristic. The true costs from a handful of landmarks to every cell are stored, and the triangle
+    inequality turns them into a lower bound on the cost between any two cells. Works for every goal on the map.
+    """
+
+    def __init__(self, int_map, landmark_count=8, path_to_map=None):
+        self.costs = np.asarray(int_map, dtype=np.float64)
+        path = cache_path(path_to_map, 'landmarks-%d' % landmark_count) if path_to_map is not None else None
+        cached = load_cached(path, int_map)
+        if cached is not None:
+            self.landmarks = cached['landmarks'].tolist()
+            self.tables = cached['tables']
+        else:
+            self.landmarks, self.tables = self.select_landmarks(int_map, landmark_count)
+            save_cached(path, int_map, landmarks=np.array(self.landmarks), tables=self.tables)
+        self.goal_tables = {}  # Heuristic values of every cell for the goals used lately
+
+    @staticmethod
+    def select_landmarks(int_map, landmark_count):
+        """
+        Picks landmarks spread out over the map: every new landmark is the cell farthest away from the ones already
+        picked.
+        :return: the landmark positions and an array with the cost from each landmark to every cell.
+        """
+        free = np.argwhere(int_map != -1)
+        if len(free) == 0:
+            return [], np.zeros((0,) + int_map.shape)
+        # Start from the cell farthest away from an arbitrary free cell, which lies on the edge of the map
+        nearest = dijkstra_field(int_map, [free[0]])
+        landmarks = []
+        tables = []
+        for _ in range(landmark_count):
+            reachable = np.where(np.isinf(nearest), -1, nearest)
+            landmark = list(np.unravel_index(np.argmax(reachable), int_map.shape))
+            if landmark in landmarks:
+                break
+            landmarks.append([int(landmark[0]), int(landmark[1])])
+            tables.append(dijkstra_field(int_map, [landmark]))
+            nearest = tables[0] if len(tables) == 1 else np.minimum(nearest, tables[-1])
+        return landmarks, np.array(tables)
+
+    def table_for_goal(self, goal):
+        """
+        Computes the heuristic value of every cell for one goal.
+        :return: 2D array with the lower bounds.
+        """
+        rows, cols = np.indices(self.costs.shape)
+        bound = np.abs(rows - goal[0]) + np.abs(cols - goal[1])  # Every step costs at least 1
+        goal_cost = self.costs[goal[0], goal[1]]
+        for table in self.tables:
+            to_goal = table[goal[0], goal[1]]
+            if np.isinf(to_goal):
+                continue
+            with np.errstate(invalid='ignore'):
+                # d(cell, goal) >= d(landmark, goal) - d(landmark, cell)
+                forward = to_goal - table
+                # d(cell, goal) >= d(cell, landmark) - d(goal, landmark), where the cost of going back to the
+                # landmark only differs from the cost of coming from it by the costs of the two end cells
+                backward = (table - self.costs) - (to_goal - goal_cost)
+            usable = np.isfinite(table)
+            bound = np.where(usable, np.maximum(bound, np.maximum(forward, backward)), bound)
+        return bound
+
+    def __call__(self, pos, goal):
+        goal = (goal[0], goal[1])
+        table = self.goal_tables.get(goal)
+        if table is None:
+            if len(self.goal_tables) >= MAX_GOAL_TABLES:
+                self.goal_tables.clear()
+            table = self.goal_tables[goal] = self.table_for_goal(goal).tolist()
+        return table[pos[0]][pos[1]]
+
+
+def for_map(name, myMap):
+    """
+    Creates the heuristic with the given name for the map object, using the tables cached next to its .csv file.
+    :param name: 'manhattan', 'landmarks' or 'goal'
+    :param myMap: the Map_Obj to make the heuristic for
+    :return: a function taking two positions and returning an admissible estimate of the cost between them.
+    """
+    if name == 'manhattan':
+        return manhattan_distance
+    elif name == 'landmarks':
+        return LandmarkHeuristic(myMap.int_map, path_to_map=myMap.path_to_map)
+    elif name == 'goal':
+        return GoalDistanceHeuristic(myMap.int_map, myMap.get_goal_pos(), path_to_map=myMap.path_to_map)
+    raise ValueError('Unknown heuristic: ' + str(name))
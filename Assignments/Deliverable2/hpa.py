@@ -0,0 +1,339 @@
+import heapq
+import itertools
+from search import NEIGHBOURS, SearchResult, manhattan_distance
+
+
+# Hierarchical path finding (HPA*). The map is cut into square clusters. Where two clusters touch, the cells that can
+# be walked between them are grouped into entrances, and each entrance gets one or two transition cells on both sides.
+# The transitions are the nodes of a small abstract graph, with edges across the entrances and edges for the cheapest
+# way between two transitions inside the same cluster. A query searches the abstract graph and then only looks at the
+# cells of the clusters along the chosen corridor to fill in the path. The paths are close to, but not always, the
+# cheapest ones. For a start and a goal in the same or neighbouring clusters, where going through the transitions can
+# be a long way around, a search in the clusters around them is done as well.
+
+MAX_ENTRANCE_WIDTH = 6  # Wider entrances get a transition at both ends instead of one in the middle
+
+
+class HierarchicalMap:
+
+    def __init__(self, int_map, cluster_size=10):
+        """
+        :param int_map: 2D numpy array with the cell costs. A reference is kept, so call update_cell after changing it.
+        :param cluster_size: width and height of the clusters in cells
+        """
+        self.int_map = int_map
+        self.height, self.width = int_map.shape
+        self.cluster_size = cluster_size
+        self.cluster_rows = -(-self.height // cluster_size)
+        self.cluster_cols = -(-self.width // cluster_size)
+
+        self.transitions = {}  # The (cell, cell) pairs on each border between two clusters, by border
+        self.inter_edges = {}  # Edges across borders, node -> {node: cost}
+        self.intra_edges = {}  # Edges inside each cluster, cluster -> {node: {node: cost}}
+        for border in self.all_borders():
+            self.build_border(border)
+        for cluster in itertools.product(range(self.cluster_rows), range(self.cluster_cols)):
+            self.build_cluster(cluster)
+
+    def attach(self, myMap):
+        """
+        Keeps the abstract graph up to date with the cost changes of a Map_Obj. The map object must use the same
+        integer map.
+        """
+        myMap.add_cost_listener(lambda pos, old_value, new_value: self.update_cell(pos))
+
+    def cluster_of(self, row, col):
+        return row // self.cluster_size, col // self.cluster_size
+
+    def cluster_bounds(self, cluster):
+        # First row, first column, end row and end column of a cluster
+        row, col = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return row, col, min(row + self.cluster_size, self.height), min(col + self.cluster_size, self.width)
+
+    def cost(self, row, col):
+        return int(self.int_map[row, col])
+
+    def all_borders(self):
+        # A border is named by the cluster on its top or left side and whether it is to the right or below it
+        for cluster_row in range(self.cluster_rows):
+            for cluster_col in range(self.cluster_cols):
+                if cluster_col + 1 < self.cluster_cols:
+                    yield cluster_row, cluster_col, 'right'
+                if cluster_row + 1 < self.cluster_rows:
+                    yield cluster_row, cluster_col, 'below'
+
+    def borders_of(self, cluster):
+        cluster_row, cluster_col = cluster
+        borders = []
+        if cluster_col + 1 < self.cluster_cols:
+            borders.append((cluster_row, cluster_col, 'right'))
+        if cluster_col > 0:
+            borders.append((cluster_row, cluster_col - 1, 'right'))
+        if cluster_row + 1 < self.cluster_rows:
+            borders.append((cluster_row, cluster_col, 'below'))
+        if cluster_row > 0:
+            borders.append((cluster_row - 1, cluster_col, 'below'))
+        return borders
+
+    def build_border(self, border):
+        """
+        Finds the entrances on a border and puts their transitions into the abstract graph.
+        :param border: (cluster row, cluster column, 'right' or 'below')
+        :return: nothing.
+        """
+        for first, second in self.transitions.get(border, []):
+            self.inter_edges.get(first, {}).pop(second, None)
+            self.inter_edges.get(second, {}).pop(first, None)
+
+        first_row, first_col, end_row, end_col = self.cluster_bounds(border[:2])
+        if border[2] == 'right':
+            pairs = [((row, end_col - 1), (row, end_col)) for row in range(first_row, end_row)]
+            open_pairs = (self.int_map[first_row:end_row, end_col - 1:end_col + 1] != -1).all(axis=1).tolist()
+        else:
+            pairs = [((end_row - 1, col), (end_row, col)) for col in range(first_col, end_col)]
+            open_pairs = (self.int_map[end_row - 1:end_row + 1, first_col:end_col] != -1).all(axis=0).tolist()
+
+        # An entrance is a run of pairs where both cells can be walked on
+        transitions = []
+        run = []
+        for pair, is_open in zip(pairs + [None], open_pairs + [False]):
+            if is_open:
+                run.append(pair)
+                continue
+            if len(run) >= MAX_ENTRANCE_WIDTH:
+                transitions.extend([run[0], run[-1]])
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        self.transitions[border] = transitions
+        for first, second in transitions:
+            self.inter_edges.setdefault(first, {})[second] = self.cost(*second)
+            self.inter_edges.setdefault(second, {})[first] = self.cost(*first)
+
+    def cluster_nodes(self, cluster):
+        nodes = set()
+        for border in self.borders_of(cluster):
+            for pair in self.transitions[border]:
+                for cell in pair:
+                    if self.cluster_of(*cell) == cluster:
+                        nodes.add(cell)
+        return nodes
+
+    def build_cluster(self, cluster):
+        # Finding the cheapest way inside the cluster from every transition to every other transition
+        nodes = self.cluster_nodes(cluster)
+        costs = self.cluster_costs(cluster)
+        edges = {}
+        for node in nodes:
+            distance, _ = self.local_search(cluster, node, nodes, costs=costs)
+            edges[node] = {other: distance[other] for other in nodes if other != node and other in distance}
+        self.intra_edges[cluster] = edges
+
+    def update_cell(self, pos):
+        """
+        Rebuilds the part of the abstract graph that depends on a cell whose cost has changed. This is the cluster of
+        the cell, its borders, and the neighbouring clusters whose transitions moved.
+        :param pos: position of the changed cell
+        :return: nothing.
+        """
+        cluster = self.cluster_of(pos[0], pos[1])
+        neighbours = {}
+        for border in self.borders_of(cluster):
+            for other in border_clusters(border):
+                if other != cluster:
+                    neighbours[other] = self.cluster_nodes(other)
+            self.build_border(border)
+        self.build_cluster(cluster)
+        for other, old_nodes in neighbours.items():
+            if self.cluster_nodes(other) != old_nodes:
+                self.build_cluster(other)
+
+    def cluster_costs(self, cluster):
+        first_row, first_col, end_row, end_col = self.cluster_bounds(cluster)
+        return self.int_map[first_row:end_row, first_col:end_col].tolist()
+
+    def local_search(self, cluster, source, targets=None, reverse=False, costs=None):
+        """
+        Dijkstra that never leaves the cluster.
+        :param cluster: the cluster to search in
+        :param source: cell to search from
+        :param targets: if given, the search stops when all of these cells have been reached
+        :param reverse: if True, the costs are from every cell to the source instead of from the source
+        :param costs: the costs of the cluster from cluster_costs, if they have already been read
+        :return: dictionary with the costs of the cells reached and dictionary with their parents.
+        """
+        first_row, first_col, end_row, end_col = self.cluster_bounds(cluster)
+        if costs is None:
+            costs = self.cluster_costs(cluster)
+        distance = {source: 0}
+        parent = {source: None}
+        remaining = set(targets) if targets is not None else None
+        queue = [(0, source)]
+        while queue:
+            cost, cell = heapq.heappop(queue)
+            if cost > distance[cell]:
+                continue
+            if remaining is not None:
+                remaining.discard(cell)
+                if not remaining:
+                    break
+            for i, j in NEIGHBOURS:
+                row, col = cell[0] + i, cell[1] + j
+                if not (first_row <= row < end_row and first_col <= col < end_col):
+                    continue
+                cell_cost = costs[row - first_row][col - first_col]
+                if cell_cost == -1:
+                    continue
+                new_cost = cost + (costs[cell[0] - first_row][cell[1] - first_col] if reverse else cell_cost)
+                if new_cost < distance.get((row, col), float('inf')):
+                    distance[(row, col)] = new_cost
+                    parent[(row, col)] = cell
+                    heapq.heappush(queue, (new_cost, (row, col)))
+        return distance, parent
+
+    def query(self, start, goal):
+        """
+        Finds a path from start to goal through the abstract graph. When the start and the goal are in the same or
+        neighbouring clusters, a search in the clusters around them is tried as well and the cheaper path is kept.
+        :param start: start position [row, column]
+        :param goal: goal position [row, column]
+        :return: a SearchResult with the path, its cost and the number of expanded abstract nodes.
+        """
+        start = (start[0], start[1])
+        goal = (goal[0], goal[1])
+        if self.cost(*start) == -1 or self.cost(*goal) == -1:
+            return SearchResult(None, None, 0)
+
+        # Connecting the start and the goal to the transitions of their clusters for this query only
+        start_cluster = self.cluster_of(*start)
+        goal_cluster = self.cluster_of(*goal)
+        start_costs, _ = self.local_search(start_cluster, start)
+        start_edges = {node: start_costs[node] for node in self.cluster_nodes(start_cluster) if node in start_costs}
+        goal_costs, _ = self.local_search(goal_cluster, goal, reverse=True)
+        goal_edges = {node: goal_costs[node] for node in self.cluster_nodes(goal_cluster) if node in goal_costs}
+        if start_cluster == goal_cluster and goal in start_costs:
+            start_edges[goal] = start_costs[goal]
+
+        def neighbours(node):
+            if node == start:
+                yield from start_edges.items()
+            if node in goal_edges:
+                yield goal, goal_edges[node]
+            if node in self.inter_edges:
+                yield from self.inter_edges[node].items()
+            cluster_edges = self.intra_edges[self.cluster_of(*node)]
+            if node in cluster_edges:
+                yield from cluster_edges[node].items()
+
+        abstract_path, expanded = self.abstract_search(start, goal, neighbours)
+        path, cost = None, None
+        if abstract_path is not None:
+            path = self.refine(abstract_path)
+            cost = sum(self.cost(*cell) for cell in path[1:])
+        if abs(start_cluster[0] - goal_cluster[0]) <= 1 and abs(start_cluster[1] - goal_cluster[1]) <= 1:
+            # The abstract graph has to go through the transitions, which can be a long way around for cells that are
+            # close to each other on both sides of a border. A search in the clusters around them finds the short way.
+            nearby_path, nearby_cost, nearby_expanded = self.nearby_search(start, goal)
+            expanded += nearby_expanded
+            if nearby_path is not None and (cost is None or nearby_cost < cost):
+                path, cost = nearby_path, nearby_cost
+        if path is None:
+            return SearchResult(None, None, expanded)
+        return SearchResult(path, cost, expanded, bound=None)
+
+    def nearby_search(self, start, goal):
+        """
+        A* that only looks at the clusters of the start and the goal and the clusters around them.
+        :return: the path, its cost and the number of expanded cells, the path and cost are None if the goal cannot be
+        reached within those clusters.
+        """
+        start_cluster = self.cluster_of(*start)
+        goal_cluster = self.cluster_of(*goal)
+        first_row = max(0, (min(start_cluster[0], goal_cluster[0]) - 1) * self.cluster_size)
+        first_col = max(0, (min(start_cluster[1], goal_cluster[1]) - 1) * self.cluster_size)
+        end_row = min(self.height, (max(start_cluster[0], goal_cluster[0]) + 2) * self.cluster_size)
+        end_col = min(self.width, (max(start_cluster[1], goal_cluster[1]) + 2) * self.cluster_size)
+        costs = self.int_map[first_row:end_row, first_col:end_col].tolist()
+
+        tie_breaker = itertools.count()
+        g_cost = {start: 0}
+        parent = {start: None}
+        closed = set()
+        frontier = [(manhattan_distance(start, goal), next(tie_breaker), start)]
+        while frontier:
+            _, _, cell = heapq.heappop(frontier)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            if cell == goal:
+                path = []
+                while cell is not None:
+                    path.append(list(cell))
+                    cell = parent[cell]
+                return path[::-1], g_cost[goal], len(closed)
+            for i, j in NEIGHBOURS:
+                row, col = cell[0] + i, cell[1] + j
+                if not (first_row <= row < end_row and first_col <= col < end_col):
+                    continue
+                cell_cost = costs[row - first_row][col - first_col]
+                new_cost = g_cost[cell] + cell_cost
+                if cell_cost != -1 and (row, col) not in closed and new_cost < g_cost.get((row, col), float('inf')):
+                    g_cost[(row, col)] = new_cost
+                    parent[(row, col)] = cell
+                    heapq.heappush(frontier, (new_cost + manhattan_distance((row, col), goal), next(tie_breaker),
+                                              (row, col)))
+        return None, None, len(closed)
+
+    def abstract_search(self, start, goal, neighbours):
+        # A* over the abstract graph
+        tie_breaker = itertools.count()
+        g_cost = {start: 0}
+        parent = {start: None}
+        closed = set()
+        frontier = [(manhattan_distance(start, goal), next(tie_breaker), start)]
+        expanded = 0
+        while frontier:
+            _, _, node = heapq.heappop(frontier)
+            if node in closed:
+                continue
+            closed.add(node)
+            expanded += 1
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                return path[::-1], expanded
+            for neighbour, cost in neighbours(node):
+                new_cost = g_cost[node] + cost
+                if neighbour not in closed and new_cost < g_cost.get(neighbour, float('inf')):
+                    g_cost[neighbour] = new_cost
+                    parent[neighbour] = node
+                    heapq.heappush(frontier, (new_cost + manhattan_distance(neighbour, goal), next(tie_breaker),
+                                              neighbour))
+        return None, expanded
+
+    def refine(self, abstract_path):
+        # Filling in the cells between the abstract nodes. Nodes next to each other are an edge across a border, the
+        # rest are in the same cluster and are connected by a search inside it.
+        path = [list(abstract_path[0])]
+        for node, next_node in zip(abstract_path, abstract_path[1:]):
+            if manhattan_distance(node, next_node) == 1 and self.cluster_of(*node) != self.cluster_of(*next_node):
+                path.append(list(next_node))
+                continue
+            _, parent = self.local_search(self.cluster_of(*node), node, [next_node])
+            segment = []
+            cell = next_node
+            while cell != node:
+                segment.append(list(cell))
+                cell = parent[cell]
+            path.extend(reversed(segment))
+        return path
+
+
+def border_clusters(border):
+    # The two clusters on each side of a border
+    if border[2] == 'right':
+        return (border[0], border[1]), (border[0], border[1] + 1)
+    return (border[0], border[1]), (border[0] + 1, border[1])
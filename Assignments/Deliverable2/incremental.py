@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import numpy as np
+from search import NEIGHBOURS, SearchResult, manhattan_distance
+
+
+# Incremental replanning for the moving goal in task 5. This is D* Lite with the roles of start and goal swapped: the
+# search tree is rooted at the start, which never moves, and the goal is the end that moves. Between calls to plan()
+# the tree is kept, so moving the goal or changing a cell cost only repairs the part of the tree that is affected.
+
+class IncrementalPlanner:
+
+    def __init__(self, int_map, start, goal, heuristic=manhattan_distance):
+        """
+        :param int_map: 2D numpy array with the cell costs. The planner keeps a reference to it, so call update_cell
+        after changing a cost in it.
+        :param start: start position [row, column]
+        :param goal: initial goal position [row, column]
+        :param heuristic: function taking two positions and returning a consistent estimate of the cost between them
+        """
+        self.int_map = int_map
+        self.height, self.width = int_map.shape
+        self.costs = int_map.ravel()
+        self.heuristic = heuristic
+        self.start = (start[0], start[1])
+        self.goal = (goal[0], goal[1])
+        self.start_index = self.to_index(self.start)
+        self.goal_index = self.to_index(self.goal)
+
+        # g_cost is the cost from the start found by the last expansion of a cell, rhs_cost is the one step lookahead
+        # from its neighbours. A cell is consistent when the two are equal.
+        self.g_cost = np.full(self.height * self.width, np.inf)
+        self.rhs_cost = np.full(self.height * self.width, np.inf)
+        self.rhs_cost[self.start_index] = 0
+
+        # Every time the goal moves the keys in the queue get too large by at most the distance it moved, so instead
+        # of recomputing them we add that distance to all keys computed from now on
+        self.key_modifier = 0
+        self.queue = []
+        self.queued = {}  # The current key of every cell in the queue, older heap entries are stale
+        self.tie_breaker = itertools.count()
+        self.push(self.start_index)
+
+    def to_index(self, pos):
+        return pos[0] * self.width + pos[1]
+
+    def to_pos(self, index):
+        return list(divmod(index, self.width))
+
+    def neighbours(self, index):
+        row, col = divmod(index, self.width)
+        for i, j in NEIGHBOURS:
+            if 0 <= row + i < self.height and 0 <= col + j < self.width:
+                neighbour = index + i * self.width + j
+                if self.costs[neighbour] != -1:
+                    yield neighbour
+
+    def calculate_key(self, index):
+        cost = min(self.g_cost[index], self.rhs_cost[index])
+        return cost + self.heuristic(divmod(index, self.width), self.goal) + self.key_modifier, cost
+
+    def push(self, index):
+        key = self.calculate_key(index)
+        self.queued[index] = key
+        heapq.heappush(self.queue, (key, next(self.tie_breaker), index))
+
+    def top_key(self):
+        # Throwing away stale entries until the top of the heap is a cell that is really in the queue
+        while self.queue:
+            key, _, index = self.queue[0]
+            if self.queued.get(index) == key:
+                return key
+            heapq.heappop(self.queue)
+        return np.inf, np.inf
+
+    def update_vertex(self, index):
+        if index != self.start_index:
+            cost = int(self.costs[index])
+            if cost == -1:
+                self.rhs_cost[index] = np.inf
+            else:
+                best = min((self.g_cost[neighbour] for neighbour in self.neighbours(index)), default=np.inf)
+                self.rhs_cost[index] = best + cost
+        self.queued.pop(index, None)
+        if self.g_cost[index] != self.rhs_cost[index]:
+            self.push(index)
+
+    def move_goal(self, goal):
+        """
+        Moves the goal. The search tree is kept, the next call to plan() only expands what is needed to reach the new
+        goal.
+        :param goal: the new goal position
+        :return: nothing.
+        """
+        goal = (goal[0], goal[1])
+        if goal == self.goal:
+            return
+        self.key_modifier += self.heuristic(self.goal, goal)
+        self.goal = goal
+        self.goal_index = self.to_index(goal)
+
+    def update_cell(self, pos, value=None):
+        """
+        Tells the planner that the cost of a cell has changed.
+        :param pos: position of the changed cell
+        :param value: new cost of the cell. If None, the cost has already been written to the integer map.
+        :return: nothing.
+        """
+        index = self.to_index(pos)
+        if value is not None:
+            self.int_map[pos[0], pos[1]] = value
+        # Only the edges into the cell change cost, so the cell itself is the only one with a new lookahead value
+        self.update_vertex(index)
+
+    def plan(self):
+        """
+        Repairs the search tree until the cheapest path to the current goal is known.
+        :return: a SearchResult with the path, its cost and the number of cells expanded during this repair.
+        """
+        expanded = 0
+        goal_index = self.goal_index
+        while self.top_key() < self.calculate_key(goal_index) or \
+                self.rhs_cost[goal_index] != self.g_cost[goal_index]:
+            if not self.queue:
+                break
+            old_key, _, index = heapq.heappop(self.queue)
+            del self.queued[index]
+            new_key = self.calculate_key(index)
+            if old_key < new_key:
+                self.queued[index] = new_key
+                heapq.heappush(self.queue, (new_key, next(self.tie_breaker), index))
+                continue
+
+            expanded += 1
+            if self.g_cost[index] > self.rhs_cost[index]:
+                # The cell got cheaper, so its neighbours might get cheaper too
+                self.g_cost[index] = self.rhs_cost[index]
+                for neighbour in self.neighbours(index):
+                    self.update_vertex(neighbour)
+            else:
+                # The cell got more expensive, so everything that went through it has to be looked at again
+                self.g_cost[index] = np.inf
+                self.update_vertex(index)
+                for neighbour in self.neighbours(index):
+                    self.update_vertex(neighbour)
+
+        if self.g_cost[goal_index] == np.inf:
+            return SearchResult(None, None, expanded)
+        return SearchResult(self.path_to(goal_index), int(self.g_cost[goal_index]), expanded)
+
+    def path_to(self, index):
+        # Walking back from the cell along the cheapest neighbours until we reach the start
+        path = [self.to_pos(index)]
+        while index != self.start_index:
+            index = min(self.neighbours(index), key=lambda neighbour: self.g_cost[neighbour])
+            path.append(self.to_pos(index))
+        path.reverse()
+        return path
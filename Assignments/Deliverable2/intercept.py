@@ -0,0 +1,68 @@
+import numpy as np
+from search import NEIGHBOURS, SearchResult
+
+
+# Catching a goal that moves along a known trajectory (task 5). Instead of searching again after every tick, we search
+# once over (cell, tick) states: in one tick we can move to a neighbour or wait where we are, and the first tick at
+# which we can stand on the goal's cell is the earliest interception. All cells at one tick are handled at once with
+# numpy, so every tick costs a few array operations over the map.
+#
+# Spending a tick in a cell costs the value of the cell, both when moving into it and when waiting in it. Among the
+# paths that catch the goal as early as possible we take the cheapest one.
+
+WAIT = len(NEIGHBOURS)  # Step code for waiting, the moves are coded by their index in NEIGHBOURS
+
+
+def intercept(int_map, start, trajectory):
+    """
+    Finds the earliest tick at which we can be on the same cell as the goal.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column] at tick 0
+    :param trajectory: goal position at every tick, see Map_Obj.goal_trajectory. The goal stays at the last position
+    after the end of the list.
+    :return: a SearchResult with the path, with one position per tick so that waiting repeats a position, its cost and
+    the number of (cell, tick) states reached. The goal is caught at tick len(path) - 1.
+    """
+    height, width = int_map.shape
+    costs = np.where(int_map == -1, np.inf, int_map.astype(np.float64))
+    g_cost = np.full((height, width), np.inf)
+    if int_map[start[0], start[1]] != -1:
+        g_cost[start[0], start[1]] = 0
+    steps = []  # For every tick, how each cell was reached at that tick
+    expanded = int(np.isfinite(g_cost).sum())
+    tick = 0
+
+    while True:
+        goal = trajectory[min(tick, len(trajectory) - 1)]
+        if np.isfinite(g_cost[goal[0], goal[1]]):
+            return SearchResult(path_back(steps, goal), int(g_cost[goal[0], goal[1]]), expanded)
+
+        # Padding with infinity lets every shifted copy have the size of the map
+        padded = np.pad(g_cost, 1, constant_values=np.inf)
+        options = [padded[1 - i:1 - i + height, 1 - j:1 - j + width] for i, j in NEIGHBOURS] + [g_cost]
+        options = np.stack(options)
+        step = np.argmin(options, axis=0).astype(np.uint8)
+        new_g_cost = np.take_along_axis(options, step[np.newaxis].astype(np.intp), axis=0)[0] + costs
+
+        reached = np.isfinite(new_g_cost)
+        if tick >= len(trajectory) - 1 and np.array_equal(reached, np.isfinite(g_cost)):
+            # The goal has stopped, and we cannot get to any cell we could not get to already
+            return SearchResult(None, None, expanded)
+        steps.append(step)
+        g_cost = new_g_cost
+        expanded += int(reached.sum())
+        tick += 1
+
+
+def path_back(steps, goal):
+    # Following the steps from the last tick back to the start
+    row, col = goal
+    path = [[row, col]]
+    for step in reversed(steps):
+        code = step[row, col]
+        if code != WAIT:
+            i, j = NEIGHBOURS[code]
+            row, col = row - i, col - j
+        path.append([row, col])
+    path.reverse()
+    return path
@@ -0,0 +1,149 @@
+import heapq
+import itertools
+from search import NEIGHBOURS, NodeStore, SearchResult, manhattan_distance
+
+
+# Jump Point Search for the weighted maps. Inside a region where all cells have the same cost there are many paths of
+# equal cost, and plain A* expands all of them. Here we instead jump in a straight line over the region and only stop
+# at cells where the path might have to turn (jump points). As soon as a cell or one of its neighbours has a different
+# cost we stop jumping, so cells at cost boundaries are expanded like in normal A*.
+
+def jps(int_map, start, goal, heuristic=manhattan_distance):
+    """
+    Finds the cheapest path from start to goal on the integer map with Jump Point Search. Gives the same cost as
+    search.astar, but expands far fewer nodes when the map has large areas of the same cost.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column]
+    :param goal: goal position [row, column]
+    :param heuristic: function taking two positions and returning a consistent estimate of the cost between them
+    :return: a SearchResult with the path, its cost and the number of expanded jump points.
+    """
+    jumper = Jumper(int_map, goal)
+    store = NodeStore(int_map.shape)
+    width = jumper.width
+    start_index = store.to_index(start)
+    goal_index = store.to_index(goal)
+    goal = (goal[0], goal[1])
+
+    tie_breaker = itertools.count()
+    h_cost = heuristic(start, goal)
+    store.open_node(start_index, 0, h_cost, -1)
+    frontier = [(h_cost, h_cost, next(tie_breaker), 0, start_index)]
+    expanded = 0
+
+    while frontier:
+        _, _, _, g_cost, index = heapq.heappop(frontier)
+        if store.status_of(index) == NodeStore.CLOSED or g_cost != store.g_cost[index]:
+            continue
+        store.status[index] = NodeStore.CLOSED
+        expanded += 1
+
+        if index == goal_index:
+            return SearchResult(fill_path(store.path_to(index)), int(g_cost), expanded)
+
+        row, col = divmod(index, width)
+        parent = int(store.parent[index])
+        for direction in prune_directions(row, col, parent, width):
+            jump_point = jumper.jump(row, col, direction)
+            if jump_point is None:
+                continue
+            jump_row, jump_col, jump_cost = jump_point
+            child = jump_row * width + jump_col
+            child_status = store.status_of(child)
+            child_g_cost = g_cost + jump_cost
+            if child_status == NodeStore.CLOSED or \
+                    (child_status == NodeStore.OPEN and child_g_cost >= store.g_cost[child]):
+                continue
+            h_cost = heuristic((jump_row, jump_col), goal)
+            if h_cost == float('inf'):
+                continue
+            store.open_node(child, child_g_cost, child_g_cost + h_cost, index)
+            heapq.heappush(frontier, (child_g_cost + h_cost, h_cost, next(tie_breaker), child_g_cost, child))
+
+    return SearchResult(None, None, expanded)
+
+
+def prune_directions(row, col, parent, width):
+    # The start looks in every direction. Every other jump point was reached in a straight line, and we never have to
+    # look back the way we came.
+    if parent == -1:
+        return (-1, 0), (0, -1), (0, 1), (1, 0)
+    parent_row, parent_col = divmod(parent, width)
+    if parent_row == row:
+        step = 1 if col > parent_col else -1
+        return (0, step), (-1, 0), (1, 0)
+    step = 1 if row > parent_row else -1
+    return (step, 0), (0, -1), (0, 1)
+
+
+def fill_path(jump_points):
+    # Putting back the cells between the jump points, which always lie on a straight line
+    if not jump_points:
+        return jump_points
+    path = [jump_points[0]]
+    for pos in jump_points[1:]:
+        row, col = path[-1]
+        step_row = (pos[0] > row) - (pos[0] < row)
+        step_col = (pos[1] > col) - (pos[1] < col)
+        while [row, col] != pos:
+            row, col = row + step_row, col + step_col
+            path.append([row, col])
+    return path
+
+
+class Jumper:
+    """
+    Does the jumping for jps(). The costs are kept as a list of rows, since the jumps look at single cells many times.
+    """
+
+    def __init__(self, int_map, goal):
+        self.costs = int_map.tolist()
+        self.height, self.width = int_map.shape
+        self.goal = (goal[0], goal[1])
+
+    def cost(self, row, col):
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return self.costs[row][col]
+        return -1
+
+    def on_boundary(self, row, col, region):
+        # True if one of the neighbours that can be entered has another cost than the region
+        for i, j in NEIGHBOURS:
+            cost = self.cost(row + i, col + j)
+            if cost != -1 and cost != region:
+                return True
+        return False
+
+    def jump(self, row, col, direction):
+        """
+        Moves from a cell in a straight line until it reaches a jump point.
+        :param row: row of the cell we jump from
+        :param col: column of the cell we jump from
+        :param direction: (row step, column step)
+        :return: (row, column, cost of the jump) of the jump point, or None if the jump hit a wall.
+        """
+        step_row, step_col = direction
+        region = self.cost(row, col)
+        walkable = lambda r, c: self.cost(r, c) == region  # Cells of another cost count as walls inside the jump
+        jump_cost = 0
+        while True:
+            row, col = row + step_row, col + step_col
+            cost = self.cost(row, col)
+            if cost == -1:
+                return None
+            jump_cost += cost
+            if (row, col) == self.goal or cost != region or self.on_boundary(row, col, region):
+                return row, col, jump_cost
+
+            if step_col != 0:
+                # A cell above or below that we could not reach from the cell behind us must be looked at from here
+                if (walkable(row - 1, col) and not walkable(row - 1, col - step_col)) or \
+                        (walkable(row + 1, col) and not walkable(row + 1, col - step_col)):
+                    return row, col, jump_cost
+            else:
+                if (walkable(row, col - 1) and not walkable(row - step_row, col - 1)) or \
+                        (walkable(row, col + 1) and not walkable(row - step_row, col + 1)):
+                    return row, col, jump_cost
+                # Moving vertically we also stop wherever a horizontal jump would find something
+                if self.jump(row, col, (0, 1)) is not None or self.jump(row, col, (0, -1)) is not None:
+                    return row, col, jump_cost
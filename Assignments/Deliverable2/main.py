@@ -1,207 +1,168 @@
 import Map
-import math
-
-
-# Implementation of the A* algorithm :)
-
-class Node:
-
-    def __init__(self, pos=[0, 0]):
-        self.g_cost = 0
-        self.h_cost = 0
-        self.f_cost = 0
-        self.status = "open"
-        self.parent = None
-        self.kids = []
-        self.pos = pos
-
-    def set_h_cost(self, goal):
-        self.h_cost = manhattan_distance(self.pos, goal)
-
-    def close_node(self):
-        self.status = "closed"
-
-    def set_g_cost(self, cost):
-        self.g_cost = cost
-
-    def set_f_cost(self):
-        self.f_cost = self.h_cost + self.g_cost
-
-    def set_parent(self, parent):
-        self.parent = parent
-
-    def add_child(self, child):
-        self.kids.append(child)
-
-    def get_pos(self):
-        return self.pos
-
-    def get_g_cost(self):
-        return self.g_cost
-
-    def __str__(self):
-        pos = "[" + str(self.pos[0]) + ", " + str(self.pos[1]) + "]"
-        return pos
-
-def task(task_number):
-    # Making the list of nodes:
-    opened = []
-    closed = []
-    frontier = []  # the nodes we're going to be looking at next, sorted by their heuristic
-
+import anytime
+import bidirectional
+import bounded
+import cbs
+import heuristics
+import intercept
+import jps
+import mapgen
+import parallel
+import search
+import theta
+
+
+# The search algorithms task() can use. They all take the integer map, start, goal and heuristic.
+ALGORITHMS = {'astar': search.astar, 'jps': jps.jps, 'bidirectional': bidirectional.bidirectional,
+              'anytime': anytime.anytime_search, 'bounded': bounded.bounded_search,
+              'parallel': parallel.parallel_astar}
+
+
+def task(task_number, heuristic='manhattan', algorithm='astar'):
     # Creating a map object:
     myMap = Map.Map_Obj(task_number)
-
-    # Creating some instances of nodes and testing their positions;
-
-    startNode = Node(myMap.get_start_pos())
-    startNode.set_g_cost(0)
-    startNode.set_h_cost(myMap.get_goal_pos())
-    startNode.set_f_cost()
-    print("Start node:", startNode)
+    print("Start node:", myMap.get_start_pos())
     print("Goal node:", myMap.get_goal_pos())
 
-    # Adding node to list:
-    opened.append(startNode)
-    frontier.append(startNode)
-
-    goal_not_found = True
-
-    # This loop will run until we find the shortest path
-    while goal_not_found:
-        myMap.tick()
-        currentNode = frontier[0]
-
-        # Checking if it´s the goal node:
-        if currentNode.h_cost == 0:
-            print("Hurra, du fant noden på: ", currentNode)
-            break
-
-        # If not, then we have to search further :)
-
-        # Creating children in a plus shape
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if (i == 0) ^ (j == 0):
-                    if myMap.get_cell_value([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]) != -1:
-                        nodeExist = False
-
-                        # Checking if there already exists a node in the current position. In which case we don't create a new node
-                        for elem in opened:
-                            if elem.pos == [currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]:
-                                node = elem
-                                nodeExist = True
-                                break
-
-                        if not nodeExist:
-                            node = Node([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j])
-
-                        # Only if the node is open will we expand it and add its children
-                        if not node in closed:
-                            node.set_parent(currentNode)
-                            currentNode.add_child(node)
-                            node.set_g_cost(node.parent.get_g_cost() + myMap.get_cell_value([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]))
-                            node.set_h_cost(myMap.get_goal_pos())
-                            node.set_f_cost()
-                            opened.append(node)
-                            frontier.append(node)
-
-        # We sort the frontier based on the heuristic function
-        frontier.sort(key=lambda x: x.f_cost)
-
-        frontier.remove(currentNode)
-        closed.append(currentNode)
-
-        goal_path = [currentNode]
-    
-    # Plotting the path to the node
-    while currentNode.parent is not None:
-        currentNode = currentNode.parent
-        goal_path.append(currentNode)
+    # The goal never moves in tasks 1-4, so one search from the start is enough
+    result = ALGORITHMS[algorithm](myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos(),
+                                   heuristics.for_map(heuristic, myMap))
+    if not result.found():
+        # The goal is walled in, or the anytime search ran out of time before its first path
+        print("No path was found. Expanded nodes:", result.expanded)
+        return
+    print("Hurra, du fant noden på: ", result.path[-1])
+    print("Path cost:", result.cost, "Expanded nodes:", result.expanded)
+    if result.bound != 1:
+        print("The path costs at most", result.bound, "times the cheapest one")
 
-    for node in goal_path:
-        myMap.set_cell_value(node.get_pos(), 'G')
+    # Plotting the path to the node
+    for pos in result.path:
+        myMap.set_cell_value(pos, 'G')
     myMap.set_cell_value(myMap.get_start_pos(), ' S ')
     myMap.show_map()
 
-def task_5():
+def task_5(animation_file=None):
     # Creating a map object:
     myMap = Map.Map_Obj(5)
     myMap.show_map()
 
-    goal_not_found = True
-    counter = 0
-    while goal_not_found:
-        # Making the list of nodes:
-        myMap.tick()
-        counter += 1
-        opened = []
-        closed = []
-        frontier = []  # the nodes we're going to be looking at next, sorted by their heuristic
-        goal_path = []
-        # Creating some instances of nodes and testing their positions;
-        startNode = Node(myMap.get_start_pos())
-        startNode.set_g_cost(0)
-        startNode.set_h_cost(myMap.get_goal_pos())
-        startNode.set_f_cost()
-
-        # Adding node to list:
-        opened.append(startNode)
-        frontier.append(startNode)
-
-        # This loop will run until we find the shortest path
-
-
-        while goal_not_found:
-            currentNode = frontier[0]
-
-            # Checking if it´s the goal node:
-            if currentNode.h_cost == 0:
-                break
-
-            # If not, then we have to search further :)
-
-            # Creating children in a plus shape
-            for i in range(-1, 2):
-                for j in range(-1, 2):
-                    if (i == 0) ^ (j == 0):
-                        if myMap.get_cell_value([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]) != -1:
-                            nodeExist = False
-                            for elem in opened:
-                                if elem.pos == [currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]:
-                                    node = elem
-                                    nodeExist = True
-                                    break
-
-                            if not nodeExist:
-                                node = Node([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j])
-                            if not node in closed:
-                                node.set_parent(currentNode)
-                                currentNode.add_child(node)
-                                node.set_g_cost(node.parent.get_g_cost() + myMap.get_cell_value([currentNode.get_pos()[0] + i, currentNode.get_pos()[1] + j]))
-                                node.set_h_cost(myMap.get_goal_pos())
-                                node.set_f_cost()
-                                opened.append(node)
-                                frontier.append(node)
-
-            frontier.sort(key=lambda x: x.f_cost)
-
-            frontier.remove(currentNode)
-            closed.append(currentNode)
-
-
-        while currentNode.parent is not None:
-            currentNode = currentNode.parent
-            goal_path.append(currentNode)
-
-        if len(goal_path) < counter:
-            goal_not_found = False
-
-    for node in goal_path:
-        myMap.set_cell_value(node.get_pos(), 'G')
+    # The goal moves the same way every time, so we can work out where it will be and catch it in one search
+    result = intercept.intercept(myMap.int_map, myMap.get_start_pos(), myMap.goal_trajectory())
+    if result.path is None:
+        print("The goal cannot be caught")
+        return
+    print("Caught the goal after", len(result.path) - 1, "ticks. Path cost:", result.cost,
+          "Expanded states:", result.expanded)
+
+    frames = []  # One image per tick if we are making an animation
+    for tick in range(len(result.path)):
+        if animation_file is not None:
+            frames.append(myMap.render_map(path=result.path[:tick + 1]))
+        if tick < len(result.path) - 1:
+            myMap.tick()
+    if animation_file is not None:
+        Map.save_frames(frames, animation_file)
+
+    for pos in result.path:
+        myMap.set_cell_value(pos, 'G')
     myMap.set_cell_value(myMap.get_start_pos(), ' S ')
     myMap.show_map()
 
+def task_agents(task_number, agent_count, weight=cbs.ECBS_WEIGHT, seed=None, max_nodes=300):
+    """
+    Plans paths without collisions for a number of agents with random start and goal cells on the map of a task.
+    :param task_number: the task whose map is used
+    :param agent_count: number of agents
+    :param weight: how many times more than the cheapest solution the paths may cost, 1 for the cheapest, which only
+    works for a few agents. If CBS gives up, the agents are planned with prioritized planning.
+    :param seed: seed for picking the start and goal cells
+    :param max_nodes: constraint tree nodes CBS may expand before giving up
+    :return: nothing.
+    """
+    myMap = Map.Map_Obj(task_number)
+    agents = cbs.random_agents(myMap.int_map, agent_count, seed)
+    result = cbs.conflict_based_search(myMap.int_map, agents, weight, max_nodes)
+    if not result.found():
+        print("No paths without collisions were found after", result.nodes, "constraint tree nodes,",
+              "planning the agents one at a time instead")
+        result = cbs.prioritized_planning(myMap.int_map, agents)
+    print("Total cost:", result.cost, "Expanded states:", result.expanded, "Constraint tree nodes:", result.nodes)
+    if result.bound is not None and result.bound != 1:
+        print("The total cost is at most", result.bound, "times the cheapest one")
+
+    for path in result.paths:
+        for pos in path:
+            myMap.set_cell_value(pos, 'G')
+    for start, goal in agents:
+        myMap.set_cell_value(start, ' S ')
+    myMap.show_map()
+
+def compare_expansions(algorithm, baseline='astar'):
+    """
+    Prints how many fewer nodes an algorithm expands than the baseline on tasks 1-4.
+    :param algorithm: name of the algorithm in ALGORITHMS
+    :param baseline: name of the algorithm to compare with
+    :return: nothing.
+    """
+    for task_number in range(1, 5):
+        myMap = Map.Map_Obj(task_number)
+        results = [ALGORITHMS[name](myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos())
+                   for name in (baseline, algorithm)]
+        saved = 1 - results[1].expanded / results[0].expanded
+        print("Task", task_number, baseline + ":", results[0].expanded, algorithm + ":", results[1].expanded,
+              "saved: %.0f%%" % (saved * 100), "same cost:", results[0].cost == results[1].cost)
+
+def compare_speedup(size=512, worker_counts=(1, 2, 4)):
+    """
+    Prints how much faster the parallel search is than the sequential astar on one long query across a random map.
+    :param size: height and width of the generated map
+    :param worker_counts: numbers of worker processes to try
+    :return: nothing.
+    """
+    int_map = mapgen.random_map(size, size, seed=size)
+    start, goal = mapgen.pick_endpoints(int_map)
+    for row in parallel.measure_speedup(int_map, start, goal, worker_counts):
+        name = "astar" if row['workers'] == 0 else str(row['workers']) + " workers"
+        print("%-10s %8.3f s  speedup %.2f  expanded %d  cost %s" % (
+            name, row['time'], row['speedup'], row['expanded'], row['cost']))
+
+def task_any_angle(task_number):
+    """
+    Finds an any-angle path with Theta* on the map of a task and draws the cells it goes through.
+    :param task_number: the task whose map is used
+    :return: nothing.
+    """
+    myMap = Map.Map_Obj(task_number)
+    result = theta.theta_star(myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos())
+    if result.path is None:
+        print("The goal cannot be reached")
+        return
+    print("Waypoints:", result.path)
+    print("Path cost: %.2f" % result.cost, "Expanded nodes:", result.expanded)
+
+    for pos in theta.trace_cells(result.path):
+        myMap.set_cell_value(pos, 'G')
+    myMap.set_cell_value(myMap.get_start_pos(), ' S ')
+    myMap.show_map()
+
+def compare_any_angle():
+    """
+    Prints the time and path cost of astar, astar with smoothing and Theta* on tasks 1-4. All the costs are measured
+    with straight segments between the waypoints, see theta.py.
+    :return: nothing.
+    """
+    for task_number in range(1, 5):
+        myMap = Map.Map_Obj(task_number)
+        for row in theta.measure_against_astar(myMap.int_map, myMap.get_start_pos(), myMap.get_goal_pos()):
+            if row['cost'] is None:
+                print("Task %d %-12s %8.4f s  expanded %5d  no path" % (
+                    task_number, row['method'], row['time'], row['expanded']))
+                continue
+            print("Task %d %-12s %8.4f s  expanded %5d  cost %7.2f  waypoints %d" % (
+                task_number, row['method'], row['time'], row['expanded'], row['cost'], row['waypoints']))
+
+
 def main():
     task(1)
     task(2)
@@ -213,11 +174,5 @@ def main():
 
 
 
-def manhattan_distance(first_pos, second_pos):  # Calculating the distance in how many steps it takes to move there
-    hor_dist = abs(first_pos[0] - second_pos[0])
-    ver_dist = abs(first_pos[1] - second_pos[1])
-    return hor_dist + ver_dist
-
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,213 @@
+import argparse
+import sys
+import numpy as np
+from fields import dijkstra_field
+
+
+# Generated maps for testing the search algorithms on other and larger maps than the Samfundet ones. They use the same
+# values as the .csv maps: -1 for walls and 1-4 for the cost of entering a cell.
+#
+# random_map and maze_map make small maps in one go. generate_map makes maps of up to 10000x10000 cells and more a band
+# of rows at a time, so that it never needs more memory than the map itself and a band of temporary arrays, and can
+# write the map straight to a .npy file that Map_Obj memory-maps. Every band only depends on the seed and a few small
+# arrays drawn from it up front, so the same seed always gives the same map.
+
+BAND_ROWS = 256  # Rows made at a time by generate_map
+
+def random_map(height, width, wall_fraction=0.2, seed=None):
+    """
+    A map where every cell gets a random cost, and a fraction of the cells are walls.
+    :return: int8 numpy array with the map
+    """
+    rng = np.random.default_rng(seed)
+    int_map = rng.integers(1, 5, size=(height, width), dtype=np.int8)
+    int_map[rng.random((height, width)) < wall_fraction] = -1
+    return int_map
+
+
+def maze_map(height, width, seed=None):
+    """
+    A maze with corridors of cost 1. The cells with odd coordinates are rooms, and every room is opened up to the room
+    above it or to the left of it (the binary tree algorithm), which gives a maze with exactly one path between any
+    two rooms.
+    :return: int8 numpy array with the map
+    """
+    rng = np.random.default_rng(seed)
+    int_map = np.full((height, width), -1, dtype=np.int8)
+    int_map[1:height - 1:2, 1:width - 1:2] = 1
+    rows, cols = np.mgrid[1:height - 1:2, 1:width - 1:2]
+    up = rng.random(rows.shape) < 0.5
+    # Rooms in the top row can only go left, and rooms in the left column can only go up
+    up = np.where(rows == 1, False, np.where(cols == 1, True, up))
+    first = (rows == 1) & (cols == 1)
+    int_map[rows[up & ~first] - 1, cols[up & ~first]] = 1
+    int_map[rows[~up & ~first], cols[~up & ~first] - 1] = 1
+    return int_map
+
+
+def pick_endpoints(int_map):
+    """
+    Picks a start and a goal that are far apart: the start is the first open cell and the goal is the cell that is
+    most expensive to reach from it.
+    :return: start position and goal position, or None and None if the map has no open cells.
+    """
+    free = np.argwhere(int_map != -1)
+    if len(free) == 0:
+        return None, None
+    start = [int(free[0][0]), int(free[0][1])]
+    distance = dijkstra_field(int_map, [start])
+    distance[np.isinf(distance)] = -1
+    goal = np.unravel_index(np.argmax(distance), int_map.shape)
+    return start, [int(goal[0]), int(goal[1])]
+
+
+def rooms_rows(height, width, seed, first_row, last_row, room_size=12):
+    """
+    Rows of a map of square rooms with walls between them. Every room has one cost for all its cells, and a door to
+    each of its neighbours, so every room can be reached and there are many ways between two rooms.
+    :return: int8 array with the rows from first_row up to last_row
+    """
+    rng = np.random.default_rng(seed)
+    block_rows, block_cols = -(-height // room_size), -(-width // room_size)
+    room_cost = rng.integers(1, 5, size=(block_rows, block_cols), dtype=np.int8)
+    # Where the door is along the top wall and the left wall of every room, never on a corner
+    top_door = rng.integers(1, room_size, size=(block_rows, block_cols))
+    left_door = rng.integers(1, room_size, size=(block_rows, block_cols))
+
+    rows = np.arange(first_row, last_row)
+    cols = np.arange(width)
+    band = room_cost[rows // room_size][:, cols // room_size]
+    wall_rows = (rows % room_size == 0) & (rows > 0)
+    wall_cols = (cols % room_size == 0) & (cols > 0)
+    band[wall_rows] = -1
+    band[:, wall_cols] = -1
+    # Doors in the top walls, which are the rows of the band that are walls
+    for index in np.flatnonzero(wall_rows):
+        block = rows[index] // room_size
+        door_cols = np.arange(block_cols) * room_size + top_door[block]
+        door_cols = door_cols[door_cols < width]
+        band[index, door_cols] = room_cost[block, door_cols // room_size]
+    # Doors in the left walls, at the rows of the band where a room has its door
+    blocks = rows // room_size
+    for block_col in range(1, block_cols):
+        col = block_col * room_size
+        door = rows == blocks * room_size + left_door[blocks, block_col]
+        band[door, col] = room_cost[blocks[door], block_col]
+    return band
+
+
+def maze_rows(height, width, seed, first_row, last_row):
+    """
+    Rows of a maze made like maze_map, with the choice of every row of rooms drawn from the seed and the row number so
+    that a row can be made without the ones above it. It is a different maze than maze_map makes for the same seed.
+    :return: int8 array with the rows from first_row up to last_row
+    """
+    room_cols = np.arange(1, width - 1, 2)
+
+    def goes_up(room_row):
+        # For every room in a row, True if it opens up to the room above it and False if to the room on its left
+        up = np.random.default_rng([seed, room_row]).random(len(room_cols)) < 0.5
+        if room_row == 1:
+            return np.zeros(len(room_cols), dtype=bool)
+        up[0] = True
+        return up
+
+    band = np.full((last_row - first_row, width), -1, dtype=np.int8)
+    for row in range(first_row, last_row):
+        if row % 2 == 1 and row < height - 1:
+            up = goes_up(row)
+            band[row - first_row, room_cols] = 1
+            left = room_cols[~up]
+            band[row - first_row, left[left > 1] - 1] = 1
+        elif row % 2 == 0 and 0 < row < height - 2:
+            # The openings between this row of rooms and the one below it
+            band[row - first_row, room_cols[goes_up(row + 1)]] = 1
+    return band
+
+
+def noise_rows(height, width, seed, first_row, last_row, scale=32, wall_level=0.3):
+    """
+    Rows of terrain with smooth value noise: the costs change gradually from cheap to expensive areas, and there are
+    walls where a second noise is below wall_level.
+    :param scale: number of cells between the random values that are blended, larger gives larger areas
+    :return: int8 array with the rows from first_row up to last_row
+    """
+    rng = np.random.default_rng(seed)
+    lattice_shape = (height // scale + 2, width // scale + 2)
+    costs = rng.random(lattice_shape, dtype=np.float32)
+    walls = rng.random(lattice_shape, dtype=np.float32)
+
+    def blend(lattice):
+        # Smooth interpolation between the four lattice values around every cell
+        rows = np.arange(first_row, last_row, dtype=np.float32) / scale
+        cols = np.arange(width, dtype=np.float32) / scale
+        row_index, col_index = rows.astype(np.intp), cols.astype(np.intp)
+        row_weight, col_weight = rows - row_index, cols - col_index
+        row_weight = (row_weight * row_weight * (3 - 2 * row_weight))[:, np.newaxis]
+        col_weight = col_weight * col_weight * (3 - 2 * col_weight)
+        top = lattice[row_index][:, col_index] * (1 - col_weight) + lattice[row_index][:, col_index + 1] * col_weight
+        bottom = lattice[row_index + 1][:, col_index] * (1 - col_weight) + \
+            lattice[row_index + 1][:, col_index + 1] * col_weight
+        return top * (1 - row_weight) + bottom * row_weight
+
+    # Blending pulls the values towards the middle, so they are spread out again to get all four costs
+    band = (np.clip((blend(costs) - 0.2) / 0.6, 0, 0.999) * 4).astype(np.int8) + 1
+    band[blend(walls) < wall_level] = -1
+    return band
+
+
+def random_rows(height, width, seed, first_row, last_row, wall_fraction=0.2):
+    """
+    Rows of a map like random_map, with the random numbers of every row drawn from the seed and the row number.
+    :return: int8 array with the rows from first_row up to last_row
+    """
+    band = np.empty((last_row - first_row, width), dtype=np.int8)
+    for row in range(first_row, last_row):
+        rng = np.random.default_rng([seed, row])
+        band[row - first_row] = rng.integers(1, 5, size=width, dtype=np.int8)
+        band[row - first_row, rng.random(width) < wall_fraction] = -1
+    return band
+
+
+GENERATORS = {'rooms': rooms_rows, 'maze': maze_rows, 'noise': noise_rows, 'random': random_rows}
+
+
+def generate_map(kind, height, width, seed=0, path=None, **options):
+    """
+    Makes a map a band of rows at a time.
+    :param kind: 'rooms', 'maze', 'noise' or 'random', see the functions in GENERATORS
+    :param seed: the same seed gives the same map
+    :param path: .npy file to write the map to, or None to keep it in memory
+    :param options: passed on to the generator, like room_size for 'rooms'
+    :return: int8 numpy array with the map. If it was written to a file, it is memory-mapped from it like
+    Map.load_int_map does.
+    """
+    if kind not in GENERATORS:
+        raise ValueError('Unknown kind of map: ' + str(kind))
+    if path is None:
+        int_map = np.empty((height, width), dtype=np.int8)
+    else:
+        int_map = np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=(height, width))
+    for first_row in range(0, height, BAND_ROWS):
+        last_row = min(first_row + BAND_ROWS, height)
+        int_map[first_row:last_row] = GENERATORS[kind](height, width, seed, first_row, last_row, **options)
+    if path is None:
+        return int_map
+    int_map.flush()
+    del int_map
+    return np.load(path, mmap_mode='c')
+
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description='Generate a map and write it to a .npy file.')
+    parser.add_argument('kind', choices=list(GENERATORS))
+    parser.add_argument('height', type=int)
+    parser.add_argument('width', type=int)
+    parser.add_argument('output', help='the .npy file to write')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(arguments)
+
+
+if __name__ == "__main__":
+    options = parse_arguments(sys.argv[1:])
+    generate_map(options.kind, options.height, options.width, options.seed, options.output)
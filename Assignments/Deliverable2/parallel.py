@@ -0,0 +1,273 @@
+import heapq
+import multiprocessing
+import os
+import queue
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from search import NEIGHBOURS, SearchResult, astar, manhattan_distance
+
+
+# Parallel A* in the style of HDA* (hash distributed A*) for single long queries on big maps. Every cell belongs to
+# one worker process, picked by hashing its index, and only that worker keeps the cost of the cell and expands it. A
+# child that belongs to another worker is sent over to it, in batches with other children for the same worker. The map
+# and the parent pointers are in shared memory, so the workers do not get copies of them, and the coordinator (the
+# process that called parallel_astar) reads the path from the parent pointers at the end.
+#
+# The workers do not expand in the order a single A* would, so a cell can get a cheaper cost after it was expanded,
+# and is then expanded again. The first path to the goal is therefore not always the cheapest. The owner of the goal
+# keeps the cost of the cheapest path found so far, every worker drops the nodes whose f cost is not below it, and the
+# search is over when no worker has anything left to do and no batch is on its way. The coordinator finds that out by
+# counting the batches sent and received, and asking every worker for its counts once more to make sure they did not
+# change in the meantime.
+
+def owner(index, workers):
+    # Multiplicative hashing, so that neighbouring cells are spread over the workers
+    return ((index * 2654435761) & 0xFFFFFFFF) * workers >> 32
+
+
+class PartitionWorker:
+    """
+    The part of the search done by one worker: the cells that hash to it.
+    """
+
+    def __init__(self, rank, workers, costs, parents, goal, heuristic, inboxes, reports, best_cost, batch_size):
+        self.rank = rank
+        self.workers = workers
+        self.height, self.width = costs.shape
+        self.costs = costs.ravel()
+        self.parents = parents.ravel()
+        self.goal = (goal[0], goal[1])
+        self.goal_index = goal[0] * self.width + goal[1]
+        self.heuristic = heuristic
+        self.inbox = inboxes[rank]
+        self.inboxes = inboxes
+        self.reports = reports
+        self.best_cost = best_cost  # Cost of the cheapest path to the goal found so far, only the goal's owner sets it
+        self.batch_size = batch_size
+        self.g_costs = {}  # Cheapest cost found so far for the cells of this worker
+        self.frontier = []  # Min-heap of (f cost, h cost, g cost, cell)
+        self.outboxes = [[] for _ in range(workers)]
+        self.sent = 0  # Batches sent to other workers
+        self.received = 0
+        self.expanded = 0
+
+    def add(self, g_cost, index, parent):
+        # A node for a cell of this worker, from itself or from another worker
+        if g_cost >= self.g_costs.get(index, float('inf')):
+            return
+        self.g_costs[index] = g_cost
+        self.parents[index] = parent
+        if index == self.goal_index:
+            if g_cost < self.best_cost.value:
+                self.best_cost.value = g_cost
+            return
+        row, col = divmod(index, self.width)
+        h_cost = self.heuristic((row, col), self.goal)
+        if h_cost != float('inf'):
+            heapq.heappush(self.frontier, (g_cost + h_cost, h_cost, g_cost, index))
+
+    def send(self, worker, g_cost, index, parent):
+        outbox = self.outboxes[worker]
+        outbox.append((g_cost, index, parent))
+        if len(outbox) >= self.batch_size:
+            self.flush(worker)
+
+    def flush(self, worker):
+        if self.outboxes[worker]:
+            self.inboxes[worker].put(('nodes', self.outboxes[worker]))
+            self.outboxes[worker] = []
+            self.sent += 1
+
+    def expand(self):
+        # Expands up to one batch of nodes before looking at the inbox again
+        for _ in range(self.batch_size):
+            if not self.frontier:
+                return
+            f_cost, _, g_cost, index = heapq.heappop(self.frontier)
+            if g_cost != self.g_costs[index]:
+                continue  # A cheaper node for the cell came later
+            if f_cost >= self.best_cost.value:
+                # Nothing left here can lead to a cheaper path to the goal
+                self.frontier.clear()
+                return
+            self.expanded += 1
+            row, col = divmod(index, self.width)
+            for i, j in NEIGHBOURS:
+                if not (0 <= row + i < self.height and 0 <= col + j < self.width):
+                    continue
+                child = index + i * self.width + j
+                cell_cost = int(self.costs[child])
+                if cell_cost == -1:
+                    continue
+                worker = owner(child, self.workers)
+                if worker == self.rank:
+                    self.add(g_cost + cell_cost, child, index)
+                else:
+                    self.send(worker, g_cost + cell_cost, child, index)
+
+    def idle(self):
+        return not self.frontier and not any(self.outboxes)
+
+    def run(self):
+        reported = False  # True once the coordinator has been told that this worker is idle
+        while True:
+            if not self.frontier:
+                for worker in range(self.workers):
+                    self.flush(worker)
+                if not reported:
+                    self.reports.put(('idle', self.rank, self.sent, self.received))
+                    reported = True
+            # Waiting for messages only when there is nothing else to do
+            try:
+                message = self.inbox.get(block=not self.frontier)
+            except queue.Empty:
+                message = None
+            while message is not None:
+                if message[0] == 'nodes':
+                    self.received += 1
+                    reported = False
+                    for g_cost, index, parent in message[1]:
+                        self.add(g_cost, index, parent)
+                elif message[0] == 'probe':
+                    self.reports.put(('status', self.rank, message[1], self.idle(), self.sent, self.received))
+                else:  # 'stop'
+                    self.reports.put(('done', self.rank, self.expanded))
+                    return
+                try:
+                    message = self.inbox.get_nowait()
+                except queue.Empty:
+                    message = None
+            self.expand()
+
+
+def run_worker(rank, workers, map_name, parent_name, shape, dtype, goal, heuristic, inboxes, reports, best_cost,
+               batch_size):
+    # The body of a worker process
+    map_memory = shared_memory.SharedMemory(name=map_name)
+    parent_memory = shared_memory.SharedMemory(name=parent_name)
+    costs = np.ndarray(shape, dtype=dtype, buffer=map_memory.buf)
+    parents = np.ndarray(shape, dtype=np.int32, buffer=parent_memory.buf)
+    worker = PartitionWorker(rank, workers, costs, parents, goal, heuristic, inboxes, reports, best_cost, batch_size)
+    worker.run()
+    # The arrays have to be gone before the shared memory can be closed
+    del worker, costs, parents
+    map_memory.close()
+    parent_memory.close()
+
+
+def wait_until_done(workers, inboxes, reports, seeded):
+    """
+    Waits until every worker is idle and every batch that was sent has been received.
+    :param seeded: number of batches the coordinator sent itself
+    :return: nothing.
+    """
+    counts = {}  # Worker -> (sent, received) when it last said it was idle
+    wave = 0
+    while True:
+        if len(counts) < workers or seeded + sum(sent for sent, _ in counts.values()) != \
+                sum(received for _, received in counts.values()):
+            message = reports.get()
+            if message[0] == 'idle':
+                counts[message[1]] = message[2:]
+            continue
+
+        # A worker may have got work since it said it was idle, so every worker is asked again. If none of them is
+        # busy and the counts are the same as before, nothing can have happened in between.
+        wave += 1
+        for inbox in inboxes:
+            inbox.put(('probe', wave))
+        replies = {}
+        while len(replies) < workers:
+            message = reports.get()
+            if message[0] == 'status' and message[2] == wave:
+                replies[message[1]] = message[3:]
+        if all(idle and (sent, received) == tuple(counts[rank]) for rank, (idle, sent, received) in replies.items()):
+            return
+        # Busy workers will say when they are idle again, and the others are checked again with their new counts
+        counts = {rank: (sent, received) for rank, (idle, sent, received) in replies.items() if idle}
+
+
+def parallel_astar(int_map, start, goal, heuristic=manhattan_distance, workers=None, batch_size=64):
+    """
+    Finds the cheapest path from start to goal with several worker processes, see the top of this file.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column]
+    :param goal: goal position [row, column]
+    :param heuristic: function taking two positions and returning a consistent estimate of the cost between them. It
+    is sent to every worker, so it has to be picklable.
+    :param workers: number of worker processes, the number of CPUs if None
+    :param batch_size: number of nodes sent to another worker at once, and expanded between looking for new ones
+    :return: a SearchResult with the path, its cost and the number of expansions of all workers together. A cell can
+    be expanded by its worker more than once.
+    """
+    workers = workers or os.cpu_count() or 1
+    if int_map[start[0], start[1]] == -1 or int_map[goal[0], goal[1]] == -1:
+        return SearchResult()
+    height, width = int_map.shape
+    context = multiprocessing.get_context()
+    map_memory = shared_memory.SharedMemory(create=True, size=max(int_map.nbytes, 1))
+    parent_memory = shared_memory.SharedMemory(create=True, size=height * width * 4)
+    costs = np.ndarray(int_map.shape, dtype=int_map.dtype, buffer=map_memory.buf)
+    parents = np.ndarray(int_map.shape, dtype=np.int32, buffer=parent_memory.buf).ravel()
+    try:
+        costs[:] = int_map
+        parents[:] = -1
+        inboxes = [context.Queue() for _ in range(workers)]
+        reports = context.Queue()
+        best_cost = context.RawValue('d', float('inf'))
+        processes = [context.Process(target=run_worker, args=(
+            rank, workers, map_memory.name, parent_memory.name, int_map.shape, int_map.dtype, goal, heuristic,
+            inboxes, reports, best_cost, batch_size), daemon=True) for rank in range(workers)]
+        for process in processes:
+            process.start()
+
+        start_index = start[0] * width + start[1]
+        inboxes[owner(start_index, workers)].put(('nodes', [(0, start_index, -1)]))
+        wait_until_done(workers, inboxes, reports, seeded=1)
+        for inbox in inboxes:
+            inbox.put(('stop',))
+        expanded = 0
+        done = 0
+        while done < workers:
+            message = reports.get()
+            if message[0] == 'done':
+                expanded += message[2]
+                done += 1
+        for process in processes:
+            process.join()
+
+        if best_cost.value == float('inf'):
+            return SearchResult(None, None, expanded)
+        path = []
+        index = goal[0] * width + goal[1]
+        while index != -1:
+            path.append(list(divmod(index, width)))
+            index = int(parents[index])
+        path.reverse()
+        return SearchResult(path, int(best_cost.value), expanded)
+    finally:
+        del costs, parents
+        map_memory.close()
+        map_memory.unlink()
+        parent_memory.close()
+        parent_memory.unlink()
+
+
+def measure_speedup(int_map, start, goal, worker_counts=(1, 2, 4), heuristic=manhattan_distance):
+    """
+    Times the sequential A* of search.py and parallel_astar with different numbers of workers on one query.
+    :return: list of dictionaries with the number of workers (0 for the sequential search), the time in seconds, the
+    speedup over the sequential search, the expanded nodes and the path cost.
+    """
+    start_time = time.perf_counter()
+    result = astar(int_map, start, goal, heuristic)
+    sequential = time.perf_counter() - start_time
+    rows = [{'workers': 0, 'time': sequential, 'speedup': 1.0, 'expanded': result.expanded, 'cost': result.cost}]
+    for workers in worker_counts:
+        start_time = time.perf_counter()
+        result = parallel_astar(int_map, start, goal, heuristic, workers)
+        seconds = time.perf_counter() - start_time
+        rows.append({'workers': workers, 'time': seconds, 'speedup': sequential / seconds,
+                     'expanded': result.expanded, 'cost': result.cost})
+    return rows
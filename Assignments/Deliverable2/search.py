@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import numpy as np
+
+
+# The A* search engine used by main.py. The frontier is a binary heap and the search state of every position is stored
+# in a NodeStore, so we never have to sort the frontier or scan lists to find a node.
+
+NEIGHBOURS = ((-1, 0), (0, -1), (0, 1), (1, 0))  # Children in a plus shape
+
+
+class SearchResult:
+
+    def __init__(self, path=None, cost=None, expanded=0, bound=1.0):
+        self.path = path  # List of positions from start to goal, None if the goal is unreachable
+        self.cost = cost
+        self.expanded = expanded  # Number of nodes taken off the frontier and expanded
+        self.bound = bound  # The path costs at most this many times the cheapest one, None if unknown
+
+    def found(self):
+        return self.path is not None
+
+    def __str__(self):
+        return "cost: " + str(self.cost) + ", expanded: " + str(self.expanded)
+
+
+def manhattan_distance(first_pos, second_pos):  # Calculating the distance in how many steps it takes to move there
+    hor_dist = abs(first_pos[0] - second_pos[0])
+    ver_dist = abs(first_pos[1] - second_pos[1])
+    return hor_dist + ver_dist
+
+
+class NodeStore:
+    """
+    The search state of every cell on the map, kept in preallocated numpy arrays shaped like the integer map instead of
+    one Node object per cell. Cells are addressed by their flat index row * width + column.
+    """
+    NEW = 0
+    OPEN = 1
+    CLOSED = 2
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.width = shape[1]
+        self.g_cost = np.zeros(shape, dtype=np.int32).ravel()
+        self.f_cost = np.zeros(shape, dtype=np.float64).ravel()  # The heuristic does not have to give integers
+        self.parent = np.full(shape, -1, dtype=np.int32).ravel()
+        self.status = np.zeros(shape, dtype=np.uint8).ravel()
+        # The search in which each cell was last opened. The status of a cell only counts if it is from this search,
+        # so a new search does not have to clear the whole map.
+        self.stamp = np.zeros(shape, dtype=np.uint32).ravel()
+        self.generation = 1
+
+    def reset(self):
+        # The costs and parent of a cell are overwritten when it is opened, so a new generation is all it takes
+        self.generation += 1
+        if self.generation > np.iinfo(np.uint32).max:
+            self.stamp.fill(0)
+            self.generation = 1
+
+    def status_of(self, index):
+        return self.status[index] if self.stamp[index] == self.generation else NodeStore.NEW
+
+    def to_index(self, pos):
+        return pos[0] * self.width + pos[1]
+
+    def to_pos(self, index):
+        return list(divmod(index, self.width))
+
+    def open_node(self, index, g_cost, f_cost, parent):
+        self.g_cost[index] = g_cost
+        self.f_cost[index] = f_cost
+        self.parent[index] = parent
+        self.status[index] = NodeStore.OPEN
+        self.stamp[index] = self.generation
+
+    def path_to(self, index):
+        # Following the parent pointers back from the index to the start
+        path = []
+        while index != -1:
+            path.append(self.to_pos(index))
+            index = int(self.parent[index])
+        path.reverse()
+        return path
+
+    def nbytes(self):
+        return self.g_cost.nbytes + self.f_cost.nbytes + self.parent.nbytes + self.status.nbytes + self.stamp.nbytes
+
+
+def astar(int_map, start, goal, heuristic=manhattan_distance, store=None):
+    """
+    Finds the cheapest path from start to goal on the integer map. Moving into a cell costs the value of that cell, and
+    cells with the value -1 are walls.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column]
+    :param goal: goal position [row, column]
+    :param heuristic: function taking two positions and returning a consistent estimate of the cost between them
+    :param store: a NodeStore for the map to reuse between searches. A new one is made if None.
+    :return: a SearchResult with the path, its cost and the number of expanded nodes.
+    """
+    height, width = int_map.shape
+    costs = int_map.ravel()
+    if store is None:
+        store = NodeStore(int_map.shape)
+    else:
+        store.reset()
+    start_index = store.to_index(start)
+    goal_index = store.to_index(goal)
+    goal = (goal[0], goal[1])
+
+    tie_breaker = itertools.count()  # Makes the order of nodes with equal f and h costs first in, first out
+    h_cost = heuristic(start, goal)
+    if h_cost == float('inf'):
+        return SearchResult(None, None, 0)
+    store.open_node(start_index, 0, h_cost, -1)
+    frontier = [(h_cost, h_cost, next(tie_breaker), 0, start_index)]
+    expanded = 0
+
+    while frontier:
+        _, _, _, g_cost, index = heapq.heappop(frontier)
+        # Entries are never removed from the heap when a node gets a cheaper cost, so we skip the stale ones here
+        if store.status_of(index) == NodeStore.CLOSED or g_cost != store.g_cost[index]:
+            continue
+        store.status[index] = NodeStore.CLOSED
+        expanded += 1
+
+        if index == goal_index:
+            return SearchResult(store.path_to(index), int(g_cost), expanded)
+
+        row, col = divmod(index, width)
+        for i, j in NEIGHBOURS:
+            child_row, child_col = row + i, col + j
+            if not (0 <= child_row < height and 0 <= child_col < width):
+                continue
+            child = index + i * width + j
+            cell_cost = int(costs[child])
+            if cell_cost == -1:
+                continue
+            child_status = store.status_of(child)
+            child_g_cost = g_cost + cell_cost
+            if child_status == NodeStore.CLOSED or \
+                    (child_status == NodeStore.OPEN and child_g_cost >= store.g_cost[child]):
+                continue
+            h_cost = heuristic((child_row, child_col), goal)
+            if h_cost == float('inf'):
+                continue  # The heuristic knows that the goal cannot be reached from here
+            store.open_node(child, child_g_cost, child_g_cost + h_cost, index)
+            heapq.heappush(frontier, (child_g_cost + h_cost, h_cost, next(tie_breaker), child_g_cost, child))
+
+    return SearchResult(None, None, expanded)
@@ -0,0 +1,146 @@
+import collections
+import multiprocessing
+import Map
+import search
+from search import manhattan_distance
+
+
+# Answering many path queries on the same map. The map is loaded once and the cost grid stays in memory, so a query
+# only pays for the search itself. Queries that were asked before can be answered from a cache of paths.
+
+class PathCache:
+    """
+    The most recently found paths, by start and goal. When a cell cost goes up, only the paths through that cell can
+    stop being the cheapest, so only they are thrown away. When a cell cost goes down, any path might now have a
+    cheaper way around, so everything is thrown away.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.results = collections.OrderedDict()  # (start, goal) -> SearchResult, the least recently used first
+        self.crossing = {}  # (row, column) -> set of the (start, goal) keys of the cached paths through the cell
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, myMap):
+        """
+        Keeps the cache up to date with the cell costs of a Map_Obj. The map object must use the same integer map as
+        the searches.
+        """
+        myMap.add_cost_listener(self.cost_changed)
+
+    def get(self, start, goal):
+        key = ((start[0], start[1]), (goal[0], goal[1]))
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result
+
+    def put(self, start, goal, result):
+        key = ((start[0], start[1]), (goal[0], goal[1]))
+        if key in self.results:
+            self.remove(key)
+        self.results[key] = result
+        for pos in result.path or ():
+            self.crossing.setdefault((pos[0], pos[1]), set()).add(key)
+        if len(self.results) > self.max_size:
+            self.remove(next(iter(self.results)))
+
+    def remove(self, key):
+        result = self.results.pop(key)
+        for pos in result.path or ():
+            keys = self.crossing[(pos[0], pos[1])]
+            keys.discard(key)
+            if not keys:
+                del self.crossing[(pos[0], pos[1])]
+
+    def clear(self):
+        self.results.clear()
+        self.crossing.clear()
+
+    def cost_changed(self, pos, old_value, new_value):
+        # Walls have the value -1, so a wall that is taken away counts as a cost that went down
+        if old_value == -1 or (new_value != -1 and new_value < old_value):
+            self.clear()
+        else:
+            for key in list(self.crossing.get((pos[0], pos[1]), ())):
+                self.remove(key)
+
+    def __len__(self):
+        return len(self.results)
+
+
+class PathService:
+
+    def __init__(self, int_map, heuristic=manhattan_distance, cache_size=0):
+        """
+        :param int_map: 2D numpy array with the cell costs
+        :param heuristic: function taking two positions and returning an admissible estimate of the cost between them
+        :param cache_size: number of paths to keep for queries that are asked again, 0 for no cache. If the costs of
+        the map can change, the cache has to be attached to the Map_Obj, which from_map does.
+        """
+        self.int_map = int_map
+        self.heuristic = heuristic
+        self.store = search.NodeStore(int_map.shape)  # Reused by every query instead of allocating a new one
+        self.cache = PathCache(cache_size) if cache_size else None
+
+    @classmethod
+    def from_map(cls, myMap, heuristic=manhattan_distance, cache_size=0):
+        service = cls(myMap.int_map, heuristic, cache_size)
+        if service.cache is not None:
+            service.cache.attach(myMap)
+        return service
+
+    @classmethod
+    def from_file(cls, path, heuristic=manhattan_distance, cache_size=0):
+        return cls(Map.load_int_map(path), heuristic, cache_size)
+
+    @classmethod
+    def from_task(cls, task, heuristic=manhattan_distance, cache_size=0):
+        return cls.from_map(Map.Map_Obj(task), heuristic, cache_size)
+
+    def query(self, start, goal):
+        """
+        Finds the cheapest path between two positions.
+        :return: a SearchResult with the path, its cost and the number of expanded nodes, which is 0 if the path came
+        from the cache. The path is shared with the cache and must not be changed.
+        """
+        if self.cache is None:
+            return search.astar(self.int_map, start, goal, self.heuristic, self.store)
+        result = self.cache.get(start, goal)
+        if result is not None:
+            return search.SearchResult(result.path, result.cost, 0, result.bound)
+        result = search.astar(self.int_map, start, goal, self.heuristic, self.store)
+        self.cache.put(start, goal, result)
+        return result
+
+    def query_many(self, pairs, processes=None, chunksize=64):
+        """
+        Answers a list of queries.
+        :param pairs: list of (start, goal) pairs
+        :param processes: number of worker processes to spread the queries over. If None, they are answered in this
+        process.
+        :param chunksize: number of queries sent to a worker at a time
+        :return: list of SearchResults in the same order as the pairs.
+        """
+        if processes is None:
+            return [self.query(start, goal) for start, goal in pairs]
+
+        # Every worker gets its own copy of the map once, when it starts, and not with every query
+        with multiprocessing.Pool(processes, initializer=init_worker, initargs=(self.int_map, self.heuristic)) as pool:
+            return pool.map(answer_query, pairs, chunksize)
+
+
+worker_service = None  # The PathService of a worker process
+
+
+def init_worker(int_map, heuristic):
+    global worker_service
+    worker_service = PathService(int_map, heuristic)
+
+
+def answer_query(pair):
+    return worker_service.query(pair[0], pair[1])
@@ -0,0 +1,29 @@
+import numpy as np
+import anytime
+import mapgen
+from fields import dijkstra_field
+from test_search import check_path, random_queries
+
+
+def test_bound_holds_for_any_budget():
+    # Small budgets stop the search at different points, and whatever path it has by then has to keep to its bound
+    for seed in range(3):
+        int_map = mapgen.random_map(100, 100, seed=seed)
+        for start, goal in random_queries(int_map, 3, seed):
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            for budget_ms in (1, 5, 20, 10000):
+                result = anytime.anytime_search(int_map, start, goal, budget_ms=budget_ms, weight=3.0)
+                if not result.found():
+                    assert budget_ms < 10000 or np.isinf(cheapest)
+                    continue
+                check_path(int_map, start, goal, result)
+                assert cheapest <= result.cost <= result.bound * cheapest + 1e-9
+                assert 1.0 <= result.bound <= 3.0
+            assert result.cost == (cheapest if np.isfinite(cheapest) else None)
+
+
+def test_generous_budget_finds_the_cheapest_path():
+    int_map = mapgen.maze_map(41, 41, seed=1)
+    start, goal = mapgen.pick_endpoints(int_map)
+    result = anytime.anytime_search(int_map, start, goal, budget_ms=10000)
+    assert result.cost == dijkstra_field(int_map, [start])[goal[0], goal[1]] and result.bound == 1.0
@@ -0,0 +1,36 @@
+import benchmark
+
+
+def test_variants_agree_on_the_cost(tmp_path):
+    records = benchmark.run_benchmarks(['astar', 'jps', 'bidirectional', 'bounded', 'hpa', 'replan', 'incremental'],
+                                       [16], repeats=1)
+    costs = {}
+    for record in records:
+        if record['variant'] != 'hpa':
+            costs.setdefault(record['case'], set()).add(record['cost'])
+    assert len(costs) == 4 + 2 + 1  # Tasks 1-4, a random map and a maze, and task 5
+    assert all(len(case_costs) == 1 for case_costs in costs.values()), costs
+    # HPA* paths go through the cluster borders, so they can cost more
+    assert all(record['cost'] >= min(costs[record['case']]) for record in records if record['variant'] == 'hpa')
+
+    # Reports come back the same from both formats, and do not regress against themselves
+    for name in ('report.json', 'report.csv'):
+        path = str(tmp_path / name)
+        benchmark.write_report(records, path)
+        assert benchmark.read_report(path) == records
+        assert benchmark.find_regressions(records, benchmark.read_report(path)) == []
+
+
+def test_find_regressions():
+    baseline = [{'case': 'task-1', 'variant': 'astar', 'time': 1.0, 'expanded': 100, 'peak_memory': 10, 'cost': 50},
+                {'case': 'task-1', 'variant': 'anytime', 'time': 1.0, 'expanded': 100, 'peak_memory': 10, 'cost': 50}]
+    same = [dict(record) for record in baseline]
+    assert benchmark.find_regressions(same, baseline) == []
+    worse = [dict(record, time=2.0, expanded=101, cost=49) for record in baseline]
+    regressions = benchmark.find_regressions(worse, baseline)
+    # The anytime search can only regress in time
+    assert len(regressions) == 4
+    assert sum('anytime' in regression for regression in regressions) == 1
+    assert benchmark.find_regressions(worse, baseline, time_tolerance=1.5) == \
+        [regression for regression in regressions if 'time' not in regression]
+    assert benchmark.run(['--variants', 'astar', '--sizes', '16', '--repeats', '1']) == 0
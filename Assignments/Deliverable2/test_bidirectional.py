@@ -0,0 +1,23 @@
+import numpy as np
+import bidirectional
+import mapgen
+from search import manhattan_distance
+from fields import dijkstra_field
+from test_search import check_path, random_queries
+
+
+def test_bidirectional_against_dijkstra():
+    maps = [mapgen.random_map(30, 30, seed=seed) for seed in range(5)]
+    maps += [mapgen.maze_map(31, 31, seed=seed) for seed in range(3)]
+    for seed, int_map in enumerate(maps):
+        # Also queries where the start is the goal
+        queries = random_queries(int_map, 15, seed) + [(goal, goal) for _, goal in random_queries(int_map, 2, seed)]
+        for start, goal in queries:
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            for heuristic in (manhattan_distance, None):
+                result = bidirectional.bidirectional(int_map, start, goal, heuristic)
+                if np.isinf(cheapest):
+                    assert not result.found()
+                else:
+                    check_path(int_map, start, goal, result)
+                    assert result.cost == cheapest
@@ -0,0 +1,52 @@
+import bounded
+import mapgen
+import search
+
+
+def test_small_budgets_against_astar():
+    # Maps on which a node that moved to a cheaper parent used to keep a subtree with the old costs, so the path
+    # was more expensive than the cheapest one while the bound said it was the cheapest
+    for seed in (7, 52, 92):
+        int_map = mapgen.random_map(9, 7, 0.0, seed=seed)
+        cheapest = search.astar(int_map, [8, 2], [2, 6])
+        for node_budget in range(11, 20):
+            result = bounded.bounded_search(int_map, [8, 2], [2, 6], node_budget=node_budget)
+            if result.bound == 1.0:
+                assert result.cost == cheapest.cost, (seed, node_budget)
+
+
+def test_tiny_budget_gives_up():
+    # The path does not fit in the budget. The search has to give up in a reasonable time, also without a limit on
+    # the expansions being given.
+    int_map = mapgen.random_map(20, 20, 0.0, seed=0)
+    result = bounded.bounded_search(int_map, [19, 0], [0, 19], node_budget=8)
+    assert not result.found()
+    assert result.expanded <= bounded.EXPANSIONS_PER_CELL * 20 * 20
+    assert result.bound is None
+
+
+def test_budget_well_below_astar():
+    # The path fits in the budget, but the budget holds a fifth of the cells A* expands, so the search has to forget
+    # and expand parts of the map again
+    int_map = mapgen.random_map(100, 100, seed=1)
+    start, goal = mapgen.pick_endpoints(int_map)
+    cheapest = search.astar(int_map, start, goal)
+    result = bounded.bounded_search(int_map, start, goal, node_budget=1500)
+    assert cheapest.expanded > 5 * 1500 and len(cheapest.path) < 1500
+    assert result.cost == cheapest.cost and result.bound == 1.0
+    assert result.peak_nodes <= 1500
+    assert result.expanded < 2 * cheapest.expanded
+
+
+def test_random_maps_against_astar():
+    for seed in range(30):
+        int_map = mapgen.random_map(15, 15, seed=seed)
+        start, goal = mapgen.pick_endpoints(int_map)
+        cheapest = search.astar(int_map, start, goal)
+        for node_budget in (20, 50, 1000):
+            result = bounded.bounded_search(int_map, start, goal, node_budget=node_budget)
+            if result.found():
+                assert result.cost == sum(int(int_map[row, col]) for row, col in result.path[1:])
+            if result.bound == 1.0:
+                assert result.cost == cheapest.cost, (seed, node_budget)
+        assert bounded.bounded_search(int_map, start, goal, node_budget=1000).cost == cheapest.cost
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import Map
+import numpy as np
+import cbs
+import mapgen
+from search import NEIGHBOURS
+
+
+def check_paths(int_map, agents, result):
+    # Every path goes from the start to the goal one step or wait at a time, costs what the result says, and no two
+    # paths collide
+    width = int_map.shape[1]
+    for (start, goal), path, cost in zip(agents, result.paths, result.costs):
+        assert path[0] == start and path[-1] == goal
+        for (row, col), (next_row, next_col) in zip(path, path[1:]):
+            assert (next_row - row, next_col - col) in NEIGHBOURS + ((0, 0),)
+            assert int_map[next_row, next_col] != -1
+        assert cost == sum(int(int_map[row, col]) for row, col in path[1:])
+    assert result.cost == sum(result.costs)
+    assert cbs.find_conflicts([[row * width + col for row, col in path] for path in result.paths])[0] == 0
+
+
+def cheapest_joint_cost(int_map, agents):
+    # Dijkstra over the positions of all the agents at once. An agent at its goal can be done, and then it stays there
+    # for free.
+    height, width = int_map.shape
+    goals = tuple(tuple(goal) for start, goal in agents)
+    first = (tuple(tuple(start) for start, goal in agents), (False,) * len(agents))
+    costs = {first: 0}
+    queue = [(0, first)]
+    while queue:
+        cost, state = heapq.heappop(queue)
+        if cost > costs[state]:
+            continue
+        positions, done = state
+        if all(done):
+            return cost
+        choices = []
+        for position, goal, finished in zip(positions, goals, done):
+            if finished:
+                choices.append([(position, True, 0)])
+                continue
+            moves = [((position[0] + i, position[1] + j), False) for i, j in NEIGHBOURS + ((0, 0),)
+                     if 0 <= position[0] + i < height and 0 <= position[1] + j < width and
+                     int_map[position[0] + i, position[1] + j] != -1]
+            choices.append([(cell, False, int(int_map[cell])) for cell, _ in moves] +
+                           ([(position, True, 0)] if position == goal else []))
+        for step in itertools.product(*choices):
+            cells = [cell for cell, _, _ in step]
+            if len(set(cells)) < len(cells):
+                continue
+            if any(cells[a] == positions[b] and cells[b] == positions[a] and cells[a] != cells[b]
+                   for a in range(len(cells)) for b in range(a)):
+                continue
+            following = (tuple(cells), tuple(finished for _, finished, _ in step))
+            new_cost = cost + sum(cell_cost for _, _, cell_cost in step)
+            if new_cost < costs.get(following, float('inf')):
+                costs[following] = new_cost
+                heapq.heappush(queue, (new_cost, following))
+    return None
+
+
+def test_cbs_is_optimal_on_small_maps():
+    solved = 0
+    for seed in range(25):
+        int_map = mapgen.random_map(4, 4, seed=seed)
+        rng = np.random.default_rng(seed)
+        free = np.argwhere(int_map != -1).tolist()
+        count = 3 if seed % 2 else 2
+        starts = rng.choice(len(free), count, replace=False)
+        goals = rng.choice(len(free), count, replace=False)
+        agents = [(free[start], free[goal]) for start, goal in zip(starts, goals) if start != goal]
+        cheapest = cheapest_joint_cost(int_map, agents)
+        result = cbs.conflict_based_search(int_map, agents, max_nodes=500)
+        if result.found():
+            check_paths(int_map, agents, result)
+            assert result.cost == cheapest, seed
+            solved += 1
+        else:
+            assert result.nodes == 500 or cheapest is None, seed
+    assert solved >= 15
+
+
+def test_solutions_have_no_collisions():
+    for task_number, agent_count in ((1, 4), (3, 10), (4, 20)):
+        int_map = Map.Map_Obj(task_number).int_map
+        agents = cbs.random_agents(int_map, agent_count, seed=agent_count)
+        assert len(agents) == agent_count
+        cheapest = cbs.conflict_based_search(int_map, agents[:4])
+        check_paths(int_map, agents[:4], cheapest)
+        for result in (cbs.conflict_based_search(int_map, agents, cbs.ECBS_WEIGHT, max_nodes=200),
+                       cbs.prioritized_planning(int_map, agents)):
+            check_paths(int_map, agents, result)
+        assert cbs.conflict_based_search(int_map, agents[:4], cbs.ECBS_WEIGHT).cost <= \
+            cbs.ECBS_WEIGHT * cheapest.cost
+
+
+def test_prioritized_planning_with_dozens_of_agents():
+    # Every agent can get to its goal without going through the start or goal of another one, so prioritized
+    # planning always finds a solution
+    int_map = Map.Map_Obj(1).int_map
+    agents = cbs.random_agents(int_map, 40, seed=40)
+    assert len(agents) == 40
+    result = cbs.prioritized_planning(int_map, agents)
+    check_paths(int_map, agents, result)
+
+
+def test_corridor_lanes_that_do_not_overlap():
+    # The agents meet in the corridor going opposite ways but through different parts of it, which used to crash the
+    # corridor split. The map is a single line of cells on which the agents cannot pass each other, so there is no
+    # solution.
+    int_map = np.array([[2, 1], [1, -1], [1, 2]], np.int8)
+    agents = [([2, 1], [2, 0]), ([0, 1], [2, 1]), ([0, 0], [1, 0])]
+    result = cbs.conflict_based_search(int_map, agents, max_nodes=200)
+    assert not result.found()
@@ -0,0 +1,43 @@
+import numpy as np
+import Map
+import mapgen
+import search
+from fields import DistanceField, FieldCache, dijkstra_field
+from test_search import random_queries
+
+
+def test_fields_against_astar():
+    int_map = mapgen.random_map(25, 25, seed=5)
+    queries = random_queries(int_map, 8, seed=5)
+    sources = [start for start, _ in queries]
+    forward = DistanceField(int_map, sources)
+    backward = DistanceField(int_map, sources, reverse=True)
+    # Many sources at once give the cost of the nearest one
+    assert np.array_equal(forward.field, np.min([dijkstra_field(int_map, [source]) for source in sources], axis=0))
+    for _, pos in queries:
+        to_sources = [search.astar(int_map, pos, source).cost for source in sources]
+        if all(cost is None for cost in to_sources):
+            assert not backward.reachable(pos)
+            continue
+        assert backward.cost(pos) == min(cost for cost in to_sources if cost is not None)
+        path = backward.path(pos)
+        assert path[0] == list(pos) and path[-1] == backward.nearest_source(pos) and path[-1] in sources
+        assert sum(int(int_map[row, col]) for row, col in path[1:]) == backward.cost(pos)
+        path = forward.path(pos)
+        assert path[-1] == list(pos) and path[0] in sources
+        assert sum(int(int_map[row, col]) for row, col in path[1:]) == forward.cost(pos)
+
+
+def test_cache_follows_the_map():
+    myMap = Map.Map_Obj(1)
+    cache = FieldCache(myMap.int_map, max_size=2)
+    cache.attach(myMap)
+    goal = myMap.get_goal_pos()
+    field = cache.get([goal])
+    assert cache.get([goal]) is field
+    cache.get([myMap.get_start_pos()])
+    cache.get([goal], reverse=True)
+    assert cache.get([goal]) is not field  # The least recently used field was thrown away
+    field = cache.get([goal])
+    myMap.set_cell_value(myMap.get_start_pos(), 4, str_map=False)
+    assert cache.get([goal]) is not field
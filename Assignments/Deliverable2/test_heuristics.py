@@ -0,0 +1,50 @@
+import os
+import numpy as np
+import heuristics
+import mapgen
+import search
+from fields import dijkstra_field
+from test_search import random_queries
+
+
+def test_landmarks_never_overestimate():
+    for int_map in (mapgen.random_map(30, 30, seed=3), mapgen.maze_map(31, 31, seed=3)):
+        landmarks = heuristics.LandmarkHeuristic(int_map)
+        for start, goal in random_queries(int_map, 10, seed=3):
+            to_goal = dijkstra_field(int_map, [goal], reverse=True)
+            reachable = np.isfinite(to_goal)
+            estimate = np.array(landmarks.table_for_goal(goal))
+            assert np.all(estimate[reachable] <= to_goal[reachable] + 1e-9)
+            assert landmarks(goal, goal) == 0
+
+
+def test_astar_with_heuristics_against_dijkstra():
+    expanded = {'manhattan': 0, 'landmarks': 0}
+    for seed in range(5):
+        int_map = mapgen.random_map(30, 30, seed=seed)
+        landmarks = heuristics.LandmarkHeuristic(int_map)
+        for start, goal in random_queries(int_map, 10, seed):
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            plain = search.astar(int_map, start, goal)
+            with_landmarks = search.astar(int_map, start, goal, landmarks)
+            with_goal = search.astar(int_map, start, goal, heuristics.GoalDistanceHeuristic(int_map, goal))
+            for result in (plain, with_landmarks, with_goal):
+                assert result.cost == (cheapest if np.isfinite(cheapest) else None)
+            expanded['manhattan'] += plain.expanded
+            expanded['landmarks'] += with_landmarks.expanded
+    assert expanded['landmarks'] < expanded['manhattan']
+
+
+def test_tables_are_cached_next_to_the_map(tmp_path):
+    int_map = mapgen.random_map(20, 20, seed=4)
+    path_to_map = str(tmp_path / 'map.csv')
+    first = heuristics.LandmarkHeuristic(int_map, path_to_map=path_to_map)
+    assert os.path.exists(heuristics.cache_path(path_to_map, 'landmarks-8'))
+    cached = heuristics.LandmarkHeuristic(int_map, path_to_map=path_to_map)
+    assert cached.landmarks == first.landmarks and np.array_equal(cached.tables, first.tables)
+
+    # A cache made for another map is not used
+    changed = int_map.copy()
+    changed[changed != -1] = 1
+    rebuilt = heuristics.LandmarkHeuristic(changed, path_to_map=path_to_map)
+    assert np.array_equal(rebuilt.tables, heuristics.LandmarkHeuristic(changed).tables)
@@ -0,0 +1,30 @@
+import numpy as np
+import hpa
+import mapgen
+import search
+
+BOUND = 1.5  # How many times the cheapest cost a path may cost in the tests, the worst seen is about 1.3
+
+
+def test_queries_against_astar():
+    for seed in range(20):
+        int_map = mapgen.random_map(40, 40, seed=seed)
+        hierarchical_map = hpa.HierarchicalMap(int_map, cluster_size=8)
+        rng = np.random.default_rng(seed)
+        free = np.argwhere(int_map != -1).tolist()
+        for _ in range(10):
+            start, goal = free[rng.integers(len(free))], free[rng.integers(len(free))]
+            cheapest = search.astar(int_map, start, goal)
+            result = hierarchical_map.query(start, goal)
+            assert result.found() == cheapest.found()
+            if cheapest.found():
+                assert cheapest.cost <= result.cost <= BOUND * cheapest.cost
+                assert result.cost == sum(int(int_map[row, col]) for row, col in result.path[1:])
+
+
+def test_neighbours_across_a_border():
+    # The two cells are next to each other on both sides of a border, where the abstract graph used to go the long way
+    # around through a transition
+    int_map = mapgen.random_map(10, 10, seed=48)
+    result = hpa.HierarchicalMap(int_map, cluster_size=8).query([8, 7], [8, 8])
+    assert result.cost == search.astar(int_map, [8, 7], [8, 8]).cost == 1
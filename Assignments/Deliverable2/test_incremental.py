@@ -0,0 +1,32 @@
+import numpy as np
+import mapgen
+from fields import dijkstra_field
+from incremental import IncrementalPlanner
+from test_search import check_path, random_queries
+
+
+def check_plan(int_map, start, goal, result):
+    cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+    if np.isinf(cheapest):
+        assert not result.found()
+    else:
+        check_path(int_map, start, goal, result)
+        assert result.cost == cheapest
+
+
+def test_moving_goal_and_changing_costs():
+    for seed in range(5):
+        int_map = mapgen.random_map(25, 25, seed=seed)
+        rng = np.random.default_rng(seed)
+        queries = random_queries(int_map, 10, seed)
+        start, goal = queries[0]
+        planner = IncrementalPlanner(int_map, start, goal)
+        check_plan(int_map, start, goal, planner.plan())
+        for _, goal in queries[1:]:
+            planner.move_goal(goal)
+            check_plan(int_map, start, goal, planner.plan())
+            # Costs going up and down and walls appearing and going away, but not on the start and goal
+            for row, col in rng.integers(0, 25, size=(5, 2)):
+                if [row, col] not in (start, goal):
+                    planner.update_cell([row, col], int(rng.choice([-1, 1, 2, 3, 4])))
+            check_plan(int_map, start, goal, planner.plan())
@@ -0,0 +1,57 @@
+import Map
+import intercept
+import mapgen
+import search
+from search import NEIGHBOURS
+from test_search import random_queries
+
+
+def earliest_catch(int_map, start, trajectory):
+    # Cheapest cost of being in every cell at every tick, one tick at a time, until the goal is caught or nothing new
+    # can be reached
+    height, width = int_map.shape
+    costs = {(start[0], start[1]): 0}
+    tick = 0
+    while True:
+        goal = trajectory[min(tick, len(trajectory) - 1)]
+        if (goal[0], goal[1]) in costs:
+            return tick, costs[(goal[0], goal[1])]
+        following = {}
+        for (row, col), cost in costs.items():
+            for i, j in NEIGHBOURS + ((0, 0),):
+                if 0 <= row + i < height and 0 <= col + j < width and int_map[row + i, col + j] != -1:
+                    cell_cost = cost + int(int_map[row + i, col + j])
+                    following[(row + i, col + j)] = min(following.get((row + i, col + j), cell_cost), cell_cost)
+        if tick >= len(trajectory) - 1 and following.keys() == costs.keys():
+            return None, None
+        costs = following
+        tick += 1
+
+
+def check_catch(int_map, start, trajectory, result):
+    tick, cost = earliest_catch(int_map, start, trajectory)
+    if tick is None:
+        assert not result.found()
+        return
+    assert len(result.path) - 1 == tick and result.cost == cost
+    assert result.path[0] == list(start) and result.path[-1] == list(trajectory[min(tick, len(trajectory) - 1)])
+    for (row, col), (next_row, next_col) in zip(result.path, result.path[1:]):
+        assert abs(next_row - row) + abs(next_col - col) <= 1 and int_map[next_row, next_col] != -1
+    assert result.cost == sum(int(int_map[row, col]) for row, col in result.path[1:])
+
+
+def test_task_5():
+    myMap = Map.Map_Obj(5)
+    start, trajectory = myMap.get_start_pos(), myMap.goal_trajectory()
+    check_catch(myMap.int_map, start, trajectory, intercept.intercept(myMap.int_map, start, trajectory))
+
+
+def test_random_maps_against_brute_force():
+    for seed in range(10):
+        int_map = mapgen.random_map(15, 15, seed=seed)
+        queries = random_queries(int_map, 10, seed)
+        for (start, _), (goal, end_goal) in zip(queries[:5], queries[5:]):
+            # The goal walks along a cheapest path to its end position, a step every other tick
+            walk = search.astar(int_map, goal, end_goal).path or [goal]
+            trajectory = [pos for pos in walk for _ in range(2)]
+            check_catch(int_map, start, trajectory, intercept.intercept(int_map, start, trajectory))
@@ -0,0 +1,33 @@
+import numpy as np
+import Map
+import jps
+import mapgen
+import search
+from fields import dijkstra_field
+from test_search import check_path, random_queries
+
+
+def test_jps_against_dijkstra():
+    # Maps with large regions of one cost, where most of the jumping happens, and maps where every cell has its own
+    maps = [mapgen.generate_map('rooms', 40, 40, seed=seed) for seed in range(3)]
+    maps += [mapgen.generate_map('noise', 40, 40, seed=seed) for seed in range(3)]
+    maps += [mapgen.random_map(30, 30, seed=seed) for seed in range(3)]
+    for seed, int_map in enumerate(maps):
+        for start, goal in random_queries(int_map, 10, seed):
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            result = jps.jps(int_map, start, goal)
+            if np.isinf(cheapest):
+                assert not result.found()
+            else:
+                check_path(int_map, start, goal, result)
+                assert result.cost == cheapest
+
+
+def test_jps_expands_fewer_nodes_on_the_samfundet_maps():
+    for task_number in (1, 2):
+        myMap = Map.Map_Obj(task_number)
+        start, goal = myMap.get_start_pos(), myMap.get_goal_pos()
+        plain = search.astar(myMap.int_map, start, goal)
+        jumping = jps.jps(myMap.int_map, start, goal)
+        assert jumping.cost == plain.cost
+        assert jumping.expanded < plain.expanded
@@ -0,0 +1,63 @@
+import os
+import shutil
+import numpy as np
+import Map
+
+
+def test_csv_maps_are_cached_as_npy(tmp_path):
+    path = str(tmp_path / 'map.csv')
+    shutil.copy('Samfundet_map_1.csv', path)
+    expected = np.loadtxt(path, delimiter=',', dtype=np.int64, ndmin=2)
+
+    int_map = Map.load_int_map(path)
+    assert int_map.dtype == np.int8 and np.array_equal(int_map, expected)
+    assert os.path.exists(path + '.npy')
+    cached = Map.load_int_map(path)
+    assert isinstance(cached, np.memmap) and np.array_equal(cached, expected)
+    # Changes to the loaded map never reach the cache
+    cached[0, 0] = 4
+    assert np.array_equal(Map.load_int_map(path), expected)
+
+    # A .csv that is newer than its cache is parsed again
+    with open(path, 'w') as file:
+        file.write('1,-1\n2,3\n')
+    os.utime(path, (os.path.getmtime(path + '.npy') + 10,) * 2)
+    assert Map.load_int_map(path).tolist() == [[1, -1], [2, 3]]
+    assert Map.load_int_map(path, use_cache=False).tolist() == [[1, -1], [2, 3]]
+
+
+def test_map_object_from_npy(tmp_path):
+    path = str(tmp_path / 'map.npy')
+    Map.save_int_map(Map.Map_Obj(3).int_map, path)
+    myMap = Map.Map_Obj(path_to_map=path, start_pos=[28, 32], goal_pos=[6, 32])
+    assert np.array_equal(myMap.int_map, Map.Map_Obj(3).int_map)
+    assert myMap.get_end_goal_pos() == [6, 32]
+
+
+def test_render_map(tmp_path):
+    myMap = Map.Map_Obj(1)
+    start, goal = myMap.get_start_pos(), myMap.get_goal_pos()
+    path = [start, [start[0], start[1] + 1]]
+    scale = 4
+
+    def pixel(image, pos):
+        return image.getpixel((pos[1] * scale + scale // 2, pos[0] * scale + scale // 2))
+
+    # Drawn from the integer map, before a string map is made
+    image = myMap.render_map(path=path, scale=scale)
+    assert image.size == (myMap.int_map.shape[1] * scale, myMap.int_map.shape[0] * scale)
+    wall = tuple(int(value) for value in np.argwhere(myMap.int_map == -1)[0])
+    assert pixel(image, wall) == Map.SYMBOL_COLORS[' # ']
+    assert pixel(image, start) == Map.SYMBOL_COLORS[' S ']
+    assert pixel(image, goal) == Map.SYMBOL_COLORS[' G ']
+    assert pixel(image, path[1]) == tuple(Map.PALETTE[0])
+    # Drawn from the string map, it looks the same
+    assert myMap.str_map[start[0], start[1]] == ' S '
+    assert myMap.render_map(path=path, scale=scale).tobytes() == image.tobytes()
+
+    filename = str(tmp_path / 'map.png')
+    myMap.show_map(path=path, filename=filename)
+    assert os.path.exists(filename)
+    filename = str(tmp_path / 'frames.gif')
+    Map.save_frames([myMap.render_map(path=path[:k + 1], scale=scale) for k in range(len(path))], filename)
+    assert os.path.exists(filename)
@@ -0,0 +1,32 @@
+import numpy as np
+import Map
+import mapgen
+from fields import dijkstra_field
+
+
+def test_bands_do_not_change_the_map(tmp_path, monkeypatch):
+    for kind in mapgen.GENERATORS:
+        whole = mapgen.generate_map(kind, 70, 50, seed=3)
+        assert whole.dtype == np.int8 and whole.shape == (70, 50)
+        assert set(np.unique(whole)) <= {-1, 1, 2, 3, 4}
+        assert np.array_equal(whole, mapgen.generate_map(kind, 70, 50, seed=3))
+        assert not np.array_equal(whole, mapgen.generate_map(kind, 70, 50, seed=4))
+        # Written to a file and made in smaller bands, the map is the same
+        monkeypatch.setattr(mapgen, 'BAND_ROWS', 16)
+        path = str(tmp_path / (kind + '.npy'))
+        in_bands = mapgen.generate_map(kind, 70, 50, seed=3, path=path)
+        monkeypatch.undo()
+        assert np.array_equal(whole, in_bands)
+        assert np.array_equal(whole, Map.load_int_map(path))
+
+
+def test_maze_has_one_path_between_rooms():
+    int_map = mapgen.maze_map(21, 31, seed=2)
+    open_cells = int_map != -1
+    edges = (open_cells[1:] & open_cells[:-1]).sum() + (open_cells[:, 1:] & open_cells[:, :-1]).sum()
+    # A connected graph with one edge less than it has cells is a tree
+    assert edges == open_cells.sum() - 1
+    start, goal = mapgen.pick_endpoints(int_map)
+    distance = dijkstra_field(int_map, [start])
+    assert np.isfinite(distance[open_cells]).all()
+    assert distance[goal[0], goal[1]] == distance[np.isfinite(distance)].max()
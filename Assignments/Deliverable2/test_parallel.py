@@ -0,0 +1,18 @@
+import numpy as np
+import mapgen
+import parallel
+from fields import dijkstra_field
+from test_search import check_path, random_queries
+
+
+def test_parallel_astar_against_dijkstra():
+    for seed, workers in ((0, 1), (1, 2), (2, 3)):
+        int_map = mapgen.random_map(30, 30, seed=seed)
+        for start, goal in random_queries(int_map, 4, seed):
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            result = parallel.parallel_astar(int_map, start, goal, workers=workers, batch_size=8)
+            if np.isinf(cheapest):
+                assert not result.found()
+            else:
+                check_path(int_map, start, goal, result)
+                assert result.cost == cheapest
@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import mapgen
+import search
+from fields import dijkstra_field
+
+
+def random_queries(int_map, count, seed):
+    # Start and goal pairs of open cells, not all of them connected
+    rng = np.random.default_rng(seed)
+    free = np.argwhere(int_map != -1).tolist()
+    return [(free[i], free[j]) for i, j in rng.integers(0, len(free), size=(count, 2))]
+
+
+def test_reused_store_gives_the_same_results():
+    # The store is not cleared between searches, only its generation moves on
+    int_map = mapgen.random_map(40, 40, seed=1)
+    store = search.NodeStore(int_map.shape)
+    for start, goal in random_queries(int_map, 30, seed=1):
+        fresh = search.astar(int_map, start, goal)
+        reused = search.astar(int_map, start, goal, store=store)
+        assert (reused.path, reused.cost, reused.expanded) == (fresh.path, fresh.cost, fresh.expanded)
+
+
+def check_path(int_map, start, goal, result):
+    # The path goes from start to goal through open cells one step at a time and costs what the result says
+    assert result.path[0] == list(start) and result.path[-1] == list(goal)
+    for (row, col), (next_row, next_col) in zip(result.path, result.path[1:]):
+        assert abs(next_row - row) + abs(next_col - col) == 1
+        assert int_map[next_row, next_col] != -1
+    assert result.cost == sum(int(int_map[row, col]) for row, col in result.path[1:])
+
+
+def test_astar_against_dijkstra():
+    for seed in range(10):
+        int_map = mapgen.random_map(30, 30, seed=seed)
+        for start, goal in random_queries(int_map, 20, seed):
+            cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+            result = search.astar(int_map, start, goal)
+            if cheapest == float('inf'):
+                assert not result.found()
+            else:
+                check_path(int_map, start, goal, result)
+                assert result.cost == cheapest
+
+
+def test_fractional_heuristic():
+    # The f costs are not integers, and a node reopened with a cheaper g cost leaves stale heap entries behind
+    int_map = mapgen.random_map(30, 30, seed=2)
+
+    def heuristic(first_pos, second_pos):
+        return 0.5 * math.hypot(first_pos[0] - second_pos[0], first_pos[1] - second_pos[1])
+
+    for start, goal in random_queries(int_map, 20, seed=2):
+        result = search.astar(int_map, start, goal, heuristic)
+        cheapest = search.astar(int_map, start, goal)
+        assert result.cost == cheapest.cost
+        if result.found():
+            check_path(int_map, start, goal, result)
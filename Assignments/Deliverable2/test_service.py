@@ -0,0 +1,68 @@
+import numpy as np
+import Map
+import mapgen
+import search
+from fields import dijkstra_field
+from service import PathService
+from test_search import check_path, random_queries
+
+
+def test_queries_against_dijkstra():
+    int_map = mapgen.random_map(40, 40, seed=2)
+    service = PathService(int_map)
+    pairs = random_queries(int_map, 30, seed=2)
+    results = service.query_many(pairs)
+    for (start, goal), result in zip(pairs, results):
+        cheapest = dijkstra_field(int_map, [start])[goal[0], goal[1]]
+        assert result.cost == (cheapest if np.isfinite(cheapest) else None)
+        assert result.path == search.astar(int_map, start, goal).path
+    in_workers = service.query_many(pairs, processes=2, chunksize=4)
+    assert [(result.path, result.cost) for result in in_workers] == [(result.path, result.cost) for result in results]
+
+
+def test_task_queries():
+    myMap = Map.Map_Obj(3)
+    start, goal = myMap.get_start_pos(), myMap.get_goal_pos()
+    cheapest = search.astar(myMap.int_map, start, goal).cost
+    for service in (PathService.from_task(3), PathService.from_map(myMap), PathService.from_file(myMap.path_to_map)):
+        assert service.query(start, goal).cost == cheapest
+
+
+def test_cache_follows_the_map():
+    myMap = Map.Map_Obj(1)
+    service = PathService.from_map(myMap, cache_size=50)
+    pairs = random_queries(myMap.int_map, 20, seed=1)
+    rng = np.random.default_rng(1)
+    for step in range(30):
+        for start, goal in pairs:
+            result = service.query(start, goal)
+            fresh = search.astar(myMap.int_map, start, goal)
+            assert result.cost == fresh.cost
+            if fresh.found():
+                check_path(myMap.int_map, start, goal, result)
+        # Raising and lowering costs, and putting up and taking away walls, but never on the ends of a query. Every
+        # other time the costs only go up, so only some of the paths are thrown away.
+        ends = {(pos[0], pos[1]) for pair in pairs for pos in pair}
+        for _ in range(5):
+            pos = [int(rng.integers(myMap.int_map.shape[0])), int(rng.integers(myMap.int_map.shape[1]))]
+            old_value, value = int(myMap.int_map[pos[0], pos[1]]), int(rng.choice([-1, 1, 2, 3, 4]))
+            raised = old_value != -1 and (value == -1 or value > old_value)
+            if (pos[0], pos[1]) not in ends and (raised or step % 2):
+                myMap.set_cell_value(pos, value, str_map=False)
+    assert service.cache.hits > 0 and service.cache.misses > len(pairs)
+
+
+def test_least_recently_used_paths_are_thrown_away():
+    int_map = mapgen.random_map(20, 20, seed=3)
+    service = PathService(int_map, cache_size=3)
+    pairs = random_queries(int_map, 4, seed=3)
+    for start, goal in pairs[:3]:
+        service.query(start, goal)
+    service.query(*pairs[0])
+    service.query(*pairs[3])  # Pushes out the second query, which was used least recently
+    assert len(service.cache) == 3
+    assert service.cache.hits == 1 and service.cache.misses == 4
+    assert service.query(*pairs[0]).expanded == 0
+    assert service.query(*pairs[1]).expanded > 0
+    assert service.cache.hits == 2 and service.cache.misses == 5
+    assert all(keys for keys in service.cache.crossing.values())
@@ -0,0 +1,27 @@
+import numpy as np
+import mapgen
+import search
+import theta
+from test_search import random_queries
+
+
+def test_any_angle_paths_against_astar():
+    maps = [mapgen.random_map(30, 30, seed=seed) for seed in range(4)]
+    maps += [mapgen.generate_map('rooms', 60, 60, seed=seed) for seed in range(2)]
+    for seed, int_map in enumerate(maps):
+        for start, goal in random_queries(int_map, 10, seed):
+            grid = search.astar(int_map, start, goal)
+            any_angle = theta.theta_star(int_map, start, goal)
+            if not grid.found():
+                assert not any_angle.found()
+                continue
+            # A grid path costs the same in the any-angle cost model
+            assert theta.path_cost(int_map, grid.path) == grid.cost
+            smoothed = theta.smooth_path(int_map, grid.path)
+            assert smoothed[0] == grid.path[0] and smoothed[-1] == grid.path[-1]
+            assert theta.path_cost(int_map, smoothed) <= grid.cost + 1e-9
+            assert any_angle.path[0] == list(start) and any_angle.path[-1] == list(goal)
+            assert np.isclose(theta.path_cost(int_map, any_angle.path), any_angle.cost)
+            assert any_angle.cost <= grid.cost + 1e-9
+            # The cells of the path are all open
+            assert all(int_map[row, col] != -1 for row, col in theta.trace_cells(any_angle.path))
@@ -0,0 +1,272 @@
+import heapq
+import itertools
+import math
+import time
+import numpy as np
+from search import SearchResult, astar
+
+
+# Any-angle paths. The grid searches move between neighbouring cells only, so their paths zigzag even when a straight
+# line would do. Here a path is a list of waypoints, the centres of some cells, joined by straight segments that can go
+# in any direction. A segment costs the cost of every cell it passes through times the length of the segment in that
+# cell, and it is blocked if it touches a wall, also if it only goes through the corner of one.
+#
+# Moving between two neighbouring cells then costs half of each of them, where the grid searches pay the whole cost of
+# the cell they move into. Over a whole path the two only differ by half the cost of the goal minus half the cost of the
+# start, so that is added to the cost of every path here, and a grid path gets the same cost as it has in search.astar.
+
+DIRECTIONS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))  # Children in a square
+
+
+def euclidean_distance(first_pos, second_pos):
+    return math.hypot(first_pos[0] - second_pos[0], first_pos[1] - second_pos[1])
+
+
+def crossings(origin, targets):
+    """
+    Cuts straight segments from the centre of one cell to the centres of other cells where they cross from one cell
+    into the next, for all the segments at once. The borders are found with integer arithmetic, so a segment that goes
+    exactly through the corner of a cell is always noticed.
+    :param origin: position [row, column] the segments start from
+    :param targets: list or array of k positions the segments end at
+    :return: rows, columns, lengths and corners, all (k, n) arrays with one entry per piece of a segment. A piece
+    with a length is inside the cell at its row and column. A piece without one is either padding, or a corner the
+    segment goes through, and then the cell at its row and column is the upper left one of the four at the corner.
+    """
+    origin = np.asarray(origin, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+    delta = targets - origin
+    steps = np.abs(delta)
+    scale = np.maximum(steps, 1)
+    # The borders of a segment are at the fractions (2m - 1) / 2|delta| of its length, all written over one denominator
+    end = 2 * scale[:, 0] * scale[:, 1]
+    row_borders = np.arange(1, steps[:, 0].max() + 1)
+    col_borders = np.arange(1, steps[:, 1].max() + 1)
+    borders = np.concatenate([
+        np.zeros((len(targets), 1), dtype=np.int64),
+        np.where(row_borders <= steps[:, :1], (2 * row_borders - 1) * scale[:, 1:], end[:, None]),
+        np.where(col_borders <= steps[:, 1:], (2 * col_borders - 1) * scale[:, :1], end[:, None]),
+        end[:, None]], axis=1)
+    borders.sort(axis=1)
+
+    fractions = borders / end[:, None]
+    lengths = (fractions[:, 1:] - fractions[:, :-1]) * np.hypot(delta[:, 0], delta[:, 1])[:, None]
+    middle = (fractions[:, :-1] + fractions[:, 1:]) / 2
+    rows = origin[0] + middle * delta[:, :1]
+    cols = origin[1] + middle * delta[:, 1:]
+    # A row border and a column border at the same place is a corner, unless it is the padding at the end
+    corners = (borders[:, 1:] == borders[:, :-1]) & (borders[:, :-1] < end[:, None])
+    rows = np.where(corners, np.floor(rows), np.rint(rows)).astype(np.int64)
+    cols = np.where(corners, np.floor(cols), np.rint(cols)).astype(np.int64)
+    return rows, cols, lengths, corners
+
+
+def segment_costs(int_map, origin, targets):
+    """
+    The line of sight and cost of straight segments from one cell to many, checked with numpy for all of them at once.
+    :param int_map: 2D numpy array with the cell costs
+    :param origin: position [row, column] the segments start from
+    :param targets: list or array of positions the segments end at
+    :return: float array with the cost of every segment, np.inf for the ones that touch a wall.
+    """
+    height, width = int_map.shape
+    rows, cols, lengths, corners = crossings(origin, targets)
+    values = int_map[rows, cols].astype(np.float64)
+    blocked = ((lengths > 0) & (values == -1)).any(axis=1)
+    if corners.any():
+        # All four cells at a corner have to be free, the segment may not squeeze between two walls
+        below = np.minimum(rows + 1, height - 1)
+        right = np.minimum(cols + 1, width - 1)
+        walls = (values == -1) | (int_map[below, cols] == -1) | (int_map[rows, right] == -1) | \
+            (int_map[below, right] == -1)
+        blocked |= (corners & walls).any(axis=1)
+    costs = (lengths * values).sum(axis=1)
+    costs[blocked] = np.inf
+    return costs
+
+
+def path_cost(int_map, path):
+    """
+    :param path: list of waypoints, like the ones from theta_star or smooth_path, or a path from the grid searches
+    :return: the cost of the path as described at the top of this file, np.inf if a segment touches a wall.
+    """
+    cost = 0.0
+    for first, second in zip(path, path[1:]):
+        cost += segment_costs(int_map, first, [second])[0]
+    return cost + (int(int_map[path[-1][0], path[-1][1]]) - int(int_map[path[0][0], path[0][1]])) / 2
+
+
+def trace_cells(path):
+    """
+    The cells the segments of an any-angle path go through, for drawing it on the map like a grid path.
+    :param path: list of waypoints
+    :return: list of positions [row, column] in the order the path visits them.
+    """
+    cells = [[path[0][0], path[0][1]]]
+    for first, second in zip(path, path[1:]):
+        rows, cols, lengths, _ = crossings(first, [second])
+        for row, col, length in zip(rows[0], cols[0], lengths[0]):
+            if length > 0 and [row, col] != cells[-1]:
+                cells.append([int(row), int(col)])
+    return cells
+
+
+def cheapest_cost(int_map):
+    # The smallest cost of a cell that is not a wall, which scales the straight line distance into a heuristic
+    values = np.asarray(int_map)
+    free = values[values > 0]
+    return int(free.min()) if free.size else 1
+
+
+def theta_star(int_map, start, goal, heuristic=None):
+    """
+    Finds an any-angle path from start to goal with Theta*. It is A* over the cells and their eight neighbours, but
+    when a child can be reached in a straight line from the parent of the cell being expanded, and that is cheaper
+    than going through the cell, the child gets the parent as its own parent, so the path only turns where it has to.
+    The line of sight to all the children of a cell is checked in one go with segment_costs.
+    :param int_map: 2D numpy array with the cell costs
+    :param start: start position [row, column]
+    :param goal: goal position [row, column]
+    :param heuristic: function taking two positions and returning an estimate of the cost between them that is never
+    more than the cost of the straight line. The straight line distance times the cost of the cheapest cell if None.
+    The manhattan distance of the grid searches is too large for that.
+    :return: a SearchResult with the waypoints of the path, its cost and the number of expanded cells. Theta* does
+    not always find the cheapest any-angle path, so the bound is None.
+    """
+    height, width = int_map.shape
+    costs = int_map.ravel()
+    start_index = start[0] * width + start[1]
+    goal_index = goal[0] * width + goal[1]
+    goal = (goal[0], goal[1])
+    if costs[start_index] == -1 or costs[goal_index] == -1:
+        return SearchResult()
+    if heuristic is None:
+        lowest = cheapest_cost(int_map)
+        heuristic = lambda pos, target: lowest * euclidean_distance(pos, target)
+
+    g_costs = np.full(height * width, np.inf)
+    parents = np.full(height * width, -1, dtype=np.int64)
+    closed = np.zeros(height * width, dtype=np.uint8)
+    tie_breaker = itertools.count()
+    g_costs[start_index] = 0
+    frontier = [(heuristic(start, goal), next(tie_breaker), 0.0, start_index)]
+    expanded = 0
+
+    while frontier:
+        _, _, g_cost, index = heapq.heappop(frontier)
+        if closed[index] or g_cost != g_costs[index]:
+            continue
+        closed[index] = 1
+        expanded += 1
+        if index == goal_index:
+            path = []
+            while index != -1:
+                path.append(list(divmod(index, width)))
+                index = int(parents[index])
+            path.reverse()
+            offset = (int(costs[goal_index]) - int(costs[start_index])) / 2
+            return SearchResult(path, g_cost + offset, expanded, None)
+
+        row, col = divmod(index, width)
+        cell_cost = int(costs[index])
+        children = []  # (row, column, index, cost through this cell)
+        for i, j in DIRECTIONS:
+            child_row, child_col = row + i, col + j
+            if not (0 <= child_row < height and 0 <= child_col < width):
+                continue
+            child = index + i * width + j
+            child_cost = int(costs[child])
+            if child_cost == -1 or closed[child]:
+                continue
+            if i != 0 and j != 0:
+                # A diagonal step goes through the corner of the two cells beside it
+                if costs[index + i * width] == -1 or costs[index + j] == -1:
+                    continue
+                step = math.sqrt(2) * (cell_cost + child_cost) / 2
+            else:
+                step = (cell_cost + child_cost) / 2
+            children.append((child_row, child_col, child, g_cost + step))
+        if not children:
+            continue
+
+        # Going straight from the parent wins ties, so the path has as few waypoints as possible
+        grandparent = int(parents[index])
+        if grandparent != -1:
+            straight = g_costs[grandparent] + segment_costs(
+                int_map, divmod(grandparent, width), [child[:2] for child in children])
+        for k, (child_row, child_col, child, child_g_cost) in enumerate(children):
+            parent = index
+            if grandparent != -1 and straight[k] <= child_g_cost + 1e-9:
+                parent, child_g_cost = grandparent, float(straight[k])
+            if child_g_cost >= g_costs[child]:
+                continue
+            g_costs[child] = child_g_cost
+            parents[child] = parent
+            f_cost = child_g_cost + heuristic((child_row, child_col), goal)
+            heapq.heappush(frontier, (f_cost, next(tie_breaker), child_g_cost, child))
+
+    return SearchResult(None, None, expanded, None)
+
+
+def smooth_path(int_map, path, window=256):
+    """
+    Straightens a path from one of the grid searches. From every waypoint it jumps to the last point of the path
+    within the window that can be reached in a straight line for no more than the path costs up to there, so the
+    smoothed path never costs more than the original one.
+    :param int_map: 2D numpy array with the cell costs
+    :param path: list of positions [row, column]
+    :param window: number of points ahead that are checked at once, which bounds the memory used
+    :return: list of waypoints.
+    """
+    if path is None or len(path) < 3:
+        return path
+    points = np.asarray(path, dtype=np.int64)
+    values = np.asarray(int_map[points[:, 0], points[:, 1]], dtype=np.float64)
+    # The cost along the path up to every point, in the same model as the straight segments
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    steps = lengths * (values[:-1] + values[1:]) / 2
+    for k in np.flatnonzero(np.abs(np.diff(points, axis=0)).max(axis=1) > 1):
+        steps[k] = segment_costs(int_map, points[k], points[k + 1:k + 2])[0]  # Already a waypoint path
+    along = np.concatenate([[0.0], np.cumsum(steps)])
+
+    smoothed = [list(path[0])]
+    anchor = 0
+    while anchor < len(path) - 1:
+        ahead = min(len(path) - 1, anchor + window)
+        direct = segment_costs(int_map, points[anchor], points[anchor + 1:ahead + 1])
+        good = np.flatnonzero(direct <= along[anchor + 1:ahead + 1] - along[anchor] + 1e-9)
+        anchor = anchor + 1 + (int(good[-1]) if good.size else 0)
+        smoothed.append(list(path[anchor]))
+    return smoothed
+
+
+def measure_against_astar(int_map, start, goal, repeats=3):
+    """
+    Times search.astar, search.astar followed by smooth_path, and theta_star on one query.
+    :param repeats: number of timed runs of each, the fastest one is reported
+    :return: list of dictionaries with the name of the method, the time in seconds, the expanded nodes, the cost of
+    the path as described at the top of this file and its number of waypoints.
+    """
+    def plain_astar():
+        result = astar(int_map, start, goal)
+        return result, result.path
+
+    def smoothed_astar():
+        result = astar(int_map, start, goal)
+        return result, smooth_path(int_map, result.path)
+
+    def any_angle():
+        result = theta_star(int_map, start, goal)
+        return result, result.path
+
+    rows = []
+    for name, run in (('astar', plain_astar), ('astar+smooth', smoothed_astar), ('theta', any_angle)):
+        seconds = float('inf')
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            result, path = run()
+            seconds = min(seconds, time.perf_counter() - start_time)
+        rows.append({'method': name, 'time': seconds, 'expanded': result.expanded,
+                     'cost': float(path_cost(int_map, path)) if path is not None else None,
+                     'waypoints': len(path) if path is not None else 0})
+    return rows
@@ -1,5 +1,8 @@
+import bisect
+import collections
 import copy
 import itertools
+import time
 
 
 class CSP:
@@ -10,12 +13,24 @@ class CSP:
         # self.domains[i] is a list of legal values for variable i
         self.domains = {}
 
-        # self.constraints[i][j] is a list of legal value pairs for
-        # the variable pair (i, j)
+        # self.constraints[i][j] is the constraint for the variable pair
+        # (i, j), one of the constraint classes below. Its method
+        # allows(x, y) tells if the values x for i and y for j are legal
+        # together, so the legal pairs are never all listed.
         self.constraints = {}
 
+        # self.global_constraints is a list of the constraints on more
+        # than two variables, like AllDifferentConstraint
+        self.global_constraints = []
+
         self.backtrack_called = 0
         self.backtrack_returned_failure = 0
+        self.arc_pops = 0  # Arcs taken off the queue and revised
+        self.revisions = 0  # Revisions that removed at least one value
+
+        # The constraints in the forms revise() looks them up in, built
+        # by get_constraint_store() when they are first needed
+        self.store = None
 
     def add_variable(self, name, domain):
         """Add a new variable to the CSP. 'name' is the variable name
@@ -24,6 +39,7 @@ class CSP:
         self.variables.append(name)
         self.domains[name] = list(domain)
         self.constraints[name] = {}
+        self.store = None
 
     def get_all_possible_pairs(self, a, b):
         """Get a list of all possible pairs (as tuples) of the values in
@@ -54,26 +70,70 @@ class CSP:
         to add the constraint the other way, j -> i, as all constraints
         are supposed to be two-way connections!
         """
-        if not j in self.constraints[i]:
-            # First, get a list of all possible pairs of values between variables i and j
-            self.constraints[i][j] = self.get_all_possible_pairs(self.domains[i], self.domains[j])
+        # The function is only called when the solver needs to know
+        # about a pair, instead of filtering all possible pairs up front
+        self.add_intensional_constraint_one_way(i, j, PredicateConstraint(filter_function))
+
+    def add_intensional_constraint_one_way(self, i, j, constraint):
+        """Add a constraint object, like a NotEqualConstraint, from
+        i -> j. If there already is a constraint between 'i' and 'j', a
+        pair is only legal if both of them allow it.
+        """
+        if j in self.constraints[i]:
+            old = self.constraints[i][j]
+            if isinstance(old, NotEqualConstraint) and isinstance(constraint, NotEqualConstraint):
+                return  # Som når to Alldiff-constraints deler to ruter, det holder med den ene
+            constraint = PredicateConstraint(lambda x, y, new=constraint: old.allows(x, y) and new.allows(x, y))
+        self.constraints[i][j] = constraint
+        self.store = None
+
+    def add_intensional_constraint(self, i, j, constraint):
+        """Add a constraint object between variables 'i' and 'j' both
+        ways, the one for j -> i is constraint.reverse().
+        """
+        self.add_intensional_constraint_one_way(i, j, constraint)
+        self.add_intensional_constraint_one_way(j, i, constraint.reverse())
 
-        # Next, filter this list of value pairs through the function
-        # 'filter_function', so that only the legal value pairs remain
-        self.constraints[i][j] = list(filter(lambda value_pair: filter_function(*value_pair), self.constraints[i][j]))
+    def get_constraint_store(self):
+        """Get the ConstraintStore for the constraints that have been
+        defined so far, building it if it is missing or out of date.
+        """
+        if self.store is None:
+            self.store = ConstraintStore(self)
+        return self.store
 
-    def add_all_different_constraint(self, variables):
+    def add_all_different_constraint(self, variables, propagation='pairwise'):
         """Add an Alldiff constraint between all of the variables in the
-        list 'variables'.
+        list 'variables'. With 'propagation' set to 'pairwise' it is a
+        != constraint between every pair of them. With 'singles' or
+        'matching' an AllDifferentConstraint with that filtering is
+        added on top, which also finds values that the pairs cannot
+        rule out on their own.
         """
         for (i, j) in self.get_all_possible_pairs(variables, variables):
             if i != j:
-                self.add_constraint_one_way(i, j, lambda x, y: x != y)
+                self.add_intensional_constraint_one_way(i, j, NOT_EQUAL)
+        if propagation != 'pairwise':
+            self.global_constraints.append(AllDifferentConstraint(variables, propagation))
+            self.store = None
 
-    def backtracking_search(self):
+    def backtracking_search(self, domains='list'):
         """This functions starts the CSP solver and returns the found
         solution.
+
+        'domains' chooses how the legal values are stored during the
+        search. With 'list' they are the lists in 'assignment', which
+        are copied at every branch. With 'bitset' every domain is an
+        integer bitmask in a BitsetDomains store, and the changes made
+        in a branch are undone from its trail instead. Both return the
+        solution in the same form, or -1 if there is none.
         """
+        if domains == 'bitset':
+            store = BitsetDomains(self)
+            if not self.inference_bitset(store, store.all_arcs()) or not self.backtrack_bitset(store):
+                return -1
+            return store.to_assignment()
+
         # Make a so-called "deep copy" of the dictionary containing the
         # domains of the CSP variables. The deep copy is required to
         # ensure that any changes made to 'assignment' does not have any
@@ -81,8 +141,10 @@ class CSP:
         assignment = copy.deepcopy(self.domains)
 
         # Run AC-3 on all constraints in the CSP, to weed out all of the
-        # values that are not arc-consistent to begin with
-        self.inference(assignment, self.get_all_arcs())
+        # values that are not arc-consistent to begin with. If a domain
+        # becomes empty there is no solution.
+        if not self.inference(assignment, self.get_all_arcs()):
+            return -1
 
         # Call backtrack with the partial assignment 'assignment'
         return self.backtrack(assignment)
@@ -121,7 +183,7 @@ class CSP:
         # Dersom vi ikke har en løsning:
         for value in assignment[var]:  # Vi prøver alle mulige lovlige verdier for denne variabelen
             assigment_copy = copy.deepcopy(assignment)  # Lager en kopi slik at vi ikke endrer originalen
-            assignment[var] = value  # Setter verdien til variabelen til value for å se om det er riktig verdi
+            assignment[var] = [value]  # Setter verdien til variabelen til value for å se om det er riktig verdi
 
             if self.inference(assignment, self.get_all_neighboring_arcs(var)):  # Dersom inference returnerer False vet vi at dette var feil løsning
                 # Nå kjører vi løkken på nytt med den nye listen over lovlige elementer. Nå har vi satt en verdi
@@ -153,21 +215,54 @@ class CSP:
         is the initial queue of arcs that should be visited.
         """
         # TODO: IMPLEMENT THIS
-        while queue:  # Løkken skal iterere så lenge det er elementer igjen i køen
-            tmp = queue.pop(0)  # Vi tar ut det første elementet på formen ('x1-y1', 'x2-y2')
-            i = tmp[0]  # Setter denne lik 'x1-y1'
-            j = tmp[1]  # Setter denne lik 'x2-y2'
-            if self.revise(assignment, i, j):  # Hvis vi klarte å revise mhp. 'x1-y1', altså fantes det noen "lovlige" verdier for i som viste seg å ikke være lovlige like vel?
-                if len(assignment[i]) == 0:  # Sjekker om det ikke finnes noen lovlige verdier for i, returnerer False hvis det er tilfellet
+        store = self.get_constraint_store()
+        # I stedet for buer legger vi variablene som har endret seg i køen, og reviserer alle buene inn mot dem
+        # når de tas ut. En variabel som allerede står i køen legges ikke inn på nytt.
+        variables = PropagationQueue(len(store.names))
+        pending = PropagationQueue(len(self.global_constraints))  # Globale constraints som må kjøres igjen
+        for i, j in queue:
+            variables.push(store.ids[j])
+        while variables or pending:  # Løkken skal iterere så lenge det er variabler igjen i køen
+            if not variables:
+                # Buene er billigst, så de globale constraintene kjøres først når alle buene er revidert
+                changed = self.propagate_global(assignment, pending.pop()[0])
+                if changed is None:
                     return False
-
-                tmp = self.get_all_neighboring_arcs(i)  # Setter tmp lik listen med alle constraints som hører til variabelen i
-                tmp.remove((j, i))  # Fjerner (j, i) siden vi allerede har "revised" mhp denne
-                for k in tmp:
-                    queue.append(k)  # For alle constraints til variabelen i vil vi revise, så disse legges til i køen.
-                    # Dersom noe allerede har blitt revised, vil det bli forsøkt revised på nytt. Dette vil returnere False hvis man ikke fikk gjort noe med den, og da legges den ikke til igjen
+                for var in changed:
+                    variables.push(var, -1, len(assignment[store.names[var]]) == 1)
+                continue
+            j, cause = variables.pop()
+            for c in store.globals_of[j]:
+                pending.push(c)
+            for i in self.constraints[store.names[j]]:  # Alle buer (i, j)
+                if store.ids[i] == cause:
+                    continue  # j ble nettopp revidert mot i, så ingen verdier for i kan ha mistet støtten sin
+                self.arc_pops += 1
+                if self.revise(assignment, i, store.names[j]):
+                    self.revisions += 1
+                    if len(assignment[i]) == 0:  # Sjekker om det ikke finnes noen lovlige verdier for i
+                        return False
+                    variables.push(store.ids[i], j, len(assignment[i]) == 1)
         return True
 
+    def propagate_global(self, assignment, c):
+        """Filter the domains in 'assignment' with global constraint
+        number 'c'. Returns a list of the ids of the variables that lost
+        values, or None if the constraint cannot be satisfied.
+        """
+        store = self.get_constraint_store()
+        constraint = self.global_constraints[c]
+        masks = [store.mask_of(assignment[name]) for name in constraint.variables]
+        filtered = constraint.filter(masks)
+        if filtered is None:
+            return None
+        changed = []
+        for name, old, new in zip(constraint.variables, masks, filtered):
+            if new != old:
+                assignment[name] = [value for value in assignment[name] if new >> store.numbers[value] & 1]
+                changed.append(store.ids[name])
+        return changed
+
     def revise(self, assignment, i, j):
         """The function 'Revise' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
@@ -178,18 +273,559 @@ class CSP:
         legal values in 'assignment'.
         """
         # TODO: IMPLEMENT THIS
-        revised = False
+        store = self.get_constraint_store()
+        constraint = self.constraints[i][j]
+        legal = set(assignment[j])
+        if isinstance(constraint, NotEqualConstraint):
+            # x har en lovlig verdi i j så lenge j har en annen verdi enn x, det trenger vi ikke lete etter
+            kept = [x for x in assignment[i] if len(legal) > 1 or x not in legal]
+            if len(kept) == len(assignment[i]):
+                return False
+            assignment[i] = kept
+            return True
+
+        last = store.last.setdefault((i, j), {})
+        order = store.order[j]
+        kept = []
         for x in assignment[i]:  # Går gjennom mulige verdier for i.
-            var = False
-            for y in assignment[j]:  # Går gjennom mulige verdier for j.
-                if (x, y) in self.constraints[i][j]:
-                    var = True  # Setter var = True hvis det finnes en verdi y for x slik at constrains er oppfylt.
+            number = store.numbers[x]
+            support = last.get(number)
+            if support is not None and store.values[support] in legal:
+                kept.append(x)  # Den siste lovlige verdien vi fant for x er fortsatt i domenet til j
+                continue
+            # Leter videre etter en lovlig verdi for j fra der vi fant den forrige, og begynner på starten igjen til
+            # slutt, siden backtracking kan ha lagt tilbake verdier før den
+            start = bisect.bisect_right(order, support) if support is not None else 0
+            for k in range(len(order)):
+                candidate = order[(start + k) % len(order)]
+                if store.values[candidate] in legal and constraint.allows(x, store.values[candidate]):
+                    last[number] = candidate
+                    kept.append(x)
                     break
-            if not var:
-                # Hvis ikke constrains er mulig å oppfylt for x, fjernes x fra mulige verdier for i.
-                assignment[i].remove(x)
-                revised = True
-        return revised  # Returner True hvis den har fjernet en verdi, False hvis ikke.
+        if len(kept) == len(assignment[i]):
+            return False
+        assignment[i] = kept  # Verdiene uten noen lovlig verdi for j er fjernet fra mulige verdier for i.
+        return True  # Returner True hvis den har fjernet en verdi, False hvis ikke.
+
+    def backtrack_bitset(self, domains):
+        """The same search as backtrack(), on a BitsetDomains store.
+        Instead of copying the domains before trying a value, the trail
+        position is saved, and everything inference removed is put back
+        by undoing the trail to that position. Returns True when every
+        domain has a single value left, and False otherwise.
+        """
+        self.backtrack_called += 1
+        var = self.select_unassigned_variable_bitset(domains)
+        if var == -1:  # Alle variabler har en verdi
+            return True
+
+        for bit in domains.bits(var):  # Prøver verdiene i samme rekkefølge som i listene
+            mark = domains.mark()  # Husker hvor langt trailen var kommet, så vi kan angre alt som skjer under
+            domains.set_mask(var, 1 << bit)
+            if self.inference_bitset(domains, domains.neighbouring_arcs(var)) and self.backtrack_bitset(domains):
+                return True
+            domains.undo(mark)  # Setter domenene tilbake slik de var før vi prøvde verdien
+        self.backtrack_returned_failure += 1
+        return False
+
+    def select_unassigned_variable_bitset(self, domains):
+        """Like select_unassigned_variable(), but returns the id of the
+        first variable with more than one legal value, or -1.
+        """
+        for var in range(len(domains.masks)):
+            if domains.size(var) > 1:
+                return var
+        return -1
+
+    def inference_bitset(self, domains, queue):
+        """AC-3 on a BitsetDomains store. The arcs in 'queue' are pairs
+        of variable ids. Returns False if a domain becomes empty.
+        """
+        store = self.get_constraint_store()
+        variables = PropagationQueue(len(domains.names))
+        pending = PropagationQueue(len(self.global_constraints))
+        for i, j in queue:
+            variables.push(j)
+        while variables or pending:
+            if not variables:
+                changed = self.propagate_global_bitset(domains, pending.pop()[0])
+                if changed is None:
+                    return False
+                for var in changed:
+                    variables.push(var, -1, domains.size(var) == 1)
+                continue
+            j, cause = variables.pop()
+            for c in store.globals_of[j]:
+                pending.push(c)
+            for i in domains.neighbours[j]:
+                if i == cause:
+                    continue  # j ble nettopp revidert mot i
+                self.arc_pops += 1
+                if self.revise_bitset(domains, i, j):
+                    self.revisions += 1
+                    if domains.masks[i] == 0:
+                        return False
+                    variables.push(i, j, domains.size(i) == 1)
+        return True
+
+    def propagate_global_bitset(self, domains, c):
+        """propagate_global() on a BitsetDomains store.
+        """
+        scope = self.get_constraint_store().scopes[c]
+        filtered = self.global_constraints[c].filter([domains.masks[var] for var in scope])
+        if filtered is None:
+            return None
+        changed = []
+        for var, mask in zip(scope, filtered):
+            if mask != domains.masks[var]:
+                domains.set_mask(var, mask)
+                changed.append(var)
+        return changed
+
+    def revise_bitset(self, domains, i, j):
+        """Revise() on a BitsetDomains store. The values of 'i' without
+        a legal partner in the domain of 'j' are cleared from its mask.
+        """
+        store = self.get_constraint_store()
+        other = domains.masks[j]
+        mask = domains.masks[i]
+        if isinstance(self.constraints[domains.names[i]][domains.names[j]], NotEqualConstraint):
+            for x in domains.bits(i):
+                if not other & ~(1 << x):
+                    mask &= ~(1 << x)  # j har bare verdien x igjen
+        else:
+            for x in domains.bits(i):
+                if not store.row(domains.names[i], domains.names[j], x) & other:
+                    mask &= ~(1 << x)  # Ingen lovlig verdi for j, så x fjernes fra domenet til i
+        if mask == domains.masks[i]:
+            return False
+        domains.set_mask(i, mask)
+        return True
+
+
+class ConstraintStore:
+    """What revise() has learned about the constraints of a CSP. Every
+    value in the CSP gets a number, and for an arc (i, j) the store has:
+
+    - rows[i, j], a bit-matrix where rows[i, j][x] has bit y set when
+      value number y for 'j' is legal with value number x for 'i'. A
+      row is only worked out, by asking the constraint about every
+      value of 'j', the first time row() is called for it.
+    - last[i, j], the last-support pointers: last[i, j][x] is the
+      number of the last value for 'j' that was found to be legal with
+      value number x for 'i'
+
+    Both start out empty, so building the store takes time and memory
+    linear in the number of variables and values, whatever the number
+    and kind of constraints.
+
+    revise() first checks if the last support is still in the domain of
+    'j', and only looks for a new one if it is not, starting after the
+    old one like AC-2001. So the supports of a value are found at most
+    once each while domains shrink, and the search for a support goes
+    through the domain of 'j' only once. Backtracking puts values back,
+    and instead of saving and restoring the pointers, the search for a
+    new support goes round to the start of the domain after the end.
+    revise_bitset() does not need the pointers, as the AND of a row and
+    the mask of 'j' tells at once if there is a support left.
+    """
+
+    def __init__(self, csp):
+        # Every variable gets an id, the position of its name in self.names
+        self.names = list(csp.variables)
+        self.ids = {name: var for var, name in enumerate(self.names)}
+
+        # self.values[k] is the value with number k, self.numbers is the other way around
+        self.values = []
+        self.numbers = {}
+        for name in csp.variables:
+            for value in csp.domains[name]:
+                if value not in self.numbers:
+                    self.numbers[value] = len(self.values)
+                    self.values.append(value)
+
+        # self.order[j] is a sorted list of the numbers of the values of j, the order supports are looked for in
+        self.order = {name: sorted(set(self.numbers[value] for value in csp.domains[name])) for name in csp.variables}
+
+        self.constraints = csp.constraints
+        self.rows = {}
+        self.last = {}
+
+        # self.scopes[c] is a list of the ids of the variables of global constraint c, and self.globals_of[i] a list
+        # of the global constraints variable i is in
+        self.scopes = [[self.ids[name] for name in constraint.variables] for constraint in csp.global_constraints]
+        self.globals_of = [[] for _ in self.names]
+        for c, scope in enumerate(self.scopes):
+            for var in scope:
+                self.globals_of[var].append(c)
+
+    def mask_of(self, values):
+        """Get a bitmask with the bits of the numbers of 'values'.
+        """
+        mask = 0
+        for value in values:
+            mask |= 1 << self.numbers[value]
+        return mask
+
+    def row(self, i, j, x):
+        """Get the bits of the values of 'j' that are legal together
+        with value number x for 'i'.
+        """
+        rows = self.rows.setdefault((i, j), {})
+        if x not in rows:
+            constraint = self.constraints[i][j]
+            value = self.values[x]
+            rows[x] = 0
+            for y in self.order[j]:
+                if constraint.allows(value, self.values[y]):
+                    rows[x] |= 1 << y
+        return rows[x]
+
+
+class PredicateConstraint:
+    """A constraint given by a function that takes a value for each of
+    the two variables and returns True if they are legal together.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def allows(self, x, y):
+        return self.function(x, y)
+
+    def reverse(self):
+        return PredicateConstraint(lambda x, y: self.function(y, x))
+
+
+class NotEqualConstraint:
+    """The two variables must have different values. The solver knows
+    this constraint, and checks it without looking at any pairs.
+    """
+
+    def allows(self, x, y):
+        return x != y
+
+    def reverse(self):
+        return self
+
+
+NOT_EQUAL = NotEqualConstraint()  # Every != arc shares this one
+
+
+class TableConstraint:
+    """A constraint given by a table of the legal value pairs, kept in a
+    set so a pair is looked up in constant time.
+    """
+
+    def __init__(self, pairs):
+        self.pairs = set(pairs)
+
+    def allows(self, x, y):
+        return (x, y) in self.pairs
+
+    def reverse(self):
+        return TableConstraint((y, x) for x, y in self.pairs)
+
+
+class AllDifferentConstraint:
+    """A global constraint saying that all the variables in 'variables'
+    must have different values. It works on the domains of all of them
+    at once, as bitmasks like in BitsetDomains, so it can see things the
+    != constraints between pairs cannot, like three variables that only
+    have two values between them. 'filtering' chooses how hard it looks:
+
+    - 'singles' uses the Sudoku rules: a variable with a single value
+      (a naked single) takes it from the others, and there must be at
+      least as many values as variables. When there are exactly as
+      many, every value has to be used, so a value only one variable
+      can have (a hidden single) is given to it.
+    - 'matching' removes every value that is not part of any solution
+      of the constraint, with Régin's algorithm. A maximum matching
+      between the variables and the values gives one solution, or shows
+      that there is none. A value that is not in it can still be used
+      if there is an alternating cycle through it, that is if the value
+      and the variable are in the same strongly connected component of
+      the matching graph, or an alternating path to it from a value no
+      variable is matched with.
+    """
+
+    def __init__(self, variables, filtering='matching'):
+        self.variables = list(variables)
+        self.filtering = filtering
+        # The value bit each variable was matched with last time, where the next matching starts from
+        self.matching = [-1] * len(self.variables)
+
+    def filter(self, masks):
+        """Get the domains 'masks' of the variables with the values that
+        break the constraint removed, or None if it cannot be satisfied.
+        """
+        if self.filtering == 'singles':
+            return self.filter_singles(list(masks))
+        return self.filter_matching(masks)
+
+    def filter_singles(self, masks):
+        changed = True
+        while changed:
+            changed = False
+            union = 0
+            for mask in masks:
+                union |= mask
+            if bin(union).count('1') < len(masks):
+                return None  # Færre verdier enn variabler
+
+            for k, mask in enumerate(masks):
+                if mask == 0:
+                    return None
+                if mask & (mask - 1) == 0:  # Naken singel, de andre kan ikke ha denne verdien
+                    for other in range(len(masks)):
+                        if other != k and masks[other] & mask:
+                            masks[other] &= ~mask
+                            changed = True
+
+            if bin(union).count('1') > len(masks):
+                continue  # Ikke alle verdiene må brukes, så en verdi bare én variabel kan ha er ingen skjult singel
+            # Verdiene som bare finnes i ett domene, en skjult singel
+            once = 0
+            twice = 0
+            for mask in masks:
+                twice |= once & mask
+                once |= mask
+            for k, mask in enumerate(masks):
+                only = mask & ~twice
+                if only & (only - 1):
+                    return None  # To verdier som bare denne variabelen kan ha
+                if only and mask != only:
+                    masks[k] = only
+                    changed = True
+        return masks
+
+    def filter_matching(self, masks):
+        count = len(masks)
+        # Starter med det som er igjen av forrige matching, og finner en verdi til resten med utvidende stier
+        matching = [-1] * count
+        owner = {}
+        for k, bit in enumerate(self.matching):
+            if bit >= 0 and masks[k] >> bit & 1 and bit not in owner:
+                matching[k] = bit
+                owner[bit] = k
+        for k in range(count):
+            if matching[k] == -1 and not self.augment(k, masks, matching, owner, set()):
+                return None  # Det finnes ingen matching der alle variablene har hver sin verdi
+        self.matching = matching
+
+        # Grafen: variabel k -> verdien den er matchet med, og verdi -> variablene som kan ha den uten å være matchet
+        # med den. Verdiene er nodene fra count og oppover.
+        union = 0
+        for mask in masks:
+            union |= mask
+        values = bits_of(union)
+        node = {bit: count + n for n, bit in enumerate(values)}
+        edges = [[node[matching[k]]] for k in range(count)] + [[] for _ in values]
+        for k, mask in enumerate(masks):
+            for bit in bits_of(mask):
+                if bit != matching[k]:
+                    edges[node[bit]].append(k)
+
+        # Verdiene som kan nås med en alternerende sti fra en verdi ingen variabel er matchet med
+        reached = [False] * len(edges)
+        stack = [node[bit] for bit in values if bit not in owner]
+        for start in stack:
+            reached[start] = True
+        while stack:
+            for other in edges[stack.pop()]:
+                if not reached[other]:
+                    reached[other] = True
+                    stack.append(other)
+
+        components = strongly_connected_components(edges)
+        filtered = []
+        for k, mask in enumerate(masks):
+            kept = 1 << matching[k]
+            for bit in bits_of(mask):
+                if components[node[bit]] == components[k] or reached[node[bit]]:
+                    kept |= 1 << bit
+            filtered.append(kept)
+        return filtered
+
+    def augment(self, k, masks, matching, owner, seen):
+        # Leter etter en utvidende sti fra variabel k, slik at den får en verdi og de andre beholder hver sin
+        for bit in bits_of(masks[k]):
+            if bit in seen:
+                continue
+            seen.add(bit)
+            if bit not in owner or self.augment(owner[bit], masks, matching, owner, seen):
+                matching[k] = bit
+                owner[bit] = k
+                return True
+        return False
+
+
+def strongly_connected_components(edges):
+    """Tarjan's algorithm, without recursion. 'edges[n]' is a list of
+    the nodes node n has an edge to. Returns a list with a component
+    number for every node, the same for nodes in the same component.
+    """
+    index = [-1] * len(edges)
+    low = [0] * len(edges)
+    components = [-1] * len(edges)
+    on_stack = [False] * len(edges)
+    stack = []
+    counter = 0
+    for root in range(len(edges)):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            node, edge = work[-1]
+            if edge < len(edges[node]):
+                work[-1] = (node, edge + 1)
+                other = edges[node][edge]
+                if index[other] == -1:
+                    index[other] = low[other] = counter
+                    counter += 1
+                    stack.append(other)
+                    on_stack[other] = True
+                    work.append((other, 0))
+                elif on_stack[other]:
+                    low[node] = min(low[node], index[other])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[node])
+            if low[node] == index[node]:
+                while True:
+                    other = stack.pop()
+                    on_stack[other] = False
+                    components[other] = node
+                    if other == node:
+                        break
+    return components
+
+
+def bits_of(mask):
+    """Get a list of the numbers of the bits that are set in 'mask',
+    lowest first.
+    """
+    bits = []
+    while mask:
+        lowest = mask & -mask
+        bits.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return bits
+
+
+class PropagationQueue:
+    """The queue of inference(): the ids of the variables whose domains
+    have changed, so that the arcs towards them have to be revised. It
+    is a deque, so taking a variable off the front is as cheap as adding
+    one, and a bytearray with a flag per variable tells which ones are
+    waiting already, so a variable is never in the queue twice.
+
+    For every variable the queue also remembers which variable caused
+    the change, as the arc back to that one does not need revising. If
+    more than one did, that is forgotten again.
+    """
+
+    def __init__(self, count):
+        self.waiting = collections.deque()
+        self.queued = bytearray(count)
+        self.causes = [-1] * count
+
+    def push(self, var, cause=-1, urgent=False):
+        """Add 'var' to the queue, unless it is there already. An urgent
+        variable, one with a single value left, goes to the front, as it
+        removes the most values from its neighbours.
+        """
+        if self.queued[var]:
+            if self.causes[var] != cause:
+                self.causes[var] = -1
+            return
+        self.queued[var] = 1
+        self.causes[var] = cause
+        if urgent:
+            self.waiting.appendleft(var)
+        else:
+            self.waiting.append(var)
+
+    def pop(self):
+        """Take the first variable off the queue. Returns its id and the
+        id of the variable that caused the change, or -1.
+        """
+        var = self.waiting.popleft()
+        self.queued[var] = 0
+        return var, self.causes[var]
+
+    def __len__(self):
+        return len(self.waiting)
+
+
+class BitsetDomains:
+    """The domains of all the variables of a CSP, stored as one integer
+    per variable. Every value in the CSP gets a bit number, and bit k of
+    a mask is set when the value with number k is still legal for that
+    variable. Variables are referred to by their id, the position of
+    their name in 'names'.
+
+    Every change of a mask is written to a trail together with the old
+    mask. A search saves the length of the trail with mark() before it
+    tries something, and undo() puts the domains back to how they were
+    at that mark, without ever copying the domains.
+    """
+
+    def __init__(self, csp):
+        # The ids and bit numbers are the ones of the ConstraintStore
+        store = csp.get_constraint_store()
+        self.names = store.names
+        self.ids = store.ids
+        self.values = store.values
+        self.numbers = store.numbers
+
+        self.masks = [0] * len(self.names)
+        for var, name in enumerate(self.names):
+            for value in csp.domains[name]:
+                self.masks[var] |= 1 << self.numbers[value]
+
+        # self.neighbours[i] is a list of the ids of the variables with a constraint towards i
+        self.neighbours = [[self.ids[k] for k in csp.constraints[name]] for name in self.names]
+        self.trail = []
+
+    def all_arcs(self):
+        return [(i, j) for j in range(len(self.names)) for i in self.neighbours[j]]
+
+    def neighbouring_arcs(self, var):
+        return [(i, var) for i in self.neighbours[var]]
+
+    def bits(self, var):
+        """Get a list of the bit numbers of the legal values of 'var',
+        lowest first.
+        """
+        return bits_of(self.masks[var])
+
+    def size(self, var):
+        return bin(self.masks[var]).count('1')
+
+    def set_mask(self, var, mask):
+        if mask != self.masks[var]:
+            self.trail.append((var, self.masks[var]))
+            self.masks[var] = mask
+
+    def mark(self):
+        return len(self.trail)
+
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            var, mask = self.trail.pop()
+            self.masks[var] = mask
+
+    def to_assignment(self):
+        """Get the domains as a dictionary from variable name to a list
+        of legal values, like 'assignment' in CSP.backtrack().
+        """
+        return {name: [self.values[bit] for bit in self.bits(var)] for var, name in enumerate(self.names)}
 
 
 def create_map_coloring_csp():
@@ -210,9 +846,11 @@ def create_map_coloring_csp():
     return csp
 
 
-def create_sudoku_csp(filename):
+def create_sudoku_csp(filename, propagation='matching'):
     """Instantiate a CSP representing the Sudoku board found in the text
-    file named 'filename' in the current directory.
+    file named 'filename' in the current directory. 'propagation' is
+    passed on to add_all_different_constraint() for every row, column
+    and box.
     """
     csp = CSP()
     board = list(map(lambda x: x.strip(), open(filename, 'r')))
@@ -225,16 +863,16 @@ def create_sudoku_csp(filename):
                 csp.add_variable('%d-%d' % (row, col), [board[row][col]])
 
     for row in range(9):
-        csp.add_all_different_constraint(['%d-%d' % (row, col) for col in range(9)])
+        csp.add_all_different_constraint(['%d-%d' % (row, col) for col in range(9)], propagation)
     for col in range(9):
-        csp.add_all_different_constraint(['%d-%d' % (row, col) for row in range(9)])
+        csp.add_all_different_constraint(['%d-%d' % (row, col) for row in range(9)], propagation)
     for box_row in range(3):
         for box_col in range(3):
             cells = []
             for row in range(box_row * 3, (box_row + 1) * 3):
                 for col in range(box_col * 3, (box_col + 1) * 3):
                     cells.append('%d-%d' % (row, col))
-            csp.add_all_different_constraint(cells)
+            csp.add_all_different_constraint(cells, propagation)
 
     return csp
 
@@ -273,28 +911,43 @@ very_hard = create_sudoku_csp("veryhard.txt")
 
 print('---------+---EASY----+---------')
 print_sudoku_solution(easy.backtracking_search())
-print(f'Backtracked called: {easy.backtrack_called}, Backtracked failure: {easy.backtrack_returned_failure}')
+print(f'Backtracked called: {easy.backtrack_called}, Backtracked failure: {easy.backtrack_returned_failure}, '
+      f'Arc pops: {easy.arc_pops}, Revisions: {easy.revisions}')
 print()
 print()
 
 print('---------+--MEDIUM---+---------')
 print_sudoku_solution(medium.backtracking_search())
-print(f'Backtracked called: {medium.backtrack_called}, Backtracked failure: {medium.backtrack_returned_failure}')
+print(f'Backtracked called: {medium.backtrack_called}, Backtracked failure: {medium.backtrack_returned_failure}, '
+      f'Arc pops: {medium.arc_pops}, Revisions: {medium.revisions}')
 print()
 print()
 
 print('---------+---HARD----+---------')
 print_sudoku_solution(hard.backtracking_search())
-print(f'Backtracked called: {hard.backtrack_called}, Backtracked failure: {hard.backtrack_returned_failure}')
+print(f'Backtracked called: {hard.backtrack_called}, Backtracked failure: {hard.backtrack_returned_failure}, '
+      f'Arc pops: {hard.arc_pops}, Revisions: {hard.revisions}')
 print()
 print()
 
 print('---------+-VERY-HARD-+---------')
 print_sudoku_solution(very_hard.backtracking_search())
-print(f'Backtracked called: {very_hard.backtrack_called}, Backtracked failure: {very_hard.backtrack_returned_failure}')
+print(f'Backtracked called: {very_hard.backtrack_called}, Backtracked failure: {very_hard.backtrack_returned_failure}, '
+      f'Arc pops: {very_hard.arc_pops}, Revisions: {very_hard.revisions}')
 print()
 print()
 
 
 
 
+
+if __name__ == '__main__':
+    print('---------+--BITSET---+---------')
+    for filename, propagation in itertools.product(['easy.txt', 'medium.txt', 'hard.txt', 'veryhard.txt'],
+                                                   ['pairwise', 'singles', 'matching']):
+        csp = create_sudoku_csp(filename, propagation)
+        start_time = time.perf_counter()
+        solution = csp.backtracking_search(domains='bitset')
+        print(f'{filename} {propagation}: {time.perf_counter() - start_time:.3f} s, '
+              f'Backtracked called: {csp.backtrack_called}, Backtracked failure: {csp.backtrack_returned_failure}, '
+              f'Arc pops: {csp.arc_pops}, Revisions: {csp.revisions}')
@@ -0,0 +1,222 @@
+import itertools
+import random
+import Assignment
+
+SUDOKUS = ['easy.txt', 'medium.txt', 'hard.txt', 'veryhard.txt']
+
+
+def check_sudoku(filename, solution):
+    # Every cell has one value, the given cells keep theirs, and every row, column and box holds 1-9 once
+    board = [line.strip() for line in open(filename)]
+    grid = [[solution['%d-%d' % (row, col)] for col in range(9)] for row in range(9)]
+    assert all(len(values) == 1 for line in grid for values in line)
+    grid = [[values[0] for values in line] for line in grid]
+    for row, col in itertools.product(range(9), range(9)):
+        assert board[row][col] in ('0', grid[row][col])
+    digits = sorted(map(str, range(1, 10)))
+    for k in range(9):
+        assert sorted(grid[k]) == digits
+        assert sorted(grid[row][k] for row in range(9)) == digits
+        assert sorted(grid[k // 3 * 3 + row][k % 3 * 3 + col] for row in range(3) for col in range(3)) == digits
+
+
+def test_bitset_domains_solve_the_sudokus():
+    for filename in SUDOKUS:
+        with_lists = Assignment.create_sudoku_csp(filename, 'pairwise')
+        solution = with_lists.backtracking_search()
+        check_sudoku(filename, solution)
+        with_bitsets = Assignment.create_sudoku_csp(filename, 'pairwise')
+        assert with_bitsets.backtracking_search(domains='bitset') == solution
+        # The two searches try the same values in the same order
+        assert with_bitsets.backtrack_called == with_lists.backtrack_called
+
+
+def test_bitset_domains_find_no_solution():
+    csp = Assignment.create_map_coloring_csp()
+    assert csp.backtracking_search(domains='bitset') != -1
+    for state in csp.variables:
+        csp.domains[state] = ['red', 'green']
+    assert csp.backtracking_search() == -1
+    assert csp.backtracking_search(domains='bitset') == -1
+
+    # Here the first arc consistency already empties a domain
+    csp = Assignment.CSP()
+    csp.add_variable('a', ['x'])
+    csp.add_variable('b', ['x'])
+    csp.add_variable('c', ['x', 'y'])
+    csp.add_intensional_constraint('a', 'b', Assignment.NOT_EQUAL)
+    assert csp.backtracking_search() == -1
+    assert csp.backtracking_search(domains='bitset') == -1
+
+
+def naive_arc_consistency(csp, domains):
+    # AC-3 as in the textbook: go over every arc again until no value is removed
+    domains = {name: list(values) for name, values in domains.items()}
+    changed = True
+    while changed:
+        changed = False
+        for i, j in csp.get_all_arcs():
+            kept = [x for x in domains[i] if any(csp.constraints[i][j].allows(x, y) for y in domains[j])]
+            if len(kept) < len(domains[i]):
+                domains[i] = kept
+                changed = True
+    return domains
+
+
+def random_csp(seed):
+    # Variables with a few numbers each, and table, function and != constraints between random pairs of them
+    rng = random.Random(seed)
+    csp = Assignment.CSP()
+    for var in range(8):
+        csp.add_variable(var, rng.sample(range(6), rng.randint(2, 6)))
+    for _ in range(12):
+        i, j = rng.sample(range(8), 2)
+        kind = rng.randrange(3)
+        if kind == 0:
+            pairs = [(x, y) for x in range(6) for y in range(6) if rng.random() < 0.6]
+            csp.add_intensional_constraint(i, j, Assignment.TableConstraint(pairs))
+        elif kind == 1:
+            offset = rng.randint(-2, 2)
+            csp.add_constraint_one_way(i, j, lambda x, y, offset=offset: x + offset <= y)
+            csp.add_constraint_one_way(j, i, lambda y, x, offset=offset: x + offset <= y)
+        else:
+            csp.add_intensional_constraint(i, j, Assignment.NOT_EQUAL)
+    return csp
+
+
+def test_inference_makes_the_arcs_consistent():
+    outcomes = set()
+    for seed in range(30):
+        csp = random_csp(seed)
+        rng = random.Random(seed)
+        # The same store, with its last supports, is used for all the inferences, as in a search
+        for _ in range(5):
+            var = rng.choice(csp.variables)
+            value = rng.choice(csp.domains[var])
+            domains = {name: list(values) for name, values in csp.domains.items()}
+            domains[var] = [value]
+            expected = naive_arc_consistency(csp, domains)
+            consistent = all(expected.values())
+            outcomes.add(consistent)
+            assert csp.inference(domains, csp.get_all_arcs()) == consistent
+
+            bitsets = Assignment.BitsetDomains(csp)
+            bitsets.set_mask(bitsets.ids[var], 1 << bitsets.numbers[value])
+            assert csp.inference_bitset(bitsets, bitsets.all_arcs()) == consistent
+            if consistent:
+                assert domains == expected
+                assert bitsets.to_assignment() == {name: sorted(values, key=bitsets.numbers.get)
+                                                   for name, values in expected.items()}
+    assert outcomes == {True, False}
+
+
+def test_inference_on_the_sudokus():
+    for filename in SUDOKUS:
+        csp = Assignment.create_sudoku_csp(filename, 'pairwise')
+        domains = {name: list(values) for name, values in csp.domains.items()}
+        assert csp.inference(domains, csp.get_all_arcs())
+        assert domains == naive_arc_consistency(csp, csp.domains)
+
+
+def test_propagation_queue():
+    queue = Assignment.PropagationQueue(4)
+    queue.push(2, 0)
+    queue.push(1, 0)
+    queue.push(2, 0)  # Already waiting, with the same cause
+    queue.push(1, 3)  # Already waiting, but another variable changed it too
+    queue.push(3, 0, urgent=True)
+    assert len(queue) == 3
+    assert [queue.pop() for _ in range(3)] == [(3, 0), (2, 0), (1, -1)]
+    assert len(queue) == 0
+    queue.push(1, 2)  # Can be pushed again once it is off the queue
+    assert queue.pop() == (1, 2)
+
+
+def test_counters():
+    csp = Assignment.create_sudoku_csp('easy.txt', 'pairwise')
+    assert (csp.arc_pops, csp.revisions) == (0, 0)
+    csp.backtracking_search()
+    # Every revision that removed something was an arc taken off the queue. Without the queue of variables every arc
+    # would be revised at least once in the first inference.
+    assert 0 < csp.revisions <= csp.arc_pops
+    assert len(csp.get_all_arcs()) <= csp.arc_pops
+
+
+def test_constraints_are_only_asked_when_needed():
+    calls = []
+
+    def different(x, y):
+        calls.append((x, y))
+        return x != y
+
+    csp = Assignment.create_map_coloring_csp()
+    for i, j in csp.get_all_arcs():
+        csp.add_constraint_one_way(i, j, different)
+    assert calls == []  # Nothing is worked out when the constraints are added
+    solution = csp.backtracking_search()
+    assert calls
+    for i, j in csp.get_all_arcs():
+        assert solution[i] != solution[j]
+
+
+def test_combined_constraints():
+    csp = Assignment.CSP()
+    for name in 'abc':
+        csp.add_variable(name, range(5))
+    csp.add_intensional_constraint('a', 'b', Assignment.TableConstraint([(x, x + 1) for x in range(4)]))
+    csp.add_constraint_one_way('a', 'b', lambda x, y: x >= 2)  # Both have to hold from a to b
+    csp.add_constraint_one_way('b', 'a', lambda y, x: y != 4)
+    csp.add_intensional_constraint('b', 'c', Assignment.NOT_EQUAL)
+    csp.add_intensional_constraint('b', 'c', Assignment.NOT_EQUAL)
+    assert csp.constraints['b']['c'] is Assignment.NOT_EQUAL  # The second one changes nothing
+    assert csp.constraints['b']['a'].allows(3, 2) and not csp.constraints['b']['a'].allows(4, 3)
+    assert not csp.constraints['a']['b'].allows(1, 2)
+    for domains in ('list', 'bitset'):
+        solution = csp.backtracking_search(domains=domains)
+        assert solution['a'] == [2] and solution['b'] == [3] and solution['c'] != [3]
+
+
+def test_sudokus_with_every_propagation_and_domains():
+    for filename in SUDOKUS:
+        solutions = []
+        backtracks = {}
+        for propagation, domains in itertools.product(['pairwise', 'singles', 'matching'], ['list', 'bitset']):
+            csp = Assignment.create_sudoku_csp(filename, propagation)
+            solutions.append(csp.backtracking_search(domains=domains))
+            check_sudoku(filename, solutions[-1])
+            backtracks[propagation, domains] = csp.backtrack_called
+        assert all(solution == solutions[0] for solution in solutions)
+        # Stronger filtering never needs more guesses
+        for domains in ('list', 'bitset'):
+            assert backtracks['matching', domains] <= backtracks['singles', domains] <= backtracks['pairwise', domains]
+
+
+def supported_values(masks):
+    # The values every variable has in some solution of the all-different constraint, by trying all of them
+    supported = [0] * len(masks)
+    for values in itertools.product(*[Assignment.bits_of(mask) for mask in masks]):
+        if len(set(values)) == len(values):
+            for k, value in enumerate(values):
+                supported[k] |= 1 << value
+    return supported
+
+
+def test_all_different_filtering():
+    rng = random.Random(5)
+    # Each count has one constraint, so a matching starts from the one it found last time, like in a search
+    constraints = {count: Assignment.AllDifferentConstraint(range(count), 'matching') for count in range(1, 6)}
+    for _ in range(300):
+        count = rng.randint(1, 5)
+        masks = [rng.randrange(1, 1 << 6) for _ in range(count)]
+        supported = supported_values(masks)
+        matching = constraints[count]
+        singles = Assignment.AllDifferentConstraint(range(count), 'singles')
+        if not any(supported):
+            assert matching.filter(masks) is None
+            continue
+        # Matching removes exactly the values that are in no solution, singles only some of them
+        assert matching.filter(masks) == supported
+        filtered = singles.filter(masks)
+        assert filtered is not None
+        assert all(kept & value == value and kept & ~mask == 0
+                   for kept, value, mask in zip(filtered, supported, masks))